@@ -0,0 +1,10 @@
+def pytest_configure(config):
+    # До сбора тестов: модули, импортирующие cache, не должны создавать
+    # каталоги настоящего кэша.
+    from core.test_runner import setup_test_settings
+    setup_test_settings()
+
+
+def pytest_unconfigure(config):
+    from core.test_runner import teardown_test_settings
+    teardown_test_settings()
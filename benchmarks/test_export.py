@@ -0,0 +1,91 @@
+"""
+Пропускная способность и пик памяти потоковой выгрузки постов
+и комментариев на засеянной базе. Пик памяти сравнивается для половины
+и для всей таблицы и с выгрузкой через list(queryset): у потоковой
+выгрузки он не должен расти вместе с числом строк.
+
+Запуск: pytest benchmarks/test_export.py -s
+
+Переменные окружения:
+    BENCH_EXPORT_ROWS  число постов и комментариев (по умолчанию 100000;
+                       для таблицы в миллионы строк — 2000000 и больше).
+"""
+import os
+import time
+import tracemalloc
+
+import pytest
+from django.core.management import call_command
+
+from posts.export import CSV, NDJSON, EXPORTS, export
+from posts.models import Post
+from posts.seed import seed
+
+ROWS = int(os.environ.get('BENCH_EXPORT_ROWS', 100000))
+
+# Пик потоковой выгрузки всей таблицы может превышать пик половины не
+# больше чем на эту долю и абсолютный запас на шум аллокатора.
+MEMORY_GROWTH = 0.5
+MEMORY_SLACK_KB = 256
+
+
+@pytest.fixture(scope='module')
+def dataset(django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        seed(
+            users=1000,
+            groups=20,
+            posts=ROWS,
+            comments=ROWS,
+            follows=0,
+            index=False,
+            report=lambda message: None,
+        )
+        middle = Post.objects.order_by('pub_date').values_list(
+            'pub_date', flat=True
+        )[ROWS // 2]
+        yield {'until': middle.date()}
+        call_command('flush', interactive=False, verbosity=0)
+
+
+def consume(chunks):
+    size = 0
+    for chunk in chunks:
+        size += len(chunk.encode())
+    return size
+
+
+def peak_kb(func):
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+    return round(peak, 1)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('kind', sorted(EXPORTS))
+def test_export_streams_in_constant_memory(dataset, kind):
+    print()
+    print(f'{kind}: {ROWS} строк')
+    print(f'{"format":<8}{"rows/s":>12}{"MB/s":>8}'
+          f'{"half, KB":>12}{"full, KB":>12}')
+    for file_format in (NDJSON, CSV):
+        started = time.perf_counter()
+        size = consume(export(kind, file_format))
+        seconds = time.perf_counter() - started
+
+        half = peak_kb(lambda: consume(
+            export(kind, file_format, until=dataset['until'])
+        ))
+        full = peak_kb(lambda: consume(export(kind, file_format)))
+        print(f'{file_format:<8}{ROWS / seconds:>12.0f}'
+              f'{size / seconds / 2 ** 20:>8.1f}{half:>12}{full:>12}')
+        assert full <= half * (1 + MEMORY_GROWTH) + MEMORY_SLACK_KB, (
+            f'{kind}.{file_format}: пик {full} KB на всей таблице '
+            f'против {half} KB на половине'
+        )
+
+    naive = peak_kb(lambda: list(EXPORTS[kind].queryset()))
+    print(f'list(queryset): {naive} KB')
+    assert full < naive / 4
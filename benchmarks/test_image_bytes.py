@@ -0,0 +1,69 @@
+"""
+Сравнение байтов, которые хранятся и отдаются для одной фотографии
+до и после приема через posts.images.ingest_image.
+
+Запуск: pytest benchmarks/test_image_bytes.py -s
+"""
+import time
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageFilter, ImageOps
+
+from posts.images import ingest_image, modern_formats
+
+PHOTO_SIZE = (5472, 3648)
+THUMBNAIL = (960, 339)
+
+
+def make_photo():
+    """Фото на 20 Мп: плавный градиент с шумом, как у камеры."""
+    gradient = Image.linear_gradient('L').resize(PHOTO_SIZE)
+    noise = Image.effect_noise(PHOTO_SIZE, 40).filter(ImageFilter.BLUR)
+    photo = Image.merge('RGB', (gradient, noise, gradient.rotate(180)))
+    buffer = BytesIO()
+    photo.save(buffer, 'JPEG', quality=95)
+    return buffer.getvalue()
+
+
+def thumbnail_bytes(data, scale, image_format='JPEG'):
+    started = time.perf_counter()
+    with Image.open(BytesIO(data)) as image:
+        size = (THUMBNAIL[0] * scale, THUMBNAIL[1] * scale)
+        image.draft('RGB', size)
+        thumbnail = ImageOps.fit(image, size, Image.LANCZOS)
+        buffer = BytesIO()
+        thumbnail.save(buffer, image_format, quality=80)
+    return len(buffer.getvalue()), time.perf_counter() - started
+
+
+def test_ingestion_reduces_bytes(settings):
+    settings.IMAGE_MAX_PIXELS = 50 * 10 ** 6
+    settings.IMAGE_MAX_SIDE = 2560
+
+    raw = make_photo()
+    started = time.perf_counter()
+    ingested = ingest_image(
+        SimpleUploadedFile('photo.jpg', raw, 'image/jpeg')
+    ).read()
+    ingest_time = time.perf_counter() - started
+
+    rows = [('stored original', len(raw), len(ingested), 0, ingest_time)]
+    for scale in (1, 2):
+        before, before_time = thumbnail_bytes(raw, scale)
+        after, after_time = thumbnail_bytes(ingested, scale)
+        rows.append((f'thumbnail {scale}x jpeg', before, after,
+                     before_time, after_time))
+        for image_format in modern_formats():
+            after, after_time = thumbnail_bytes(ingested, scale, image_format)
+            rows.append((f'thumbnail {scale}x {image_format.lower()}',
+                         before, after, before_time, after_time))
+
+    print()
+    print(f'{"variant":<24}{"before, B":>12}{"after, B":>12}'
+          f'{"before, ms":>12}{"after, ms":>12}')
+    for name, before, after, before_time, after_time in rows:
+        print(f'{name:<24}{before:>12}{after:>12}'
+              f'{before_time * 1000:>12.1f}{after_time * 1000:>12.1f}')
+
+    assert len(ingested) < len(raw)
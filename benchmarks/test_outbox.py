@@ -0,0 +1,93 @@
+"""
+Задержка запроса на сброс пароля при отправке письма прямо из запроса
+и через очередь core.mail, а также скорость, с которой фоновый
+отправитель разбирает очередь. SMTP-сервер — локальная заглушка,
+которая принимает каждое письмо не быстрее чем за BENCH_SMTP_DELAY_MS.
+
+Запуск: pytest benchmarks/test_outbox.py -s
+
+Переменные окружения:
+    BENCH_ROUNDS          число запросов каждого вида (по умолчанию 20);
+    BENCH_SMTP_DELAY_MS   задержка SMTP-сервера на письмо (50);
+    BENCH_OUTBOX_SIZE     число писем для замера отправки очереди (200).
+"""
+import os
+import statistics
+import time
+
+import pytest
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core.mail import deliver
+from core.models import OutboxMessage
+from core.tests.smtp import SMTPStandIn
+from posts.models import User
+
+ROUNDS = int(os.environ.get('BENCH_ROUNDS', 20))
+SMTP_DELAY_MS = int(os.environ.get('BENCH_SMTP_DELAY_MS', 50))
+OUTBOX_SIZE = int(os.environ.get('BENCH_OUTBOX_SIZE', 200))
+
+SMTP_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+
+
+@pytest.fixture
+def smtp():
+    with SMTPStandIn(delay=SMTP_DELAY_MS / 1000) as stand_in:
+        with override_settings(
+            EMAIL_HOST='127.0.0.1', EMAIL_PORT=stand_in.port
+        ):
+            yield stand_in
+
+
+def reset_latency_ms(client, email):
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        response = client.post(
+            reverse('users:password_reset_form'), {'email': email}
+        )
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 302
+    return statistics.median(timings)
+
+
+@pytest.mark.django_db
+def test_password_reset_does_not_wait_for_smtp(smtp):
+    User.objects.create_user(
+        username='reader', email='reader@example.com', password='secret'
+    )
+    client = Client()
+    with override_settings(EMAIL_BACKEND=SMTP_BACKEND):
+        direct = reset_latency_ms(client, 'reader@example.com')
+    with override_settings(EMAIL_BACKEND='core.mail.OutboxBackend'):
+        queued = reset_latency_ms(client, 'reader@example.com')
+    print()
+    print(f'SMTP в запросе: {direct:.1f} мс, очередь: {queued:.1f} мс')
+    assert direct >= SMTP_DELAY_MS
+    assert queued < SMTP_DELAY_MS
+
+
+@pytest.mark.django_db
+def test_outbox_throughput(smtp):
+    OutboxMessage.objects.bulk_create(
+        OutboxMessage(
+            subject='Письмо',
+            recipients=f'user{i}@example.com',
+            payload=(
+                '{"subject": "Письмо", "body": "Текст", "from_email": '
+                f'"webmaster@localhost", "to": ["user{i}@example.com"], '
+                '"cc": [], "bcc": [], "reply_to": [], "headers": {}, '
+                '"alternatives": []}'
+            ),
+        )
+        for i in range(OUTBOX_SIZE)
+    )
+    with override_settings(OUTBOX_EMAIL_BACKEND=SMTP_BACKEND):
+        started = time.perf_counter()
+        sent = deliver()
+        seconds = time.perf_counter() - started
+    print()
+    print(f'{sent} писем за {seconds:.2f} с, сеансов SMTP: {smtp.sessions}')
+    assert sent == len(smtp.messages) == OUTBOX_SIZE
@@ -0,0 +1,62 @@
+"""
+Время рендера и размер навигации по страницам в зависимости от общего
+числа страниц: прежний цикл по page_range против окна page_window.
+
+Запуск: pytest benchmarks/test_pagination.py -s
+"""
+import time
+
+from django.core.paginator import Paginator
+from django.template import Context, Template
+from django.template.loader import get_template
+
+# Шаблон собирается в тесте: при импорте модуля, во время сбора тестов,
+# DEBUG еще включен, и движок шаблонов остался бы отладочным для всех
+# следующих бенчмарков.
+PAGE_RANGE = (
+    '{% for i in page_obj.paginator.page_range %}'
+    '{% if page_obj.number == i %}'
+    '<li class="page-item active"><span class="page-link">{{ i }}</span></li>'
+    '{% else %}'
+    '<li class="page-item"><a class="page-link" href="?page={{ i }}">'
+    '{{ i }}</a></li>'
+    '{% endif %}'
+    '{% endfor %}'
+)
+
+ROUNDS = 20
+
+
+def render_time(render, page):
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        html = render(page)
+    return len(html), (time.perf_counter() - started) / ROUNDS
+
+
+def test_window_render_is_independent_of_page_count():
+    window = get_template('posts/includes/paginator.html')
+    page_range = Template(PAGE_RANGE)
+    variants = {
+        'page_range': lambda page: page_range.render(
+            Context({'page_obj': page})
+        ),
+        'page_window': lambda page: window.render({'page_obj': page}),
+    }
+
+    results = {}
+    print()
+    print(f'{"variant":<14}{"pages":>8}{"bytes":>10}{"ms":>10}')
+    for posts in (100, 10000, 200000):
+        page = Paginator(range(posts), 10).page(5)
+        for name, render in variants.items():
+            size, seconds = render_time(render, page)
+            results[name, posts] = (size, seconds)
+            print(f'{name:<14}{page.paginator.num_pages:>8}{size:>10}'
+                  f'{seconds * 1000:>10.2f}')
+
+    small_size, small_time = results['page_window', 100]
+    large_size, large_time = results['page_window', 200000]
+    assert large_size - small_size < 64
+    assert large_time < small_time * 3 + 0.001
+    assert results['page_range', 200000][0] > 100 * large_size
@@ -0,0 +1,67 @@
+"""
+Сколько добавляет к запросу проверка ограничения частоты: два ведра
+(пользователь и IP) в кэше SQLiteCache. Ведра заведомо не пустеют,
+так что меряется только путь разрешенного запроса.
+
+Запуск: pytest benchmarks/test_ratelimit.py -s
+
+Переменные окружения:
+    BENCH_ROUNDS  число замеров (по умолчанию 2000).
+"""
+import os
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from core.ratelimit import rate_limit
+from posts.models import User
+
+ROUNDS = int(os.environ.get('BENCH_ROUNDS', 2000))
+
+# Требование к накладным расходам на запрос.
+LIMIT_MS = 1
+
+
+def view(request):
+    return HttpResponse()
+
+
+def timings_ms(func, request):
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        func(request)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def test_rate_limit_overhead():
+    request = RequestFactory().post('/')
+    request.user = User(pk=1, username='reader')
+    limited = rate_limit('bench')(view)
+    with tempfile.TemporaryDirectory() as location:
+        with override_settings(
+            RATELIMIT_ENABLED=True,
+            RATELIMITS={'bench': {'user': '1000000/h', 'ip': '1000000/h'}},
+            CACHES={
+                **settings.CACHES,
+                'ratelimit': {
+                    'BACKEND': 'core.cache.SQLiteCache',
+                    'LOCATION': os.path.join(location, 'ratelimit.sqlite3'),
+                },
+            },
+        ):
+            limited(request)
+            bare_p50, _ = timings_ms(view, request)
+            p50, p95 = timings_ms(limited, request)
+    overhead = p50 - bare_p50
+    print()
+    print(f'ограничение частоты: p50 {p50:.3f} мс, p95 {p95:.3f} мс, '
+          f'накладные расходы {overhead:.3f} мс')
+    assert overhead < LIMIT_MS
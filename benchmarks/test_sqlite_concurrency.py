@@ -0,0 +1,192 @@
+"""
+Нагрузочная проверка SQLite: несколько потоков пишут комментарии так
+же, как add_comment, — в транзакции core.db.atomic(immediate=True)
+читают пост, вставляют комментарий и обновляют счетчик, — а другие
+потоки в это время читают ленту.
+Сравниваются стандартный бэкенд Django без прагм и
+core.db_backends.sqlite3 с настройками из DATABASES; у каждого своя
+временная база в файле.
+
+Запуск: pytest benchmarks/test_sqlite_concurrency.py -s
+
+Переменные окружения:
+    BENCH_SECONDS        длительность нагрузки на каждый бэкенд (3);
+    BENCH_WRITERS        число пишущих потоков (4);
+    BENCH_READERS        число читающих потоков (4);
+    BENCH_WRITE_HOLD_MS  сколько транзакция записи держится открытой,
+                         имитируя работу вью (20).
+"""
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+import pytest
+from django.db import connection, connections
+
+from core.db import atomic
+
+SECONDS = float(os.environ.get('BENCH_SECONDS', 3))
+WRITERS = int(os.environ.get('BENCH_WRITERS', 4))
+READERS = int(os.environ.get('BENCH_READERS', 4))
+WRITE_HOLD_MS = int(os.environ.get('BENCH_WRITE_HOLD_MS', 20))
+
+POSTS = 100
+
+SCHEMA = [
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT, '
+    'comments INTEGER NOT NULL DEFAULT 0)',
+    'CREATE TABLE comment (id INTEGER PRIMARY KEY, post_id INTEGER '
+    'NOT NULL REFERENCES post (id), text TEXT)',
+    'CREATE INDEX comment_post_idx ON comment (post_id)',
+]
+
+FEED = (
+    'SELECT post.id, post.text, post.comments, count(comment.id) '
+    'FROM post LEFT JOIN comment ON comment.post_id = post.id '
+    'GROUP BY post.id ORDER BY post.id DESC LIMIT 10'
+)
+
+
+class Stats:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reads = []
+        self.writes = 0
+        self.read_errors = 0
+        self.write_errors = 0
+
+    def add(self, **values):
+        with self.lock:
+            for name, value in values.items():
+                setattr(self, name, getattr(self, name) + value)
+
+
+def write_comment(alias, post_id):
+    with atomic(using=alias, immediate=True):
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT text FROM post WHERE id = %s', [post_id])
+            cursor.fetchone()
+            time.sleep(WRITE_HOLD_MS / 1000)
+            cursor.execute(
+                'INSERT INTO comment (post_id, text) VALUES (%s, %s)',
+                [post_id, 'Комментарий']
+            )
+            cursor.execute(
+                'UPDATE post SET comments = comments + 1 WHERE id = %s',
+                [post_id]
+            )
+
+
+def writer(alias, stats, deadline, number):
+    writes = errors = 0
+    while time.monotonic() < deadline:
+        try:
+            write_comment(alias, (writes * WRITERS + number) % POSTS + 1)
+            writes += 1
+        except Exception:
+            errors += 1
+    stats.add(writes=writes, write_errors=errors)
+
+
+def reader(alias, stats, deadline):
+    timings = []
+    errors = 0
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(FEED)
+                cursor.fetchall()
+        except Exception:
+            errors += 1
+            continue
+        timings.append((time.perf_counter() - started) * 1000)
+    stats.add(reads=timings, read_errors=errors)
+
+
+def in_thread(alias, target, *args):
+    def run():
+        try:
+            target(alias, *args)
+        finally:
+            connections[alias].close()
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def stress(alias, engine, location):
+    settings_dict = dict(
+        connection.settings_dict,
+        ENGINE=engine,
+        NAME=os.path.join(location, f'{alias}.sqlite3'),
+    )
+    if engine == 'django.db.backends.sqlite3':
+        settings_dict.pop('PRAGMAS', None)
+    connections.databases[alias] = settings_dict
+    try:
+        with connections[alias].cursor() as cursor:
+            for statement in SCHEMA:
+                cursor.execute(statement)
+            cursor.executemany(
+                'INSERT INTO post (text) VALUES (%s)',
+                [[f'Пост {i}'] for i in range(POSTS)]
+            )
+        connections[alias].close()
+        stats = Stats()
+        deadline = time.monotonic() + SECONDS
+        threads = [
+            in_thread(alias, writer, stats, deadline, number)
+            for number in range(WRITERS)
+        ] + [
+            in_thread(alias, reader, stats, deadline)
+            for _ in range(READERS)
+        ]
+        for thread in threads:
+            thread.join()
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM comment')
+            stats.stored = cursor.fetchone()[0]
+        connections[alias].close()
+    finally:
+        del connections[alias]
+        connections.databases.pop(alias)
+    stats.reads.sort()
+    return stats
+
+
+def report(name, stats):
+    reads = stats.reads
+    p99 = reads[int(len(reads) * 0.99) - 1] if reads else float('nan')
+    print(
+        f'{name}: записей {stats.writes}, ошибок записи '
+        f'{stats.write_errors}; чтений {len(reads)}, ошибок чтения '
+        f'{stats.read_errors}, p50 {statistics.median(reads or [0]):.2f} '
+        f'мс, p99 {p99:.2f} мс, максимум {max(reads or [0]):.2f} мс'
+    )
+    return p99
+
+
+@pytest.fixture
+def database(django_db_blocker):
+    with django_db_blocker.unblock():
+        with tempfile.TemporaryDirectory() as location:
+            yield location
+
+
+def test_reads_never_wait_for_writes(database):
+    stock = stress('stock', 'django.db.backends.sqlite3', database)
+    tuned = stress('tuned', 'core.db_backends.sqlite3', database)
+    print()
+    report('стандартный бэкенд', stock)
+    p99 = report('core.db_backends.sqlite3', tuned)
+    assert tuned.write_errors == tuned.read_errors == 0
+    # Запись идет по одному писателю: ни один комментарий не потерян,
+    # а транзакций не больше, чем помещается в отведенное время.
+    assert 0 < tuned.stored == tuned.writes
+    assert tuned.writes <= SECONDS * 1000 / WRITE_HOLD_MS + WRITERS
+    # Чтение не ждет ни одной открытой транзакции записи.
+    assert p99 < WRITE_HOLD_MS
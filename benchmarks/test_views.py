@@ -0,0 +1,220 @@
+"""
+Задержка (p50/p95), число SQL-запросов и пик выделенной памяти для
+страниц posts на засеянной базе. Результаты сравниваются с базовыми
+значениями из baselines.json; тест падает, если метрика хуже базовой
+больше чем на допуск.
+
+Запуск: pytest benchmarks/test_views.py -s
+
+Переменные окружения:
+    BENCH_SCALE            множитель объема данных (по умолчанию 1);
+    BENCH_ROUNDS           число замеров каждой страницы (20);
+    BENCH_TOLERANCE        допуск для времени и памяти, доля (0.5);
+    BENCH_QUERY_TOLERANCE  допуск для числа запросов, доля (0);
+    BENCH_UPDATE=1         записать текущие значения как базовые.
+"""
+import gc
+import json
+import os
+import statistics
+import time
+import tracemalloc
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post, User
+from posts.seed import seed
+
+BASELINES = os.path.join(os.path.dirname(__file__), 'baselines.json')
+
+SCALE = float(os.environ.get('BENCH_SCALE', 1))
+ROUNDS = int(os.environ.get('BENCH_ROUNDS', 20))
+TOLERANCE = float(os.environ.get('BENCH_TOLERANCE', 0.5))
+QUERY_TOLERANCE = float(os.environ.get('BENCH_QUERY_TOLERANCE', 0))
+UPDATE = os.environ.get('BENCH_UPDATE') == '1'
+
+VOLUMES = {
+    'users': 1000,
+    'groups': 20,
+    'posts': 10000,
+    'comments': 20000,
+    'follows': 10000,
+}
+
+# Абсолютный запас для времени: на страницах в единицы миллисекунд
+# относительный допуск меньше шума таймера.
+TIME_SLACK_MS = 2
+
+
+@pytest.fixture(scope='module')
+def dataset(django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        seed(
+            **{name: int(count * SCALE) for name, count in VOLUMES.items()},
+            report=lambda message: None,
+        )
+        yield {
+            'group': Group.objects.annotate(
+                total=Count('posts')
+            ).order_by('-total').first(),
+            'author': User.objects.order_by('-stats__posts').first(),
+            'reader': User.objects.order_by('-stats__following').first(),
+            'post': Post.objects.annotate(
+                total=Count('comments')
+            ).order_by('-total').first(),
+        }
+        call_command('flush', interactive=False, verbosity=0)
+
+
+def pages(data):
+    post_id = data['post'].pk
+    return {
+        'index': ('get', reverse('posts:index'), {}),
+        'group_posts': (
+            'get',
+            reverse('posts:group_list', kwargs={'slug': data['group'].slug}),
+            {},
+        ),
+        'profile': (
+            'get',
+            reverse(
+                'posts:profile',
+                kwargs={'username': data['author'].username}
+            ),
+            {},
+        ),
+        'post_detail': (
+            'get',
+            reverse('posts:post_detail', kwargs={'post_id': post_id}),
+            {},
+        ),
+        'follow_index': ('get', reverse('posts:follow_index'), {}),
+        'api_index': ('get', reverse('posts:api_index'), {}),
+        'api_post_detail': (
+            'get',
+            reverse('posts:api_post_detail', kwargs={'post_id': post_id}),
+            {},
+        ),
+        'api_follow_index': ('get', reverse('posts:api_follow_index'), {}),
+        'post_create': (
+            'post', reverse('posts:post_create'), {'text': 'Новый пост'}
+        ),
+        'add_comment': (
+            'post',
+            reverse('posts:add_comment', kwargs={'post_id': post_id}),
+            {'text': 'Новый комментарий'},
+        ),
+    }
+
+
+def request(client, method, url, data):
+    response = getattr(client, method)(url, data)
+    assert response.status_code in (200, 302), url
+    return response
+
+
+def measure(client, method, url, data):
+    """
+    Страница каждый раз рендерится с холодным кэшем. Первый запрос не
+    меряется: он платит за разовую загрузку шаблонов, — а мусор,
+    оставшийся от засева и прошлых страниц, собирается до замеров.
+    Время и число запросов меряются без tracemalloc, который сильно
+    замедляет код; пик памяти — отдельным прогоном под tracemalloc.
+    """
+    request(client, method, url, data)
+    gc.collect()
+    timings, queries = [], set()
+    for _ in range(ROUNDS):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            request(client, method, url, data)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.add(len(context.captured_queries))
+
+    cache.clear()
+    tracemalloc.start()
+    request(client, method, url, data)
+    peak = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+
+    timings.sort()
+    return {
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(timings[int(len(timings) * 0.95) - 1], 2),
+        'queries': max(queries),
+        'peak_kb': round(peak, 1),
+    }
+
+
+def regressions(name, current, baseline):
+    found = []
+    for metric, value in current.items():
+        if metric not in baseline:
+            continue
+        if metric == 'queries':
+            limit = baseline[metric] * (1 + QUERY_TOLERANCE)
+        else:
+            limit = baseline[metric] * (1 + TOLERANCE)
+            if metric.endswith('_ms'):
+                limit += TIME_SLACK_MS
+        if value > limit:
+            found.append(
+                f'{name}.{metric}: {value} > {baseline[metric]} '
+                f'(допустимо до {limit:.2f})'
+            )
+    return found
+
+
+def load_baselines():
+    if not os.path.exists(BASELINES):
+        return {}
+    with open(BASELINES, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_baselines(baselines):
+    with open(BASELINES, 'w', encoding='utf-8') as file:
+        json.dump(baselines, file, indent=2, sort_keys=True)
+        file.write('\n')
+
+
+@pytest.mark.django_db
+def test_views_do_not_regress(dataset):
+    assert Follow.objects.filter(user=dataset['reader']).exists()
+    client = Client()
+    client.force_login(dataset['reader'])
+
+    results = {
+        name: measure(client, *page)
+        for name, page in pages(dataset).items()
+    }
+
+    print()
+    print(f'{"view":<18}{"p50, ms":>10}{"p95, ms":>10}'
+          f'{"queries":>10}{"peak, KB":>10}')
+    for name, result in results.items():
+        print(f'{name:<18}{result["p50_ms"]:>10}{result["p95_ms"]:>10}'
+              f'{result["queries"]:>10}{result["peak_kb"]:>10}')
+
+    baselines = load_baselines()
+    scale = str(SCALE)
+    if UPDATE:
+        baselines[scale] = results
+        save_baselines(baselines)
+        return
+    if scale not in baselines:
+        pytest.skip(f'Нет базовых значений для BENCH_SCALE={scale}')
+    found = []
+    for name, result in results.items():
+        found.extend(
+            regressions(name, result, baselines[scale].get(name, {}))
+        )
+    assert not found, '\n'.join(found)
@@ -0,0 +1,15 @@
+from django.contrib import admin
+
+from .models import OutboxMessage
+
+
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'subject', 'recipients', 'status', 'attempts', 'created', 'sent',
+    )
+    list_filter = ('status',)
+    search_fields = ('recipients', 'subject')
+    readonly_fields = ('payload', 'claim', 'last_error')
+
+
+admin.site.register(OutboxMessage, OutboxMessageAdmin)
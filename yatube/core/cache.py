@@ -0,0 +1,510 @@
+import hashlib
+import logging
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.module_loading import import_string
+
+from .metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+SHARED_BACKEND = 'django.core.cache.backends.filebased.FileBasedCache'
+
+# Ошибки, при которых кэш считается недоступным.
+UNAVAILABLE = (OSError, sqlite3.Error)
+
+# UPDATE ... RETURNING есть в SQLite с 3.35, upsert с условием — с 3.24.
+SINGLE_STATEMENT = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Параметров в одном запросе SQLite до 3.32 принимает не больше 999.
+MAX_VARIABLES = 500
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def raw_key(key, key_prefix, version):
+    return key
+
+
+class TieredCache(BaseCache):
+    """
+    Двухуровневый кэш: ограниченный LRU в памяти процесса (L1) перед
+    общим для всех воркеров бэкендом (L2, по умолчанию файловым).
+
+    Запись идет в оба уровня, чтение — сначала из L1. Записи L1 живут
+    не дольше L1_TIMEOUT секунд, поэтому изменения, сделанные другим
+    воркером, видны с задержкой не больше этого времени.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        shared = dict(options.get('SHARED', {}))
+        backend = import_string(shared.pop('BACKEND', SHARED_BACKEND))
+        shared['KEY_FUNCTION'] = raw_key
+        self.shared = backend(shared.pop('LOCATION', location), shared)
+
+        self.l1_max_entries = options.get('L1_MAX_ENTRIES', 1000)
+        self.l1_timeout = options.get('L1_TIMEOUT', 5)
+        self.jitter = options.get('TIMEOUT_JITTER', 0.1)
+        self.lock_timeout = options.get('LOCK_TIMEOUT', 10)
+        self.lock_dir = options.get('LOCK_DIR')
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = [threading.Lock() for _ in range(64)]
+        self._counters = Counter()
+
+    # L1
+
+    def _local_get(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return _MISSING
+            expires, pickled = entry
+            if expires <= time.monotonic():
+                del self._local[key]
+                return _MISSING
+            self._local.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def _local_set(self, key, value, timeout=None):
+        ttl = self.l1_timeout
+        if timeout is not None:
+            ttl = min(ttl, timeout)
+        if ttl <= 0:
+            self._local_delete(key)
+            return
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._local[key] = (time.monotonic() + ttl, pickled)
+            self._local.move_to_end(key)
+            while len(self._local) > self.l1_max_entries:
+                self._local.popitem(last=False)
+
+    def _local_delete(self, key):
+        with self._lock:
+            self._local.pop(key, None)
+
+    def _count(self, name, amount=1):
+        if amount:
+            with self._lock:
+                self._counters[name] += amount
+            record_cache(name, amount)
+
+    def stats(self):
+        """Счетчики попаданий и промахов этого процесса."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['l1_entries'] = len(self._local)
+        for name in ('l1_hits', 'l2_hits', 'misses'):
+            stats.setdefault(name, 0)
+        return stats
+
+    def _shared_timeout(self, timeout):
+        """Таймаут для L2, случайно растянутый на долю TIMEOUT_JITTER."""
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout and timeout > 0 and self.jitter:
+            timeout *= 1 + random.uniform(0, self.jitter)
+        return timeout
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    # Cache API
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        value = self._local_get(key)
+        if value is not _MISSING:
+            self._count('l1_hits')
+            return value
+        value = self.shared.get(key, _MISSING)
+        if value is _MISSING:
+            self._count('misses')
+            return default
+        self._count('l2_hits')
+        self._local_set(key, value)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        timeout = self._shared_timeout(timeout)
+        self.shared.set(key, value, timeout)
+        self._local_set(key, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        timeout = self._shared_timeout(timeout)
+        if not self.shared.add(key, value, timeout):
+            return False
+        self._local_set(key, value, timeout)
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        self._local_delete(key)
+        return self.shared.touch(key, self._shared_timeout(timeout))
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        self._local_delete(key)
+        self.shared.delete(key)
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        if self._local_get(key) is not _MISSING:
+            return True
+        return self.shared.has_key(key)
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        self._local_delete(key)
+        return self.shared.incr(key, delta)
+
+    def get_many(self, keys, version=None):
+        found = {}
+        pending = {}
+        for key in keys:
+            made = self._key(key, version)
+            value = self._local_get(made)
+            if value is _MISSING:
+                pending[made] = key
+            else:
+                found[key] = value
+        self._count('l1_hits', len(found))
+        if pending:
+            shared = self.shared.get_many(list(pending))
+            for made, value in shared.items():
+                found[pending[made]] = value
+                self._local_set(made, value)
+            self._count('l2_hits', len(shared))
+            self._count('misses', len(pending) - len(shared))
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._shared_timeout(timeout)
+        made = {self._key(key, version): value for key, value in data.items()}
+        self.shared.set_many(made, timeout)
+        for key, value in made.items():
+            self._local_set(key, value, timeout)
+        return []
+
+    def delete_many(self, keys, version=None):
+        made = [self._key(key, version) for key in keys]
+        for key in made:
+            self._local_delete(key)
+        self.shared.delete_many(made)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """
+        Как BaseCache.get_or_set, но значение пересчитывает только один
+        вызывающий: остальные процессы ждут его результата, пока держится
+        блокировка в L2 (не дольше LOCK_TIMEOUT секунд).
+        """
+        value = self.get(key, _MISSING, version=version)
+        if value is not _MISSING:
+            return value
+        made = self._key(key, version)
+        lock_key = f'{made}:lock'
+        with self._key_locks[hash(made) % len(self._key_locks)]:
+            value = self.get(key, _MISSING, version=version)
+            if value is not _MISSING:
+                return value
+            acquired = self._acquire(lock_key, made)
+            try:
+                value = self.shared.get(made, _MISSING)
+                if value is not _MISSING:
+                    self._local_set(made, value)
+                    return value
+                value = default() if callable(default) else default
+                self.set(key, value, timeout, version=version)
+                self._count('recomputes')
+            finally:
+                if acquired:
+                    self._release(lock_key)
+        return value
+
+    def _acquire(self, lock_key, key):
+        """
+        Берет блокировку пересчета. Возвращает False, если значение
+        посчитал другой процесс или блокировку не удалось взять вовремя.
+        """
+        deadline = time.monotonic() + self.lock_timeout
+        while not self._try_lock(lock_key):
+            if time.monotonic() >= deadline or self.shared.has_key(key):
+                return False
+            time.sleep(0.05)
+        return True
+
+    def _lock_path(self, lock_key):
+        name = hashlib.md5(lock_key.encode()).hexdigest()
+        return os.path.join(self.lock_dir, f'{name}.lock')
+
+    def _try_lock(self, lock_key):
+        """
+        add() файлового бэкенда не атомарен, поэтому при заданном
+        LOCK_DIR блокировкой служит файл, созданный с O_EXCL.
+        """
+        if not self.lock_dir:
+            return self.shared.add(lock_key, 1, self.lock_timeout)
+        path = self._lock_path(lock_key)
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            try:
+                stale = time.time() - os.path.getmtime(path)
+            except FileNotFoundError:
+                return False
+            if stale > self.lock_timeout:
+                self._release(lock_key)
+            return False
+        return True
+
+    def _release(self, lock_key):
+        if not self.lock_dir:
+            self.shared.delete(lock_key)
+            return
+        try:
+            os.remove(self._lock_path(lock_key))
+        except FileNotFoundError:
+            pass
+
+
+class SQLiteCache(BaseCache):
+    """
+    Кэш в отдельном файле SQLite, общий для всех воркеров на машине.
+    Нужен для счетчиков и для записей, которые нельзя вытеснять.
+    incr, advance и add выполняются одним SQL-запросом и потому атомарны
+    между процессами, а журнал WAL без fsync делает запись дешевой.
+    В SQLite старше 3.35 такого запроса нет, и они выполняются
+    несколькими запросами в транзакции BEGIN IMMEDIATE. Целые числа
+    хранятся как есть, остальное — в pickle. Истекшие записи удаляются
+    раз в CULL_EVERY записей; записи без срока не удаляются никогда.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.path = location
+        self.cull_every = options.get('CULL_EVERY', 1000)
+        self.single_statement = SINGLE_STATEMENT
+        if not self.single_statement:
+            logger.warning(
+                'SQLite %s: incr, advance и add кэша %s '
+                'выполняются в транзакции',
+                sqlite3.sqlite_version, location
+            )
+        self._local = threading.local()
+        self._writes = 0
+
+    def _db(self):
+        # Соединение свое у каждого потока и не переживает fork.
+        db = getattr(self._local, 'db', None)
+        if db is not None and self._local.pid == os.getpid():
+            return db
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=OFF')
+        db.execute(
+            'CREATE TABLE IF NOT EXISTS cache '
+            '(key TEXT PRIMARY KEY, value, expires REAL) WITHOUT ROWID'
+        )
+        self._local.db = db
+        self._local.pid = os.getpid()
+        return db
+
+    @staticmethod
+    def _encode(value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _decode(value):
+        return value if isinstance(value, int) else pickle.loads(value)
+
+    @contextmanager
+    def _immediate(self):
+        """Транзакция, которая сразу берет блокировку записи."""
+        db = self._db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def _wrote(self):
+        self._writes += 1
+        if self._writes % self.cull_every == 0:
+            self._db().execute(
+                'DELETE FROM cache WHERE expires <= ?', (time.time(),)
+            )
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        row = self._db().execute(
+            'SELECT value FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (key, time.time())
+        ).fetchone()
+        return default if row is None else self._decode(row[0])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        self._db().execute(
+            'INSERT OR REPLACE INTO cache VALUES (?, ?, ?)',
+            (key, self._encode(value), self.get_backend_timeout(timeout))
+        )
+        self._wrote()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        row = (key, self._encode(value), self.get_backend_timeout(timeout))
+        if self.single_statement:
+            cursor = self._db().execute(
+                'INSERT INTO cache VALUES (?, ?, ?) ON CONFLICT (key) '
+                'DO UPDATE SET value = excluded.value, '
+                'expires = excluded.expires WHERE cache.expires <= ?',
+                (*row, time.time())
+            )
+        else:
+            with self._immediate() as db:
+                db.execute(
+                    'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                    (key, time.time())
+                )
+                cursor = db.execute(
+                    'INSERT OR IGNORE INTO cache VALUES (?, ?, ?)', row
+                )
+        self._wrote()
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        return self._update_number(key, 'value + ?', (delta,), version)
+
+    def advance(self, key, delta, floor, version=None):
+        """
+        Атомарно заменяет число key на max(число, floor) + delta и
+        возвращает результат. Как и incr, без ключа — ValueError.
+        """
+        return self._update_number(
+            key, 'MAX(value, ?) + ?', (floor, delta), version
+        )
+
+    def _update_number(self, key, expression, args, version):
+        made = self._key(key, version)
+        update = (
+            f'UPDATE cache SET value = {expression} WHERE key = ? '
+            "AND typeof(value) = 'integer' "
+            'AND (expires IS NULL OR expires > ?)'
+        )
+        params = (*args, made, time.time())
+        if self.single_statement:
+            row = self._db().execute(
+                f'{update} RETURNING value', params
+            ).fetchone()
+        else:
+            row = None
+            with self._immediate() as db:
+                if db.execute(update, params).rowcount:
+                    row = db.execute(
+                        'SELECT value FROM cache WHERE key = ?', (made,)
+                    ).fetchone()
+        if row is None:
+            raise ValueError(f"Key '{key}' not found")
+        return row[0]
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        cursor = self._db().execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time())
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        self._db().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def get_many(self, keys, version=None):
+        made = {self._key(key, version): key for key in keys}
+        found = {}
+        now = time.time()
+        for chunk in _chunks(list(made), MAX_VARIABLES):
+            rows = self._db().execute(
+                'SELECT key, value FROM cache WHERE key IN '
+                f'({", ".join("?" * len(chunk))}) '
+                'AND (expires IS NULL OR expires > ?)',
+                (*chunk, now)
+            )
+            for key, value in rows:
+                found[made[key]] = self._decode(value)
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        with self._immediate() as db:
+            db.executemany(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?)',
+                [
+                    (self._key(key, version), self._encode(value), expires)
+                    for key, value in data.items()
+                ]
+            )
+        self._wrote()
+        return []
+
+    def delete_many(self, keys, version=None):
+        made = [self._key(key, version) for key in keys]
+        with self._immediate() as db:
+            for chunk in _chunks(made, MAX_VARIABLES):
+                db.execute(
+                    'DELETE FROM cache WHERE key IN '
+                    f'({", ".join("?" * len(chunk))})',
+                    chunk
+                )
+
+    def clear(self):
+        self._db().execute('DELETE FROM cache')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
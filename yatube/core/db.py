@@ -0,0 +1,25 @@
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+@contextmanager
+def atomic(using=None, savepoint=True, immediate=False):
+    """
+    transaction.atomic. С immediate=True транзакция сразу берет право
+    записи: в core.db_backends.sqlite3 — блокировку писателя и BEGIN
+    IMMEDIATE, а во вложенном блоке — блокировку до конца внешней
+    транзакции. Нужна транзакциям, которые пишут по прочитанному.
+    """
+    connection = transaction.get_connection(using)
+    hold = immediate and getattr(connection, 'hold_writer_lock', None)
+    if hold:
+        hold()
+    try:
+        with transaction.atomic(using, savepoint):
+            yield
+    finally:
+        if hold and not connection.in_atomic_block:
+            # Фиксация и откат снимают блокировку сами; она осталась,
+            # только если транзакция не началась.
+            connection.release_writer_lock()
@@ -0,0 +1,118 @@
+"""
+SQLite для конкурентной нагрузки.
+
+Каждое новое соединение получает прагмы из PRAGMAS в настройках базы:
+журнал WAL, при котором чтение не ждет записи, а запись чтения,
+synchronous, busy_timeout, mmap_size и размер кэша страниц.
+
+Писатель в SQLite один, поэтому запись в процессе идет по одному пути:
+первый INSERT, UPDATE или DELETE транзакции берет общую для базы
+блокировку писателя и держит ее до фиксации или отката, а такой же
+запрос вне транзакции берет ее на время запроса. Потоки процесса ждут
+писателя в очереди на блокировке, а не в цикле busy_timeout. Писателей
+из других процессов по-прежнему разводит busy_timeout.
+
+Транзакция начинается обычным BEGIN, поэтому транзакции только для
+чтения не ждут писателя и не мешают друг другу. Цена — транзакции,
+которые сначала читают, а потом пишут: если между их первым чтением и
+первой записью базу изменил другой писатель, SQLite не даст им права
+записи и сразу ответит database is locked, не дожидаясь busy_timeout.
+Такие транзакции открываются через core.db.atomic(immediate=True): она
+берет блокировку писателя заранее и начинает транзакцию с BEGIN
+IMMEDIATE. Писатели с immediate выстраиваются в очередь целиком, от
+первого чтения до фиксации, поэтому их стоит держать короткими.
+"""
+import threading
+
+from django.db import OperationalError
+from django.db.backends.sqlite3 import base
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLAC')
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+def writer_lock(name):
+    """Блокировка писателя, общая для всех соединений процесса с name."""
+    with _locks_lock:
+        return _locks.setdefault(name, threading.RLock())
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pragmas = self.settings_dict.get('PRAGMAS', {})
+        # Писатель ждет блокировку столько же, сколько ждал бы SQLite.
+        self.lock_timeout = self.pragmas.get(
+            'busy_timeout',
+            self.settings_dict['OPTIONS'].get('timeout', 5) * 1000
+        ) / 1000
+        self.writer_lock = writer_lock(self.settings_dict['NAME'])
+        self.holds_writer_lock = False
+        self.execute_wrappers.append(self.serialize_writes)
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def acquire_writer_lock(self):
+        if not self.writer_lock.acquire(timeout=self.lock_timeout):
+            raise OperationalError('database is locked')
+
+    def hold_writer_lock(self):
+        """Берет блокировку писателя до конца текущей транзакции."""
+        if not self.holds_writer_lock:
+            self.acquire_writer_lock()
+            self.holds_writer_lock = True
+
+    def release_writer_lock(self):
+        if self.holds_writer_lock:
+            self.holds_writer_lock = False
+            self.writer_lock.release()
+
+    def serialize_writes(self, execute, sql, params, many, context):
+        if self.holds_writer_lock or (
+            sql.lstrip()[:6].upper() not in WRITE_STATEMENTS
+        ):
+            return execute(sql, params, many, context)
+        if self.in_atomic_block:
+            self.hold_writer_lock()
+            return execute(sql, params, many, context)
+        self.acquire_writer_lock()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.writer_lock.release()
+
+    def _start_transaction_under_autocommit(self):
+        # Блокировку заранее берет только core.db.atomic(immediate=True).
+        if not self.holds_writer_lock:
+            super()._start_transaction_under_autocommit()
+            return
+        try:
+            self.cursor().execute('BEGIN IMMEDIATE')
+        except Exception:
+            self.release_writer_lock()
+            raise
+
+    def _commit(self):
+        try:
+            super()._commit()
+        finally:
+            self.release_writer_lock()
+
+    def _rollback(self):
+        try:
+            super()._rollback()
+        finally:
+            self.release_writer_lock()
+
+    def _close(self):
+        try:
+            super()._close()
+        finally:
+            self.release_writer_lock()
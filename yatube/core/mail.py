@@ -0,0 +1,233 @@
+"""
+Очередь исходящих писем.
+
+OutboxBackend — бэкенд EMAIL_BACKEND, который только записывает письма
+в таблицу OutboxMessage и после фиксации транзакции будит фоновый пул
+отправителей. Пул забирает подошедшие письма пачками по
+OUTBOX_BATCH_SIZE и отправляет каждую пачку через одно соединение
+OUTBOX_EMAIL_BACKEND. Неудачная попытка откладывается на
+OUTBOX_RETRY_DELAY секунд, и с каждой попыткой задержка удваивается;
+после OUTBOX_MAX_ATTEMPTS попыток письмо помечается неотправленным.
+Текст отправленного письма сразу стирается: в нем бывают ссылки сброса
+пароля. Отложенные письма и письма, оставшиеся от упавшего процесса,
+отправляет команда send_outbox; она же удаляет отправленные
+и неотправленные письма старше OUTBOX_RETENTION секунд.
+"""
+import json
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .db import atomic
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_lock = threading.Lock()
+# Сколько отправителей поставлено в пул и не закончило работу, и пришли
+# ли новые письма с тех пор, как отправители последний раз их искали.
+_scheduled = 0
+_dirty = False
+
+
+def serialize(message):
+    if message.attachments:
+        raise ValueError('Вложения в очереди писем не поддерживаются')
+    return json.dumps({
+        'subject': str(message.subject),
+        'body': str(message.body),
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': getattr(message, 'alternatives', []),
+    }, ensure_ascii=False)
+
+
+def deserialize(payload):
+    data = json.loads(payload)
+    alternatives = data.pop('alternatives')
+    message = EmailMultiAlternatives(**data)
+    for content, mimetype in alternatives:
+        message.attach_alternative(content, mimetype)
+    return message
+
+
+class OutboxBackend(BaseEmailBackend):
+    """Записывает письма в очередь вместо отправки."""
+
+    def send_messages(self, email_messages):
+        messages = [
+            OutboxMessage(
+                subject=str(message.subject)[:255],
+                recipients=', '.join(message.recipients()),
+                payload=serialize(message),
+            )
+            for message in email_messages
+            if message.recipients()
+        ]
+        OutboxMessage.objects.bulk_create(messages)
+        if messages:
+            transaction.on_commit(wake)
+        return len(messages)
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.OUTBOX_WORKERS,
+                thread_name_prefix='outbox'
+            )
+    return _executor
+
+
+def wake():
+    """
+    Запускает отправку новых писем. Без OUTBOX_WORKERS письма
+    отправляются сразу; иначе в пул ставятся недостающие отправители,
+    а уже работающие просто сделают еще один проход.
+    """
+    global _scheduled, _dirty
+    if not settings.OUTBOX_WORKERS:
+        deliver()
+        return
+    with _lock:
+        _dirty = True
+        spare = settings.OUTBOX_WORKERS - _scheduled
+        _scheduled += spare
+    for _ in range(spare):
+        get_executor().submit(_work)
+
+
+def _work():
+    global _scheduled, _dirty
+    try:
+        while True:
+            with _lock:
+                _dirty = False
+            deliver()
+            with _lock:
+                if not _dirty:
+                    _scheduled -= 1
+                    return
+    except Exception:
+        with _lock:
+            _scheduled -= 1
+        logger.exception('Отправитель писем остановился с ошибкой')
+    finally:
+        connections.close_all()
+
+
+def claim_batch(size):
+    """
+    Забирает до size писем, срок которых подошел, и сдвигает их срок
+    на OUTBOX_LEASE секунд: пока идет отправка, другие отправители их
+    не видят, а если процесс упадет, письма вернутся в очередь.
+    """
+    now = timezone.now()
+    due = OutboxMessage.objects.filter(
+        status=OutboxMessage.PENDING,
+        next_attempt__lte=now
+    )
+    claim = uuid.uuid4().hex
+    # Транзакция записи: между выборкой и сдвигом срока письма не
+    # заберет другой отправитель.
+    with atomic(immediate=True):
+        pks = list(due.values_list('pk', flat=True)[:size])
+        if not pks:
+            return []
+        due.filter(pk__in=pks).update(
+            claim=claim,
+            next_attempt=now + timedelta(seconds=settings.OUTBOX_LEASE)
+        )
+    return list(OutboxMessage.objects.filter(claim=claim))
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def record_failure(outbox, error):
+    attempts = outbox.attempts + 1
+    fields = {
+        'attempts': attempts,
+        'last_error': f'{type(error).__name__}: {error}',
+    }
+    if attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        fields['status'] = OutboxMessage.FAILED
+        logger.error('Письмо %s не отправлено: %s', outbox.pk, error)
+    else:
+        fields['next_attempt'] = timezone.now() + retry_delay(attempts)
+    OutboxMessage.objects.filter(pk=outbox.pk, claim=outbox.claim).update(
+        **fields
+    )
+
+
+def send_batch(batch):
+    """Отправляет пачку через одно соединение; возвращает число писем."""
+    connection = get_connection(settings.OUTBOX_EMAIL_BACKEND)
+    try:
+        connection.open()
+    except Exception as error:
+        for outbox in batch:
+            record_failure(outbox, error)
+        return 0
+    sent = []
+    try:
+        for outbox in batch:
+            try:
+                connection.send_messages([deserialize(outbox.payload)])
+            except Exception as error:
+                record_failure(outbox, error)
+            else:
+                sent.append(outbox)
+    finally:
+        connection.close()
+    OutboxMessage.objects.filter(
+        pk__in=[outbox.pk for outbox in sent],
+        claim=batch[0].claim
+    ).update(
+        status=OutboxMessage.SENT,
+        attempts=F('attempts') + 1,
+        sent=timezone.now(),
+        payload=''
+    )
+    return len(sent)
+
+
+def deliver(batch_size=None):
+    """Отправляет все подошедшие письма; возвращает число отправленных."""
+    total = 0
+    while True:
+        batch = claim_batch(batch_size or settings.OUTBOX_BATCH_SIZE)
+        if not batch:
+            return total
+        total += send_batch(batch)
+
+
+def purge(retention=None):
+    """
+    Удаляет отправленные и неотправленные письма старше retention
+    секунд (по умолчанию OUTBOX_RETENTION); возвращает их число.
+    """
+    if retention is None:
+        retention = settings.OUTBOX_RETENTION
+    deleted, _ = OutboxMessage.objects.filter(
+        status__in=(OutboxMessage.SENT, OutboxMessage.FAILED),
+        created__lt=timezone.now() - timedelta(seconds=retention)
+    ).delete()
+    return deleted
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.mail import deliver, purge
+
+
+class Command(BaseCommand):
+    help = (
+        'Отправляет письма из очереди, срок которых подошел: отложенные '
+        'после ошибок и оставшиеся от упавших процессов. Удаляет письма '
+        'старше OUTBOX_RETENTION секунд.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Не завершаться, а проверять очередь каждые --interval с.'
+        )
+        parser.add_argument('--interval', type=float, default=5)
+
+    def handle(self, *args, **options):
+        while True:
+            sent = deliver(batch_size=options['batch_size'])
+            if sent or not options['loop']:
+                self.stdout.write(f'Отправлено писем: {sent}')
+            purged = purge()
+            if purged:
+                self.stdout.write(f'Удалено старых писем: {purged}')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
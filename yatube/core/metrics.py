@@ -0,0 +1,62 @@
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+current = ContextVar('request_metrics', default=None)
+
+CACHE_COUNTERS = ('l1_hits', 'l2_hits', 'misses')
+
+
+def record_cache(name, amount):
+    """Засчитывает обращение к кэшу запросу, который сейчас выполняется."""
+    metrics = current.get()
+    if metrics is not None and name in metrics.cache:
+        metrics.cache[name] += amount
+
+
+class RequestMetrics:
+    """Счетчики одного запроса: SQL, рендер шаблонов и обращения к кэшу."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.queries = []
+        self.template_time = 0.0
+        self._template_depth = 0
+        self.cache = dict.fromkeys(CACHE_COUNTERS, 0)
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    def template_started(self):
+        self._template_depth += 1
+        return time.perf_counter()
+
+    def template_finished(self, started):
+        self._template_depth -= 1
+        if not self._template_depth:
+            self.template_time += time.perf_counter() - started
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def total_time(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def sql_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    def slowest_queries(self, limit):
+        return sorted(self.queries, key=lambda query: -query[1])[:limit]
+
+    def repeated_query(self):
+        """Самый частый SQL запроса и число его повторов."""
+        if not self.queries:
+            return None, 0
+        return Counter(sql for sql, _ in self.queries).most_common(1)[0]
@@ -0,0 +1,97 @@
+import json
+import logging
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import RequestMetrics, current
+
+logger = logging.getLogger('core.requests')
+
+
+class RequestMetricsMiddleware:
+    """
+    Считает для каждого запроса SQL-запросы и их время, время рендера
+    шаблонов и обращения к кэшу. Итоги уходят в заголовок Server-Timing,
+    а медленные запросы — в лог core.requests одной JSON-строкой вместе
+    с самыми долгими и самым частым SQL.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.record_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            current.reset(token)
+        metrics.finish()
+
+        if shows_timing(request):
+            response['Server-Timing'] = server_timing(metrics)
+        if is_slow(metrics):
+            logger.warning(json.dumps(
+                slow_request_entry(request, response, metrics),
+                ensure_ascii=False
+            ))
+        return response
+
+
+def shows_timing(request):
+    if settings.SERVER_TIMING:
+        return True
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_staff
+
+
+def server_timing(metrics):
+    cache = ' '.join(
+        f'{name}={value}' for name, value in metrics.cache.items()
+    )
+    timings = [
+        f'db;dur={metrics.sql_time * 1000:.1f};'
+        f'desc="{len(metrics.queries)} queries"',
+        f'tpl;dur={metrics.template_time * 1000:.1f}',
+        f'total;dur={metrics.total_time * 1000:.1f}',
+    ]
+    if cache:
+        timings.append(f'cache;desc="{cache}"')
+    return ', '.join(timings)
+
+
+def is_slow(metrics):
+    return (
+        metrics.total_time * 1000 >= settings.SLOW_REQUEST_MS
+        or len(metrics.queries) >= settings.SLOW_REQUEST_QUERIES
+    )
+
+
+def slow_request_entry(request, response, metrics):
+    match = request.resolver_match
+    repeated_sql, repeats = metrics.repeated_query()
+    return {
+        'view': match.view_name if match else None,
+        'method': request.method,
+        'path': request.get_full_path(),
+        'status': response.status_code,
+        'total_ms': round(metrics.total_time * 1000, 1),
+        'sql_ms': round(metrics.sql_time * 1000, 1),
+        'template_ms': round(metrics.template_time * 1000, 1),
+        'queries': len(metrics.queries),
+        'cache': metrics.cache,
+        'slowest_sql': [
+            {'sql': sql, 'ms': round(duration * 1000, 2)}
+            for sql, duration in metrics.slowest_queries(
+                settings.SLOW_REQUEST_SQL_LIMIT
+            )
+        ],
+        'repeated_sql': {'sql': repeated_sql, 'count': repeats},
+    }
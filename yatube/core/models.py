@@ -0,0 +1,48 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxMessage(models.Model):
+    """
+    Письмо в очереди на отправку. Пока письмо ждет отправки или
+    повторной попытки, next_attempt — время, раньше которого его
+    не берет ни один отправитель.
+    """
+
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'Ждет отправки'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Не отправлено'),
+    )
+
+    subject = models.CharField('Тема', max_length=255)
+    recipients = models.TextField('Получатели')
+    payload = models.TextField()
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=STATUSES,
+        default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    claim = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    sent = models.DateTimeField('Отправлено', null=True, blank=True)
+
+    class Meta:
+        ordering = ['pk']
+        # Отправитель выбирает ожидающие письма, срок которых подошел.
+        indexes = [
+            models.Index(
+                fields=['status', 'next_attempt'],
+                name='outbox_due_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} → {self.recipients}'
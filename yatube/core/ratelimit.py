@@ -0,0 +1,134 @@
+"""
+Ограничение частоты запросов: ведро жетонов на пользователя и на IP.
+
+Политика из RATELIMITS задает для каждой области (user, ip) частоту
+вида '10/m': ведро на 10 жетонов, которое наполняется со скоростью
+10 жетонов в минуту, то есть 10 запросов подряд, а дальше один раз
+в 6 секунд.
+
+Ведро хранится одним числом в кэше RATELIMIT_CACHE — теоретическим
+временем следующего запроса в миллисекундах (алгоритм GCRA). Запрос
+одним атомарным advance подтягивает это время к текущему моменту, если
+ведро простаивало, и сдвигает его на интервал между жетонами; если
+оно ушло дальше вместимости ведра, запрос отклоняется и сдвиг
+возвращается incr, как и жетоны, уже взятые из других ведер политики.
+Поэтому нужен кэш с атомарными add, incr и advance, такой как
+core.cache.SQLiteCache.
+"""
+import logging
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .cache import UNAVAILABLE
+from .views import too_many_requests
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# Ключ ведра живет не меньше суток: устаревшее значение безвредно,
+# а истечение ключа у активного клиента наполняет его ведро заново.
+MIN_KEY_TIMEOUT = 86400
+
+
+def parse_rate(rate):
+    """'10/m' -> (10, 60): жетонов в ведре и секунд на их наполнение."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period]
+
+
+def token_interval(rate):
+    """Миллисекунд между жетонами при частоте rate."""
+    count, period = parse_rate(rate)
+    return max(1, period * 1000 // count)
+
+
+def take(cache, key, rate, now_ms):
+    """
+    Берет жетон из ведра key. Возвращает 0, если жетон был, иначе
+    сколько миллисекунд ждать следующего.
+    """
+    count, period = parse_rate(rate)
+    interval = token_interval(rate)
+    capacity = interval * count
+    timeout = max(MIN_KEY_TIMEOUT, 2 * period)
+    try:
+        arrival = cache.advance(key, interval, now_ms)
+    except ValueError:
+        if cache.add(key, now_ms + interval, timeout):
+            return 0
+        arrival = cache.advance(key, interval, now_ms)
+    if arrival - now_ms > capacity:
+        cache.incr(key, -interval)
+        return arrival - capacity - now_ms
+    return 0
+
+
+def refund(cache, key, rate):
+    """Возвращает в ведро key жетон, взятый take."""
+    try:
+        cache.incr(key, -token_interval(rate))
+    except ValueError:
+        # Ключ истек — ведро и так полно.
+        pass
+
+
+def client_ip(request):
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def identities(request):
+    if request.user.is_authenticated:
+        yield 'user', request.user.pk
+    yield 'ip', client_ip(request)
+
+
+def check(request, policy_name):
+    """
+    0, если запрос укладывается во все ведра политики, иначе сколько
+    миллисекунд ждать. Отклоненный запрос не тратит жетонов ни в одном
+    ведре. Если кэш недоступен, запрос пропускается.
+    """
+    policy = settings.RATELIMITS[policy_name]
+    cache = caches[settings.RATELIMIT_CACHE]
+    now_ms = int(time.time() * 1000)
+    taken = []
+    try:
+        for scope, identity in identities(request):
+            rate = policy.get(scope)
+            if rate is None:
+                continue
+            key = f'ratelimit:{policy_name}:{scope}:{identity}'
+            wait = take(cache, key, rate, now_ms)
+            if wait:
+                for taken_key, taken_rate in taken:
+                    refund(cache, taken_key, taken_rate)
+                return wait
+            taken.append((key, rate))
+    except UNAVAILABLE:
+        logger.exception('Ограничение частоты не проверено')
+    return 0
+
+
+def rate_limit(policy_name, methods=None):
+    """
+    Отвечает 429 Too Many Requests с заголовком Retry-After, если
+    запрос методом из methods (по умолчанию любым) не укладывается
+    в политику policy_name.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            limited = settings.RATELIMIT_ENABLED and (
+                methods is None or request.method in methods
+            )
+            wait = limited and check(request, policy_name)
+            if wait:
+                return too_many_requests(request, math.ceil(wait / 1000))
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,26 @@
+from django.template.backends import django as django_backend
+
+from .metrics import current
+
+
+class Template(django_backend.Template):
+    """Шаблон, который добавляет время рендера к метрикам запроса."""
+
+    def render(self, context=None, request=None):
+        metrics = current.get()
+        if metrics is None:
+            return super().render(context, request)
+        started = metrics.template_started()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_finished(started)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+
+    def from_string(self, template_code):
+        return Template(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return Template(super().get_template(template_name).template, self)
@@ -0,0 +1,63 @@
+import copy
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+_override = None
+_directory = None
+
+
+def isolated_caches(directory):
+    """
+    Настройки CACHES, в которых все файлы кэшей лежат в directory:
+    cache.clear() в тестах не должен стирать кэш запущенного сервера.
+    """
+    caches = copy.deepcopy(settings.CACHES)
+    for alias, params in caches.items():
+        params['LOCATION'] = os.path.join(directory, alias)
+        options = params.get('OPTIONS', {})
+        if 'LOCK_DIR' in options:
+            options['LOCK_DIR'] = os.path.join(directory, f'{alias}_locks')
+    return caches
+
+
+def setup_test_settings():
+    """
+    Как и настоящую отправку писем, ограничение частоты в тестах
+    выключаем: все тестовые клиенты приходят с одного IP. Тесты
+    ограничения включают его сами. Кэши тесты держат в своем временном
+    каталоге, а миниатюры создают в том же потоке: фоновый воркер писал
+    бы в MEDIA_ROOT уже после того, как тест его удалил.
+    """
+    global _override, _directory
+    _directory = tempfile.mkdtemp(prefix='yatube_test_cache_')
+    _override = override_settings(
+        RATELIMIT_ENABLED=False,
+        THUMBNAIL_WORKERS=0,
+        CACHES=isolated_caches(_directory),
+    )
+    _override.enable()
+
+
+def teardown_test_settings():
+    global _override, _directory
+    if _override is None:
+        return
+    _override.disable()
+    shutil.rmtree(_directory, ignore_errors=True)
+    _override = _directory = None
+
+
+class TestRunner(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        setup_test_settings()
+
+    def teardown_test_environment(self, **kwargs):
+        teardown_test_settings()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,111 @@
+import email
+import email.policy
+import socketserver
+import threading
+import time
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Минимальный диалог SMTP: HELO/EHLO, MAIL, RCPT, DATA, RSET, QUIT."""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.stand_in = self.server.stand_in
+        self.stand_in.count_session()
+        self.envelope = {'from': None, 'to': []}
+        self.reply('220 localhost SMTP stand-in')
+        commands = {
+            'HELO': self.hello,
+            'EHLO': self.hello,
+            'MAIL': self.mail,
+            'RCPT': self.rcpt,
+            'DATA': self.data,
+            'RSET': self.reset,
+            'NOOP': lambda argument: self.reply('250 OK'),
+        }
+        for line in self.rfile:
+            verb, _, argument = line.decode().strip().partition(' ')
+            if verb.upper() == 'QUIT':
+                self.reply('221 Bye')
+                return
+            command = commands.get(verb.upper())
+            if command is None:
+                self.reply('502 Command not implemented')
+            else:
+                command(argument)
+
+    def hello(self, argument):
+        self.reply('250 localhost')
+
+    def mail(self, argument):
+        self.envelope = {'from': argument.partition(':')[2], 'to': []}
+        self.reply('250 OK')
+
+    def rcpt(self, argument):
+        self.envelope['to'].append(argument.partition(':')[2].strip('<>'))
+        self.reply('250 OK')
+
+    def reset(self, argument):
+        self.envelope = {'from': None, 'to': []}
+        self.reply('250 OK')
+
+    def data(self, argument):
+        self.reply('354 End data with <CR><LF>.<CR><LF>')
+        lines = []
+        for line in self.rfile:
+            if line == b'.\r\n':
+                break
+            lines.append(line[1:] if line.startswith(b'..') else line)
+        self.reply(self.stand_in.receive(self.envelope, b''.join(lines)))
+
+
+class SMTPStandIn:
+    """
+    Локальный SMTP-сервер для тестов и замеров. Принятые письма
+    складываются в messages. На первые fail писем сервер отвечает
+    временной ошибкой 451, а каждое письмо принимает не быстрее
+    чем за delay секунд.
+    """
+
+    def __init__(self, fail=0, delay=0):
+        self.fail = fail
+        self.delay = delay
+        self.messages = []
+        self.sessions = 0
+        self._lock = threading.Lock()
+        self.server = socketserver.ThreadingTCPServer(
+            ('127.0.0.1', 0), SMTPHandler
+        )
+        self.server.daemon_threads = True
+        self.server.stand_in = self
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def count_session(self):
+        with self._lock:
+            self.sessions += 1
+
+    def receive(self, envelope, data):
+        time.sleep(self.delay)
+        with self._lock:
+            if self.fail:
+                self.fail -= 1
+                return '451 Try again later'
+            message = email.message_from_bytes(
+                data, policy=email.policy.default
+            )
+            message.envelope_to = envelope['to']
+            self.messages.append(message)
+        return '250 OK'
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
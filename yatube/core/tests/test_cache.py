@@ -0,0 +1,141 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from core.cache import TieredCache
+from core.metrics import RequestMetrics, current
+from core.test_runner import isolated_caches
+
+User = get_user_model()
+
+
+def make_cache(location, **options):
+    options.setdefault('TIMEOUT_JITTER', 0)
+    options.setdefault('LOCK_DIR', os.path.join(location, 'locks'))
+    return TieredCache(location, {'OPTIONS': options})
+
+
+class TieredCacheTest(SimpleTestCase):
+
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.cache = make_cache(self.location, L1_MAX_ENTRIES=2)
+        self.addCleanup(shutil.rmtree, self.location, True)
+
+    def test_hits_are_counted_per_tier(self):
+        self.cache.set('key', 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.cache._local.clear()
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertIsNone(self.cache.get('missing'))
+        stats = self.cache.stats()
+        self.assertEqual(
+            (stats['l1_hits'], stats['l2_hits'], stats['misses']),
+            (1, 1, 1)
+        )
+
+    def test_hits_are_counted_per_request(self):
+        """Обращения из параллельного запроса не попадают в счетчики."""
+        self.cache.set('key', 'value')
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        try:
+            other = threading.Thread(
+                target=lambda: [self.cache.get('key') for _ in range(5)]
+            )
+            other.start()
+            other.join()
+            self.cache.get('key')
+            self.cache.get('missing')
+        finally:
+            current.reset(token)
+        self.assertEqual(
+            metrics.cache, {'l1_hits': 1, 'l2_hits': 0, 'misses': 1}
+        )
+
+    def test_workers_share_second_tier(self):
+        """Второй процесс видит запись первого через общий L2."""
+        other = make_cache(self.location)
+        self.cache.set('key', 'value')
+        self.assertEqual(other.get('key'), 'value')
+        other.delete('key')
+        self.cache._local.clear()
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_first_tier_is_bounded_lru(self):
+        for key in ('a', 'b', 'c'):
+            self.cache.set(key, key)
+        self.assertEqual(
+            list(self.cache._local),
+            [self.cache.make_key('b'), self.cache.make_key('c')]
+        )
+        self.assertEqual(self.cache.get('a'), 'a')
+
+    def test_first_tier_expires(self):
+        cache = make_cache(self.location, L1_TIMEOUT=0.01)
+        cache.set('key', 'value')
+        time.sleep(0.02)
+        cache.shared.delete(cache.make_key('key'))
+        self.assertIsNone(cache.get('key'))
+
+    def test_jitter_stretches_timeout(self):
+        cache = make_cache(self.location, TIMEOUT_JITTER=0.5)
+        timeouts = {cache._shared_timeout(100) for _ in range(20)}
+        self.assertTrue(all(100 <= t <= 150 for t in timeouts))
+        self.assertGreater(len(timeouts), 1)
+        self.assertIsNone(cache._shared_timeout(None))
+
+    def test_get_or_set_is_single_flight(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'value'
+
+        workers = [make_cache(self.location) for _ in range(4)]
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda c=c: results.append(c.get_or_set('k', compute))
+            )
+            for c in workers
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['value'] * 4)
+        self.assertEqual(len(calls), 1)
+
+
+class IsolatedCachesTest(SimpleTestCase):
+
+    def test_every_cache_lives_in_test_directory(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        for alias, params in isolated_caches(directory).items():
+            with self.subTest(alias=alias):
+                self.assertEqual(
+                    params['LOCATION'], os.path.join(directory, alias)
+                )
+                lock_dir = params.get('OPTIONS', {}).get('LOCK_DIR')
+                if lock_dir:
+                    self.assertTrue(lock_dir.startswith(directory))
+
+
+class CacheStatsViewTest(TestCase):
+
+    def test_stats_are_staff_only(self):
+        response = self.client.get('/cache-stats/')
+        self.assertEqual(response.status_code, 302)
+
+        admin = User.objects.create_user(username='admin', is_staff=True)
+        self.client.force_login(admin)
+        response = self.client.get('/cache-stats/')
+        self.assertIn('misses', response.json())
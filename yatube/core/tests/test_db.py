@@ -0,0 +1,145 @@
+import shutil
+import tempfile
+import threading
+
+from django.db import OperationalError, connection, connections, transaction
+from django.test import SimpleTestCase, TestCase
+
+from core.db import atomic
+from core.db_backends.sqlite3.base import writer_lock
+
+
+class PragmasTest(TestCase):
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_on_connect(self):
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('cache_size'), -64 * 2 ** 10)
+        self.assertEqual(self.pragma('temp_store'), 2)
+        self.assertEqual(self.pragma('foreign_keys'), 1)
+
+
+class WriterTest(SimpleTestCase):
+    """Файловая база в режиме WAL с двумя соединениями из разных потоков."""
+
+    alias = 'writer_test'
+
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, True)
+        connections.databases[self.alias] = dict(
+            connection.settings_dict, NAME=f'{location}/db.sqlite3'
+        )
+        self.addCleanup(connections.databases.pop, self.alias)
+        self.addCleanup(connections.__delitem__, self.alias)
+        self.addCleanup(connections[self.alias].close)
+        self.execute('CREATE TABLE item (value INTEGER)')
+
+    def execute(self, sql, params=()):
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def read_in_transaction(self):
+        with transaction.atomic(using=self.alias):
+            return self.execute('SELECT count(*) FROM item')
+
+    def in_thread(self, target):
+        result = {}
+
+        def run():
+            try:
+                result['value'] = target()
+            except Exception as error:
+                result['error'] = error
+            finally:
+                connections[self.alias].close()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread, result
+
+    def test_journal_is_wal(self):
+        self.assertEqual(self.execute('PRAGMA journal_mode'), [('wal',)])
+
+    def test_reads_do_not_wait_for_writer(self):
+        with transaction.atomic(using=self.alias):
+            self.execute('INSERT INTO item VALUES (1)')
+            thread, result = self.in_thread(
+                lambda: self.execute('SELECT count(*) FROM item')
+            )
+            thread.join(timeout=1)
+            self.assertFalse(thread.is_alive())
+        self.assertEqual(result, {'value': [(0,)]})
+
+    def test_writers_queue_instead_of_failing(self):
+        def write():
+            with atomic(using=self.alias, immediate=True):
+                count = self.execute('SELECT count(*) FROM item')[0][0]
+                self.execute('INSERT INTO item VALUES (%s)', [count])
+
+        with atomic(using=self.alias, immediate=True):
+            self.execute('SELECT count(*) FROM item')
+            thread, result = self.in_thread(write)
+            thread.join(timeout=0.2)
+            self.assertTrue(thread.is_alive())
+            self.execute('INSERT INTO item VALUES (0)')
+        thread.join()
+        self.assertEqual(result, {'value': None})
+        self.assertEqual(
+            self.execute('SELECT value FROM item ORDER BY value'),
+            [(0,), (1,)]
+        )
+
+    def test_read_only_transactions_do_not_take_writer_lock(self):
+        with atomic(using=self.alias, immediate=True):
+            thread, result = self.in_thread(self.read_in_transaction)
+            thread.join(timeout=1)
+            self.assertFalse(thread.is_alive())
+        self.assertEqual(result, {'value': [(0,)]})
+
+    def test_first_write_holds_writer_lock_until_commit(self):
+        with transaction.atomic(using=self.alias):
+            self.execute('SELECT count(*) FROM item')
+            self.assertFalse(connections[self.alias].holds_writer_lock)
+            self.execute('INSERT INTO item VALUES (1)')
+            thread, result = self.in_thread(
+                lambda: self.execute('INSERT INTO item VALUES (2)')
+            )
+            thread.join(timeout=0.2)
+            self.assertTrue(thread.is_alive())
+        thread.join()
+        self.assertFalse(connections[self.alias].holds_writer_lock)
+        self.assertEqual(self.execute('SELECT count(*) FROM item'), [(2,)])
+
+    def test_autocommit_writes_take_writer_lock(self):
+        with atomic(using=self.alias, immediate=True):
+            thread, result = self.in_thread(
+                lambda: self.execute('INSERT INTO item VALUES (1)')
+            )
+            thread.join(timeout=0.2)
+            self.assertTrue(thread.is_alive())
+        thread.join()
+        self.assertEqual(self.execute('SELECT count(*) FROM item'), [(1,)])
+
+    def test_writer_gives_up_after_busy_timeout(self):
+        lock = writer_lock(connections[self.alias].settings_dict['NAME'])
+        release = threading.Event()
+
+        def hold():
+            with lock:
+                release.wait()
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        self.addCleanup(holder.join)
+        self.addCleanup(release.set)
+        connections[self.alias].lock_timeout = 0.05
+        with self.assertRaisesMessage(OperationalError, 'database is locked'):
+            with atomic(using=self.alias, immediate=True):
+                pass
+        self.assertFalse(connections[self.alias].holds_writer_lock)
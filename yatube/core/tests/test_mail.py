@@ -0,0 +1,179 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.mail import send_mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.mail import claim_batch, deliver, purge
+from core.models import OutboxMessage
+
+from .smtp import SMTPStandIn
+
+User = get_user_model()
+
+
+def run_on_commit(func):
+    func()
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.OutboxBackend',
+    OUTBOX_EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+    EMAIL_HOST='127.0.0.1',
+    OUTBOX_WORKERS=0,
+    OUTBOX_BATCH_SIZE=2,
+    OUTBOX_MAX_ATTEMPTS=3,
+    OUTBOX_RETRY_DELAY=60,
+)
+class OutboxTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='reader',
+            email='reader@example.com',
+            password='Sup3r-secret-pass'
+        )
+
+    def start_smtp(self, **options):
+        smtp = self.enterContext(SMTPStandIn(**options))
+        self.enterContext(self.settings(EMAIL_PORT=smtp.port))
+        return smtp
+
+    def queue(self, count):
+        for i in range(count):
+            send_mail(f'Письмо {i}', 'Текст', None, [f'user{i}@example.com'])
+
+    def make_due(self):
+        OutboxMessage.objects.update(next_attempt=timezone.now())
+
+    def test_password_reset_is_queued_not_sent(self):
+        smtp = self.start_smtp()
+        response = self.client.post(
+            reverse('users:password_reset_form'),
+            {'email': 'reader@example.com'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(smtp.sessions, 0)
+        outbox = OutboxMessage.objects.get()
+        self.assertEqual(outbox.recipients, 'reader@example.com')
+        self.assertEqual(outbox.status, OutboxMessage.PENDING)
+
+        self.assertEqual(deliver(), 1)
+        self.assertEqual(smtp.messages[0].envelope_to, ['reader@example.com'])
+        self.assertIn('reader', smtp.messages[0].get_content())
+        outbox.refresh_from_db()
+        self.assertEqual(outbox.status, OutboxMessage.SENT)
+        self.assertEqual(outbox.attempts, 1)
+        self.assertEqual(outbox.payload, '', 'Ссылка сброса стерта')
+
+    def test_signup_queues_welcome_email(self):
+        self.client.post(reverse('users:signup'), {
+            'username': 'newcomer',
+            'email': 'newcomer@example.com',
+            'password1': 'Sup3r-secret-pass',
+            'password2': 'Sup3r-secret-pass',
+        })
+        outbox = OutboxMessage.objects.get()
+        self.assertEqual(outbox.subject, 'Добро пожаловать в Yatube')
+        self.assertEqual(outbox.recipients, 'newcomer@example.com')
+
+    def test_queue_is_sent_after_commit(self):
+        smtp = self.start_smtp()
+        with mock.patch('core.mail.transaction.on_commit', run_on_commit):
+            send_mail('Тема', 'Текст', None, ['reader@example.com'])
+        self.assertEqual(len(smtp.messages), 1)
+        self.assertEqual(str(smtp.messages[0]['Subject']), 'Тема')
+
+    def test_batch_is_sent_over_one_connection(self):
+        smtp = self.start_smtp()
+        self.queue(5)
+        self.assertEqual(deliver(), 5)
+        self.assertEqual(smtp.sessions, 3)
+        self.assertEqual(
+            [str(message['Subject']) for message in smtp.messages],
+            [f'Письмо {i}' for i in range(5)]
+        )
+
+    def test_failed_attempts_are_retried_with_backoff(self):
+        smtp = self.start_smtp(fail=2)
+        self.queue(1)
+        delays = []
+        for _ in range(2):
+            started = timezone.now()
+            self.assertEqual(deliver(), 0)
+            outbox = OutboxMessage.objects.get()
+            delays.append(outbox.next_attempt - started)
+            self.assertEqual(deliver(), 0, 'Срок повтора еще не подошел')
+            self.make_due()
+        self.assertEqual(
+            [round(delay.total_seconds()) for delay in delays], [60, 120]
+        )
+        self.assertIn('451', outbox.last_error)
+
+        self.assertEqual(deliver(), 1)
+        self.assertEqual(len(smtp.messages), 1)
+        outbox.refresh_from_db()
+        self.assertEqual(
+            (outbox.status, outbox.attempts), (OutboxMessage.SENT, 3)
+        )
+
+    def test_message_fails_after_max_attempts(self):
+        self.start_smtp(fail=10)
+        self.queue(1)
+        with self.settings(OUTBOX_RETRY_DELAY=0):
+            with self.assertLogs('core.mail', 'ERROR'):
+                self.assertEqual(deliver(), 0)
+        outbox = OutboxMessage.objects.get()
+        self.assertEqual(
+            (outbox.status, outbox.attempts), (OutboxMessage.FAILED, 3)
+        )
+
+    def test_unreachable_server_postpones_whole_batch(self):
+        with self.settings(EMAIL_PORT=self.start_smtp().port + 1):
+            self.queue(2)
+            self.assertEqual(deliver(), 0)
+        self.assertEqual(
+            set(OutboxMessage.objects.values_list('attempts', 'status')),
+            {(1, OutboxMessage.PENDING)}
+        )
+
+    def test_claimed_messages_return_after_lease(self):
+        self.queue(1)
+        self.assertEqual(len(claim_batch(10)), 1)
+        self.assertEqual(claim_batch(10), [])
+        OutboxMessage.objects.update(
+            next_attempt=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(len(claim_batch(10)), 1)
+
+    def test_old_messages_are_purged(self):
+        self.start_smtp()
+        self.queue(4)
+        deliver()
+        sent, failed, pending, recent = OutboxMessage.objects.all()
+        OutboxMessage.objects.filter(pk=failed.pk).update(
+            status=OutboxMessage.FAILED
+        )
+        OutboxMessage.objects.filter(pk=pending.pk).update(
+            status=OutboxMessage.PENDING,
+            next_attempt=timezone.now() + timedelta(hours=1)
+        )
+        OutboxMessage.objects.exclude(pk=recent.pk).update(
+            created=timezone.now() - timedelta(days=2)
+        )
+        with self.settings(OUTBOX_RETENTION=24 * 3600):
+            stdout = StringIO()
+            call_command('send_outbox', stdout=stdout)
+        self.assertIn('Удалено старых писем: 2', stdout.getvalue())
+        self.assertCountEqual(
+            OutboxMessage.objects.values_list('pk', flat=True),
+            [pending.pk, recent.pk]
+        )
+        self.assertEqual(purge(retention=0), 1)
@@ -0,0 +1,60 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+class RequestMetricsMiddlewareTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'tpl;dur=', 'total;dur=', 'queries"'):
+            self.assertIn(metric, timing)
+        self.assertIn('cache;desc="l1_hits=', timing)
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_can_be_disabled(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(SERVER_TIMING=False)
+    def test_staff_always_get_server_timing(self):
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('posts:index'))
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+    def test_fast_requests_are_not_logged(self):
+        with self.assertNoLogs('core.requests', 'WARNING'):
+            self.client.get(reverse('posts:index'))
+
+    @override_settings(SLOW_REQUEST_QUERIES=1)
+    def test_slow_request_is_logged_with_sql(self):
+        url = reverse(
+            'posts:post_detail',
+            kwargs={'post_id': RequestMetricsMiddlewareTest.post.pk}
+        )
+        with self.assertLogs('core.requests', 'WARNING') as logs:
+            self.client.get(url)
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['view'], 'posts:post_detail')
+        self.assertEqual(entry['status'], 200)
+        self.assertGreaterEqual(entry['queries'], 1)
+        self.assertGreater(entry['template_ms'], 0)
+        self.assertTrue(
+            any('posts_post' in query['sql'] for query in entry['slowest_sql'])
+        )
+        self.assertGreaterEqual(entry['repeated_sql']['count'], 1)
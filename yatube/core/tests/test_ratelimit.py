@@ -0,0 +1,269 @@
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.cache import SQLiteCache
+from core.ratelimit import take
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+TEMP_DIR = tempfile.mkdtemp()
+
+
+class SQLiteCacheTest(SimpleTestCase):
+
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, True)
+        self.cache = SQLiteCache(f'{location}/cache.sqlite3', {})
+
+    def test_values_round_trip(self):
+        self.cache.set('number', 5)
+        self.cache.set('object', {'a': [1, 2]})
+        self.assertEqual(self.cache.get('number'), 5)
+        self.assertEqual(self.cache.get('object'), {'a': [1, 2]})
+        self.assertIsNone(self.cache.get('missing'))
+        self.cache.delete('number')
+        self.assertFalse(self.cache.has_key('number'))
+
+    def test_add_and_incr(self):
+        self.assertTrue(self.cache.add('key', 1))
+        self.assertFalse(self.cache.add('key', 100))
+        self.assertEqual(self.cache.incr('key', 10), 11)
+        self.assertEqual(self.cache.incr('key', -1), 10)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_advance_raises_floor(self):
+        self.cache.set('key', 10)
+        self.assertEqual(self.cache.advance('key', 5, 100), 105)
+        self.assertEqual(self.cache.advance('key', 5, 100), 110)
+        with self.assertRaises(ValueError):
+            self.cache.advance('missing', 5, 100)
+
+    def test_expired_keys_are_gone(self):
+        self.cache.set('key', 1, timeout=0.05)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('key'))
+        with self.assertRaises(ValueError):
+            self.cache.incr('key')
+        self.assertTrue(self.cache.add('key', 2))
+        self.assertEqual(self.cache.get('key'), 2)
+
+    def test_many_keys_round_trip(self):
+        values = {f'key{number}': number for number in range(1200)}
+        self.assertEqual(self.cache.set_many(values), [])
+        self.assertEqual(
+            self.cache.get_many([*values, 'missing']), values
+        )
+        self.cache.delete_many(list(values)[:1000])
+        self.assertEqual(
+            self.cache.get_many(values),
+            {key: values[key] for key in list(values)[1000:]}
+        )
+
+    def test_incr_is_atomic_across_connections(self):
+        self.cache.set('key', 0)
+
+        def worker():
+            for _ in range(100):
+                self.cache.incr('key')
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.get('key'), 800)
+
+
+class SQLiteCacheTransactionTest(SQLiteCacheTest):
+    """Те же проверки для SQLite без UPDATE ... RETURNING."""
+
+    def setUp(self):
+        super().setUp()
+        self.cache.single_statement = False
+
+
+def slow(func):
+    def wrapper(*args, **kwargs):
+        time.sleep(0.01)
+        return func(*args, **kwargs)
+    return wrapper
+
+
+class TokenBucketTest(SimpleTestCase):
+
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, True)
+        self.cache = SQLiteCache(f'{location}/cache.sqlite3', {})
+
+    def take(self, now_ms, rate='3/s'):
+        return take(self.cache, 'bucket', rate, now_ms)
+
+    def test_burst_then_steady_rate(self):
+        now = 1_000_000
+        self.assertEqual([self.take(now) for _ in range(3)], [0, 0, 0])
+        self.assertEqual(self.take(now), 333)
+        self.assertEqual(self.take(now + 100), 233, 'Отказ не тратит жетон')
+        self.assertEqual(self.take(now + 333), 0)
+        self.assertEqual(self.take(now + 333), 333)
+
+    def test_idle_bucket_refills(self):
+        now = 1_000_000
+        for _ in range(3):
+            self.take(now)
+        now += 60_000
+        self.assertEqual([self.take(now) for _ in range(3)], [0, 0, 0])
+        self.assertGreater(self.take(now), 0)
+
+    def test_idle_bucket_is_not_overdrawn_concurrently(self):
+        """Одновременные запросы к простаивавшему ведру не теряют жетонов."""
+        now = 1_000_000
+        for _ in range(3):
+            self.take(now)
+        now += 60_000
+        barrier = threading.Barrier(8)
+        results = []
+
+        def worker():
+            barrier.wait()
+            results.append(self.take(now))
+
+        # Между обращениями к кэшу успевают вклиниться другие запросы.
+        with mock.patch.object(
+            self.cache, '_db', side_effect=slow(self.cache._db)
+        ):
+            threads = [threading.Thread(target=worker) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(results.count(0), 3)
+
+
+@override_settings(
+    RATELIMIT_ENABLED=True,
+    RATELIMITS={
+        'add_comment': {'user': '2/m', 'ip': '3/m'},
+        'post_create': {'user': '1/m'},
+    },
+    CACHES={
+        **settings.CACHES,
+        'ratelimit': {
+            'BACKEND': 'core.cache.SQLiteCache',
+            'LOCATION': f'{TEMP_DIR}/ratelimit.sqlite3',
+        },
+    },
+)
+class RateLimitViewTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        cls.users = [
+            User.objects.create_user(username=f'user{i}') for i in range(3)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def setUp(self):
+        caches['ratelimit'].clear()
+
+    def comment(self, user, ip='10.0.0.1'):
+        client = Client(REMOTE_ADDR=ip)
+        client.force_login(user)
+        return client.post(
+            reverse(
+                'posts:add_comment',
+                kwargs={'post_id': RateLimitViewTest.post.pk}
+            ),
+            {'text': 'Комментарий'}
+        )
+
+    def test_user_and_ip_buckets(self):
+        first, second, third = RateLimitViewTest.users
+        self.assertEqual(
+            [self.comment(first).status_code for _ in range(3)],
+            [302, 302, 429]
+        )
+        response = self.comment(first)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertContains(
+            response, 'Слишком много запросов', status_code=429
+        )
+
+        self.assertEqual(self.comment(second).status_code, 302)
+        self.assertEqual(
+            self.comment(second).status_code, 429, 'Исчерпано ведро IP'
+        )
+        self.assertEqual(
+            self.comment(third, ip='10.0.0.2').status_code, 302
+        )
+        self.assertEqual(Comment.objects.count(), 4)
+
+    def test_rejected_request_keeps_user_token(self):
+        first, second, _ = RateLimitViewTest.users
+        for _ in range(2):
+            self.comment(first)
+        self.assertEqual(self.comment(second).status_code, 302)
+        self.assertEqual(
+            self.comment(second).status_code, 429, 'Исчерпано ведро IP'
+        )
+        self.assertEqual(
+            self.comment(second, ip='10.0.0.2').status_code, 302
+        )
+        self.assertEqual(self.comment(second, ip='10.0.0.3').status_code, 429)
+
+    def test_unavailable_cache_lets_requests_through(self):
+        error = sqlite3.OperationalError('database is locked')
+        with mock.patch('core.ratelimit.take', side_effect=error):
+            with self.assertLogs('core.ratelimit', 'ERROR'):
+                response = self.comment(RateLimitViewTest.users[0])
+        self.assertEqual(response.status_code, 302)
+
+    def test_only_listed_methods_are_limited(self):
+        client = Client()
+        client.force_login(RateLimitViewTest.users[0])
+        url = reverse('posts:post_create')
+        for _ in range(3):
+            self.assertEqual(client.get(url).status_code, 200)
+        client.post(url, {'text': 'Первый'})
+        response = client.post(url, {'text': 'Второй'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(Post.objects.filter(text='Второй').count(), 0)
+
+    def test_rejected_upload_is_not_read(self):
+        client = Client()
+        client.force_login(RateLimitViewTest.users[1])
+        url = reverse('posts:post_create')
+        client.post(url, {'text': 'Первый'})
+        with mock.patch('posts.decorators.LimitedUploadHandler') as handler:
+            response = client.post(url, {'text': 'Второй'})
+        self.assertEqual(response.status_code, 429)
+        handler.assert_not_called()
+
+    def test_disabled_limiter_lets_everything_through(self):
+        with self.settings(RATELIMIT_ENABLED=False):
+            statuses = {
+                self.comment(RateLimitViewTest.users[0]).status_code
+                for _ in range(5)
+            }
+        self.assertEqual(statuses, {302})
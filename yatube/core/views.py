@@ -1,5 +1,8 @@
 from http import HTTPStatus as hs
 
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.cache import cache
+from django.http import JsonResponse
 from django.shortcuts import render
 
 
@@ -22,3 +25,20 @@ def server_error(request):
         'core/500.html',
         status=hs.INTERNAL_SERVER_ERROR.value
     )
+
+
+def too_many_requests(request, retry_after):
+    response = render(
+        request,
+        'core/429.html',
+        {'retry_after': retry_after},
+        status=hs.TOO_MANY_REQUESTS.value
+    )
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+@staff_member_required
+def cache_stats(request):
+    stats = getattr(cache, 'stats', None)
+    return JsonResponse(stats() if stats else {})
@@ -0,0 +1,202 @@
+"""
+JSON API для чтения лент, постов и комментариев.
+
+Списки листаются курсором (параметр cursor, значения next и previous
+из ответа), размер страницы задается параметром limit. Параметр fields
+ограничивает набор полей объектов: ?fields=id,text. Ответы сжаты gzip,
+если клиент его принимает, и поддерживают условные запросы по ETag.
+"""
+import hashlib
+from functools import wraps
+
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET
+
+from yatube.settings import (API_MAX_PAGE_SIZE, COMMENTS_BY_PAGE,
+                             POSTS_BY_PAGE)
+
+from .conditional import (conditional_page, group_scopes, index_scopes,
+                          patch_page_caching, post_detail_scopes,
+                          profile_scopes)
+from .feed import follow_feed
+from .loader import load
+from .models import Group, Post, User
+from .utils import CURSOR_PARAM, CursorPaginator, comments_page
+
+POST_FIELDS = {
+    'id': lambda post: post.pk,
+    'text': lambda post: post.text,
+    'pub_date': lambda post: post.pub_date.isoformat(),
+    'author': lambda post: post.author.username,
+    'group': lambda post: post.group.slug if post.group_id else None,
+    'image': lambda post: post.image.url if post.image else None,
+}
+
+COMMENT_FIELDS = {
+    'id': lambda comment: comment.pk,
+    'text': lambda comment: comment.text,
+    'created': lambda comment: comment.created.isoformat(),
+    'author': lambda comment: comment.author.username,
+    'post': lambda comment: comment.post_id,
+}
+
+
+class ApiError(Exception):
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def json_response(data, status=200):
+    """Компактный JSON: без пробелов и без экранирования кириллицы."""
+    return JsonResponse(
+        data,
+        status=status,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')}
+    )
+
+
+def api_view(view):
+    """Отдает ApiError как JSON-ответ с кодом ошибки."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as error:
+            return json_response({'detail': error.detail}, error.status)
+    return gzip_page(require_GET(wrapper))
+
+
+def get_fields(request, available):
+    """Поля из параметра fields; все поля, если параметра нет."""
+    requested = request.GET.get('fields')
+    if not requested:
+        return list(available)
+    fields = [name for name in requested.split(',') if name]
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise ApiError(400, f'Неизвестные поля: {", ".join(unknown)}')
+    return fields
+
+
+def get_limit(request, default):
+    limit = request.GET.get('limit')
+    if limit is None:
+        return default
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ApiError(400, 'limit должен быть целым числом')
+    if not 1 <= limit <= API_MAX_PAGE_SIZE:
+        raise ApiError(400, f'limit должен быть от 1 до {API_MAX_PAGE_SIZE}')
+    return limit
+
+
+def serialize(obj, serializers, fields):
+    return {name: serializers[name](obj) for name in fields}
+
+
+def page_data(page, serializers, fields):
+    return {
+        'results': [serialize(obj, serializers, fields) for obj in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }
+
+
+def post_page(request, post_list):
+    fields = get_fields(request, POST_FIELDS)
+    paginator = CursorPaginator(
+        post_list, get_limit(request, POSTS_BY_PAGE)
+    )
+    page = paginator.get_page(request.GET.get(CURSOR_PARAM))
+    return json_response(page_data(page, POST_FIELDS, fields))
+
+
+def not_found():
+    return ApiError(404, 'Не найдено')
+
+
+def posts_scopes(request):
+    """Области ленты: общая, группы, автора или их пересечения."""
+    scopes = []
+    filters = (('group', group_scopes), ('author', profile_scopes))
+    for param, scopes_func in filters:
+        value = request.GET.get(param)
+        if value is None:
+            continue
+        found = scopes_func(request, value)
+        if found is None:
+            return None
+        scopes.extend(found)
+    return scopes or index_scopes(request)
+
+
+def comments_scopes(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return None
+    return [f'comments:{post_id}']
+
+
+@api_view
+@conditional_page(posts_scopes, personal=False)
+def index(request):
+    """Лента постов; ?group=<slug> и ?author=<username> сужают ее."""
+    post_list = Post.objects.for_feed()
+    slug = request.GET.get('group')
+    if slug is not None:
+        group = Group.objects.filter(slug=slug).first()
+        if group is None:
+            raise not_found()
+        post_list = group.posts.for_feed()
+    username = request.GET.get('author')
+    if username is not None:
+        author = User.objects.filter(username=username).first()
+        if author is None:
+            raise not_found()
+        post_list = post_list.filter(author=author)
+    return post_page(request, post_list)
+
+
+@api_view
+@conditional_page(post_detail_scopes, personal=False)
+def post_detail(request, post_id):
+    fields = get_fields(request, POST_FIELDS)
+    post = load(request, Post, post_id)
+    if post is None:
+        raise not_found()
+    return json_response(serialize(post, POST_FIELDS, fields))
+
+
+@api_view
+@conditional_page(comments_scopes, personal=False)
+def post_comments(request, post_id):
+    fields = get_fields(request, COMMENT_FIELDS)
+    post = Post.objects.only('id').filter(pk=post_id).first()
+    if post is None:
+        raise not_found()
+    page = comments_page(
+        post,
+        request.GET.get(CURSOR_PARAM),
+        get_limit(request, COMMENTS_BY_PAGE)
+    )
+    return json_response(page_data(page, COMMENT_FIELDS, fields))
+
+
+@api_view
+def follow_index(request):
+    """
+    Лента подписок. Общей версии кэша у нее нет, поэтому ETag считается
+    по телу ответа: 304 экономит трафик, но не работу сервера.
+    """
+    if not request.user.is_authenticated:
+        raise ApiError(401, 'Требуется вход')
+    response = post_page(request, follow_feed(request.user))
+    etag = quote_etag(hashlib.md5(response.content).hexdigest())
+    response['ETag'] = etag
+    patch_page_caching(request, response)
+    return get_conditional_response(request, etag=etag, response=response)
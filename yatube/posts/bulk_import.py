@@ -0,0 +1,395 @@
+"""
+Загрузка постов, комментариев и подписок из NDJSON в обход сигналов.
+
+Формат строк совпадает с выгрузкой posts.export:
+    posts     {"id", "author", "group", "text", "pub_date", "image"}
+    comments  {"id", "post_id", "author", "text", "created"}
+    follows   {"user", "author"}
+Авторы и подписчики задаются username, группы — slug. Посты
+и комментарии получают новые pk, а их id из файла записываются
+в ImportedId: по нему комментарии находят свои посты, а повторная
+загрузка тех же строк их пропускает. Поэтому загружать можно и в базу,
+где уже есть свои посты с теми же id.
+"""
+import itertools
+import json
+import multiprocessing
+import os
+from collections import deque
+
+from django.db import connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.db import atomic
+
+from .feed import materialize_feeds
+from .fragments import GROUPS, forget, invalidate
+from .models import Comment, Follow, Group, ImportedId, Post, User
+from .search import index_objects
+from .seed import explicit_dates, last_pk, new_pks
+from .stats import rebuild_stats
+
+POSTS = ImportedId.POSTS
+COMMENTS = ImportedId.COMMENTS
+FOLLOWS = 'follows'
+
+REPORTED_ERRORS = 20
+
+
+class RowError(ValueError):
+    pass
+
+
+def _field(data, name, types, required=True):
+    value = data.get(name)
+    if value is None and not required:
+        return None
+    if not isinstance(value, types) or isinstance(value, bool):
+        raise RowError(f'поле {name}: неверное значение {value!r}')
+    return value
+
+
+def _text(data, name='text'):
+    text = _field(data, name, str)
+    if not text.strip():
+        raise RowError(f'поле {name}: пустой текст')
+    return text
+
+
+def _date(data, name):
+    raw = _field(data, name, str)
+    try:
+        value = parse_datetime(raw)
+    except ValueError:
+        value = None
+    if value is None:
+        raise RowError(f'поле {name}: неверная дата {raw!r}')
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+def _usernames(names):
+    return dict(
+        User.objects.filter(username__in=set(names)).values_list(
+            'username', 'pk'
+        )
+    )
+
+
+def _lookup(mapping, key, name):
+    if key not in mapping:
+        raise RowError(f'поле {name}: {key!r} не найден')
+    return mapping[key]
+
+
+def _parse(lines, parse_row):
+    """Разбирает строки пачки; ошибки — пары (номер строки, текст)."""
+    rows, errors = [], []
+    for number, line in lines:
+        try:
+            data = json.loads(line)
+            if not isinstance(data, dict):
+                raise RowError('строка не JSON-объект')
+            rows.append((number, parse_row(data)))
+        except (ValueError, RowError) as error:
+            errors.append((number, str(error)))
+    return rows, errors
+
+
+def _resolve(rows, errors, resolve_row):
+    """Заменяет ссылки строк на pk; строки без пары уходят в ошибки."""
+    resolved = []
+    for number, row in rows:
+        try:
+            resolved.append(resolve_row(row))
+        except RowError as error:
+            errors.append((number, str(error)))
+    return resolved, errors
+
+
+def _unique(rows, key):
+    """Первая из строк с одинаковым ключом."""
+    seen = set()
+    return [
+        row for row in rows
+        if key(row) not in seen and not seen.add(key(row))
+    ]
+
+
+def validate_posts(lines):
+    rows, errors = _parse(lines, lambda data: (
+        _field(data, 'id', int),
+        _field(data, 'author', str),
+        _field(data, 'group', str, required=False),
+        _text(data),
+        _date(data, 'pub_date'),
+        _field(data, 'image', str, required=False) or '',
+    ))
+    users = _usernames(row[1] for _, row in rows)
+    groups = dict(Group.objects.values_list('slug', 'pk'))
+    rows, errors = _resolve(rows, errors, lambda row: (
+        row[0],
+        _lookup(users, row[1], 'author'),
+        None if row[2] is None else _lookup(groups, row[2], 'group'),
+        *row[3:],
+    ))
+    return rows, errors
+
+
+def validate_comments(lines):
+    rows, errors = _parse(lines, lambda data: (
+        _field(data, 'id', int),
+        _field(data, 'post_id', int),
+        _field(data, 'author', str),
+        _text(data),
+        _date(data, 'created'),
+    ))
+    users = _usernames(row[2] for _, row in rows)
+    posts = dict(ImportedId.objects.filter(
+        kind=POSTS, source_id__in={row[1] for _, row in rows}
+    ).values_list('source_id', 'object_id'))
+    # Загруженный пост могли удалить с сайта.
+    existing = set(Post.objects.filter(
+        pk__in=posts.values()
+    ).values_list('pk', flat=True))
+    posts = {
+        source_id: pk for source_id, pk in posts.items() if pk in existing
+    }
+    rows, errors = _resolve(rows, errors, lambda row: (
+        row[0],
+        _lookup(posts, row[1], 'post_id'),
+        _lookup(users, row[2], 'author'),
+        *row[3:],
+    ))
+    return rows, errors
+
+
+def _follow_pair(users, row):
+    pair = (_lookup(users, row[0], 'user'), _lookup(users, row[1], 'author'))
+    if pair[0] == pair[1]:
+        raise RowError('подписка на самого себя')
+    return pair
+
+
+def validate_follows(lines):
+    rows, errors = _parse(lines, lambda data: (
+        _field(data, 'user', str),
+        _field(data, 'author', str),
+    ))
+    users = _usernames(itertools.chain.from_iterable(row for _, row in rows))
+    return _resolve(rows, errors, lambda row: _follow_pair(users, row))
+
+
+def _new_rows(kind, rows):
+    """Строки пачки, чьи id еще не загружались, без повторов."""
+    existing = set(ImportedId.objects.filter(
+        kind=kind, source_id__in=[row[0] for row in rows]
+    ).values_list('source_id', flat=True))
+    return _unique(
+        [row for row in rows if row[0] not in existing],
+        key=lambda row: row[0]
+    )
+
+
+def _insert(kind, rows, objs, date_field):
+    """
+    Вставляет объекты с новыми pk и запоминает, из каких id файла они
+    получены. Пачка пишется в транзакции записи, поэтому вставленные
+    строки — ровно строки с pk больше прежнего последнего.
+    """
+    model = type(objs[0])
+    last = last_pk(model)
+    with explicit_dates(model._meta.get_field(date_field)):
+        model.objects.bulk_create(objs)
+    for obj, pk in zip(objs, new_pks(model, last)):
+        obj.pk = pk
+    ImportedId.objects.bulk_create(
+        ImportedId(kind=kind, source_id=row[0], object_id=obj.pk)
+        for row, obj in zip(rows, objs)
+    )
+
+
+def write_posts(rows, index):
+    rows = _new_rows(POSTS, rows)
+    posts = [
+        Post(
+            author_id=author_id, group_id=group_id, text=text,
+            pub_date=pub_date, image=image,
+        )
+        for _, author_id, group_id, text, pub_date, image in rows
+    ]
+    if posts:
+        _insert(POSTS, rows, posts, 'pub_date')
+    if index:
+        index_objects(posts)
+    return len(posts)
+
+
+def write_comments(rows, index):
+    rows = _new_rows(COMMENTS, rows)
+    comments = [
+        Comment(
+            post_id=post_id, author_id=author_id, text=text,
+            created=created,
+        )
+        for _, post_id, author_id, text, created in rows
+    ]
+    if comments:
+        _insert(COMMENTS, rows, comments, 'created')
+    if index:
+        index_objects(comments)
+    forget(*{f'comments:{comment.post_id}' for comment in comments})
+    return len(comments)
+
+
+def write_follows(rows, index):
+    existing = set(Follow.objects.filter(
+        user_id__in={user_id for user_id, _ in rows},
+        author_id__in={author_id for _, author_id in rows},
+    ).values_list('user_id', 'author_id'))
+    follows = [
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id, author_id in _unique(rows, key=lambda row: row)
+        if (user_id, author_id) not in existing
+    ]
+    # Конфликты по unique_subscription возможны, только если подписку
+    # параллельно создал сайт; такие строки просто не вставятся.
+    Follow.objects.bulk_create(follows, ignore_conflicts=True)
+    return len(follows)
+
+
+KINDS = {
+    POSTS: (validate_posts, write_posts, Post),
+    COMMENTS: (validate_comments, write_comments, Comment),
+    FOLLOWS: (validate_follows, write_follows, Follow),
+}
+
+
+def _validate(job):
+    kind, lines = job
+    validate = KINDS[kind][0]
+    return validate(lines)
+
+
+def read_batches(file, batch_size, skip=0):
+    """
+    Пачки непустых строк файла вместе с их номерами, начиная
+    со строки skip + 1. Файл читается построчно.
+    """
+    lines = (
+        (number, line)
+        for number, line in enumerate(file, start=1)
+        if number > skip and line.strip()
+    )
+    while True:
+        batch = list(itertools.islice(lines, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _validated(kind, batches, workers):
+    """
+    Проверенные пачки по порядку. С workers > 1 пачки проверяются
+    в дочерних процессах, пока родитель пишет предыдущие; в работе
+    не больше 2 * workers пачек, чтобы не читать весь файл в память.
+    """
+    if workers <= 1:
+        for batch in batches:
+            yield batch[-1][0], _validate((kind, batch))
+        return
+    connections.close_all()
+    with multiprocessing.Pool(workers) as pool:
+        pending = deque()
+        for batch in itertools.chain(batches, [None]):
+            if batch is not None:
+                pending.append((
+                    batch[-1][0],
+                    pool.apply_async(_validate, ((kind, batch),)),
+                ))
+            while pending and (
+                batch is None or len(pending) >= 2 * workers
+            ):
+                last_line, result = pending.popleft()
+                yield last_line, result.get()
+
+
+class Checkpoint:
+    """
+    Номер последней записанной строки файла. Сохраняется после каждой
+    пачки, поэтому прерванная загрузка продолжается с места остановки.
+    """
+
+    def __init__(self, path, kind):
+        self.path = path
+        self.kind = kind
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, encoding='utf-8') as file:
+            state = json.load(file)
+        if state.get('kind') != self.kind:
+            return 0
+        return state['line']
+
+    def save(self, line):
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump({'kind': self.kind, 'line': line}, file)
+        os.replace(temporary, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def import_rows(kind, path, batch_size=5000, workers=1, restart=False,
+                index=True, checkpoint_path=None, report=print):
+    """
+    Загружает файл path пачками по batch_size строк: одна пачка —
+    одна проверка ссылок и одна транзакция с bulk_create. Уже
+    загруженные посты и комментарии (по id из файла) и существующие
+    подписки пропускаются. Поисковый индекс пополняется в той же
+    транзакции, а счетчики, ленты и версии кэша пересчитываются один
+    раз в конце. Прогресс хранится в checkpoint_path (по умолчанию
+    path.checkpoint).
+    Возвращает словарь с числом записанных, пропущенных и ошибочных
+    строк.
+    """
+    write = KINDS[kind][1]
+    checkpoint = Checkpoint(checkpoint_path or f'{path}.checkpoint', kind)
+    if restart:
+        checkpoint.clear()
+    start = checkpoint.load()
+    if start:
+        report(f'Продолжение со строки {start + 1}')
+
+    totals = {'written': 0, 'skipped': 0, 'errors': 0}
+    with open(path, encoding='utf-8') as file:
+        batches = read_batches(file, batch_size, skip=start)
+        for last_line, (rows, errors) in _validated(kind, batches, workers):
+            # Пачка читает ImportedId и последний pk, а потом пишет.
+            with atomic(immediate=True):
+                written = write(rows, index)
+            checkpoint.save(last_line)
+            totals['written'] += written
+            totals['skipped'] += len(rows) - written
+            for number, message in errors:
+                if totals['errors'] < REPORTED_ERRORS:
+                    report(f'Строка {number}: {message}')
+                totals['errors'] += 1
+            report(f'Строк обработано: {last_line}')
+
+    rebuild_stats(batch_size=batch_size)
+    if kind in (POSTS, FOLLOWS):
+        report(f'Записей в лентах: {materialize_feeds()}')
+    invalidate('index', GROUPS)
+    checkpoint.clear()
+    report(
+        f'Записано: {totals["written"]}, пропущено: {totals["skipped"]}, '
+        f'ошибок: {totals["errors"]}'
+    )
+    return totals
@@ -0,0 +1,125 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import http_date, quote_etag
+
+from .fragments import GROUPS, get_version, version_time
+from .loader import load
+from .models import Group, Post, User
+from .notifications import unread_count
+
+
+def page_etag(request, version, personal=True):
+    """
+    ETag страницы: версия областей, зритель и параметры запроса. Для
+    страниц с шапкой (personal) в него входит и число непрочитанных
+    уведомлений зрителя.
+    """
+    viewer = 'anon'
+    if request.user.is_authenticated:
+        viewer = request.user.pk
+        if personal:
+            viewer = f'{viewer}:{unread_count(viewer)}'
+    raw = (
+        f'{request.resolver_match.view_name}|{version}|{viewer}|'
+        f'{request.GET.urlencode()}'
+    )
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def patch_page_caching(request, response):
+    """
+    Анонимные страницы одинаковы для всех, и их может хранить прокси;
+    страницы пользователя хранит только его браузер. В обоих случаях
+    перед показом кэш обязан перепроверить страницу по ETag.
+    """
+    if request.user.is_authenticated:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=settings.ANONYMOUS_PAGE_MAX_AGE,
+            must_revalidate=True,
+        )
+    patch_vary_headers(response, ('Cookie',))
+
+
+def conditional_page(scopes_func, personal=True):
+    """
+    Отвечает 304 Not Modified без выполнения представления, если версия
+    областей кэша из scopes_func(request, **kwargs) не менялась с
+    прошлого ответа клиенту. Last-Modified — время последней смены этих
+    версий, поэтому учитываются и правки, и удаления, а не только новые
+    записи.
+    scopes_func возвращает None, если объекта нет: тогда страницу
+    отдает само представление (обычно 404). Версия остается в
+    request.page_version для кэша страниц. personal=False — для ответов
+    без шапки сайта, см. page_etag.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            scopes = scopes_func(request, **kwargs)
+            if scopes is None:
+                return view(request, *args, **kwargs)
+            version = get_version(*scopes)
+            etag = page_etag(request, version, personal)
+            last_modified = version_time(version)
+            timestamp = last_modified and int(last_modified.timestamp())
+
+            response = get_conditional_response(
+                request, etag=etag, last_modified=timestamp
+            )
+            if response is None:
+                request.page_version = version
+                response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+                if timestamp:
+                    response['Last-Modified'] = http_date(timestamp)
+                patch_page_caching(request, response)
+            return response
+        return wrapper
+    return decorator
+
+
+def index_scopes(request):
+    return ['index', GROUPS]
+
+
+def group_scopes(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    if group_id is None:
+        return None
+    return [f'group:{group_id}', GROUPS]
+
+
+def profile_scopes(request, username):
+    user_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if user_id is None:
+        return None
+    return [f'profile:{user_id}', f'follows:{user_id}', GROUPS]
+
+
+def post_detail_scopes(request, post_id):
+    post = load(request, Post, post_id)
+    if post is None:
+        return None
+    scopes = [
+        f'post:{post_id}',
+        f'comments:{post_id}',
+        f'profile:{post.author_id}',
+    ]
+    if post.group_id is not None:
+        scopes.append(f'group:{post.group_id}')
+    return scopes
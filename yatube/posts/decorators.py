@@ -1,15 +1,34 @@
 from functools import wraps
 
-from django.shortcuts import get_object_or_404, redirect
+from django.shortcuts import redirect
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 
+from .images import LimitedUploadHandler
+from .loader import load_or_404
 from .models import Post
 
 
 def author_required(func):
     @wraps(func)
     def is_author(request, post_id, *args, **kwargs):
-        post = get_object_or_404(Post, pk=post_id)
-        if post.author.id == request.user.id:
+        post = load_or_404(request, Post, post_id)
+        if post.author_id == request.user.id:
             return func(request, post_id, *args, **kwargs)
         return redirect('posts:post_detail', post_id=post_id)
     return is_author
+
+
+def limited_uploads(func):
+    """
+    Принимает файлы запроса через LimitedUploadHandler. Обработчики
+    можно сменить только до чтения тела, а CsrfViewMiddleware читает
+    его раньше вью, поэтому CSRF проверяется здесь, после смены.
+    """
+    protected = csrf_protect(func)
+
+    @csrf_exempt
+    @wraps(func)
+    def with_limit(request, *args, **kwargs):
+        request.upload_handlers.insert(0, LimitedUploadHandler(request))
+        return protected(request, *args, **kwargs)
+    return with_limit
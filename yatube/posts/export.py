@@ -0,0 +1,141 @@
+import csv
+import itertools
+import json
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from .models import Comment, Post
+
+NDJSON = 'ndjson'
+CSV = 'csv'
+
+CONTENT_TYPES = {
+    NDJSON: 'application/x-ndjson; charset=utf-8',
+    CSV: 'text/csv; charset=utf-8',
+}
+
+CHUNK_SIZE = 2000
+
+
+class Export:
+    """
+    Описание выгрузки: модель, колонки (имя в файле и путь для
+    values_list) и поля, по которым фильтруются группа и даты.
+    """
+
+    def __init__(self, model, columns, date_field, group_field):
+        self.model = model
+        self.columns = columns
+        self.date_field = date_field
+        self.group_field = group_field
+
+    @property
+    def header(self):
+        return [name for name, _ in self.columns]
+
+    def queryset(self, group=None, since=None, until=None):
+        queryset = self.model.objects.all()
+        if group is not None:
+            queryset = queryset.filter(**{self.group_field: group.pk})
+        if since is not None:
+            queryset = queryset.filter(
+                **{f'{self.date_field}__gte': start_of_day(since)}
+            )
+        if until is not None:
+            queryset = queryset.filter(**{
+                f'{self.date_field}__lt': start_of_day(
+                    until + timedelta(days=1)
+                )
+            })
+        return queryset.order_by('pk').values_list(
+            *(path for _, path in self.columns)
+        )
+
+
+EXPORTS = {
+    'posts': Export(
+        Post,
+        columns=(
+            ('id', 'id'),
+            ('pub_date', 'pub_date'),
+            ('author_id', 'author_id'),
+            ('author', 'author__username'),
+            ('group', 'group__slug'),
+            ('text', 'text'),
+            ('image', 'image'),
+        ),
+        date_field='pub_date',
+        group_field='group_id',
+    ),
+    'comments': Export(
+        Comment,
+        columns=(
+            ('id', 'id'),
+            ('created', 'created'),
+            ('post_id', 'post_id'),
+            ('author_id', 'author_id'),
+            ('author', 'author__username'),
+            ('text', 'text'),
+        ),
+        date_field='created',
+        group_field='post__group_id',
+    ),
+}
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class Echo:
+    """Файлоподобный объект для csv.writer: возвращает строку, а не пишет."""
+
+    def write(self, value):
+        return value
+
+
+def ndjson_lines(header, rows):
+    for row in rows:
+        yield json.dumps(
+            dict(zip(header, map(plain, row))),
+            ensure_ascii=False,
+            separators=(',', ':'),
+        ) + '\n'
+
+
+def csv_lines(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(map(plain, row))
+
+
+WRITERS = {
+    NDJSON: ndjson_lines,
+    CSV: csv_lines,
+}
+
+
+def export(kind, file_format=NDJSON, group=None, since=None, until=None,
+           chunk_size=CHUNK_SIZE):
+    """
+    Выгрузка kind в формате file_format кусками по chunk_size строк.
+    Строки читаются из базы итератором без кэша queryset, поэтому
+    память не зависит от размера таблицы; фильтры since и until —
+    даты включительно.
+    """
+    spec = EXPORTS[kind]
+    rows = spec.queryset(group, since, until).iterator(chunk_size=chunk_size)
+    lines = WRITERS[file_format](spec.header, rows)
+    while True:
+        chunk = ''.join(itertools.islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,224 @@
+import copy
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Exists, OuterRef, Q
+
+from .models import FeedEntry, Follow, Post, User, UserStats
+
+
+def fanout_limit():
+    return settings.FEED_FANOUT_LIMIT
+
+
+def follower_count(author_id):
+    """
+    Подписчики автора из UserStats, а если строки счетчиков нет (данные
+    загружены в обход сигналов) — по Follow. Так же их считает
+    hot_authors.
+    """
+    followers = UserStats.objects.filter(user_id=author_id).values_list(
+        'followers', flat=True
+    ).first()
+    if followers is None:
+        return Follow.objects.filter(author_id=author_id).count()
+    return followers
+
+
+def is_hot(author_id):
+    """Горячий автор: посты не рассылаются, а подмешиваются при чтении."""
+    return follower_count(author_id) > fanout_limit()
+
+
+def hot_authors(users):
+    """
+    pk горячих авторов среди users; запросная версия is_hot. Follow
+    группируется только для авторов без строки UserStats.
+    """
+    limit = fanout_limit()
+    crowded = Follow.objects.order_by().values('author').annotate(
+        total=Count('pk')
+    ).filter(total__gt=limit).values('author')
+    return users.filter(
+        Q(stats__followers__gt=limit)
+        | Q(stats__isnull=True) & Q(pk__in=crowded)
+    ).values_list('pk', flat=True)
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_hot(post.author_id):
+        return
+    followers = Follow.objects.filter(author_id=post.author_id)
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers.values_list('user_id', flat=True)
+        ],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+def backfill_feed(follow):
+    """Добавляет в ленту подписчика уже опубликованные посты автора."""
+    if is_hot(follow.author_id):
+        return
+    posts = Post.objects.filter(author_id=follow.author_id).values_list(
+        'pk', 'pub_date'
+    )
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=follow.user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts.iterator()
+        ],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+def materialize_feeds(author_id=None):
+    """
+    Одним INSERT ... SELECT раскладывает по лентам все посты авторов,
+    на которых есть подписка, — для данных, загруженных в обход
+    сигналов. С author_id — только посты этого автора. Уже существующие
+    записи и горячие авторы пропускаются.
+    """
+    authors = User.objects.all()
+    if author_id is not None:
+        authors = authors.filter(pk=author_id)
+    hot_sql, params = hot_authors(authors).query.sql_with_params()
+    sql = (
+        f'INSERT INTO {FeedEntry._meta.db_table} '
+        '(user_id, post_id, pub_date) '
+        'SELECT f.user_id, p.id, p.pub_date '
+        f'FROM {Follow._meta.db_table} f '
+        f'JOIN {Post._meta.db_table} p ON p.author_id = f.author_id '
+        f'WHERE f.author_id NOT IN ({hot_sql}) AND NOT EXISTS ('
+        f'SELECT 1 FROM {FeedEntry._meta.db_table} e '
+        'WHERE e.user_id = f.user_id AND e.post_id = p.id)'
+    )
+    params = list(params)
+    if author_id is not None:
+        sql += ' AND f.author_id = %s'
+        params.append(author_id)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def cool_down(author_id, unfollowed=1):
+    """
+    Вызывается после того, как от автора отписались unfollowed человек.
+    Если автор только что перестал быть горячим, его посты, которые при
+    чтении брались из таблицы постов, раскладываются по лентам всех
+    подписчиков. При обратном переходе ничего делать не нужно: уже
+    разложенные записи остаются, а чтение не повторяет посты, у которых
+    есть запись в ленте. Сравнение идет с числом подписчиков до
+    отписки, а не на равенство с FEED_FANOUT_LIMIT; авторов, остывших
+    из-за смены самого лимита, раскладывает materialize_feeds().
+    """
+    followers = follower_count(author_id)
+    if followers <= fanout_limit() < followers + unfollowed:
+        materialize_feeds(author_id)
+
+
+def prune_feed(follow):
+    FeedEntry.objects.filter(
+        user_id=follow.user_id,
+        post__author_id=follow.author_id,
+    ).delete()
+
+
+def entry_condition(condition):
+    """Условие на (pub_date, pk) поста как условие на запись ленты."""
+    node = Q()
+    node.connector = condition.connector
+    node.negated = condition.negated
+    for child in condition.children:
+        if isinstance(child, Q):
+            node.children.append(entry_condition(child))
+            continue
+        lookup, value = child
+        field, separator, rest = lookup.partition('__')
+        if field == 'pk':
+            field = 'post_id'
+        node.children.append((field + separator + rest, value))
+    return node
+
+
+class FollowFeed:
+    """
+    Лента подписок: записи FeedEntry пользователя и посты горячих
+    авторов, для которых рассылка при записи не выполнялась (fan-out on
+    read). Ключи страницы (pub_date, id поста) выбираются из обеих
+    частей одним UNION ALL: записи ленты приходят по индексу (user,
+    pub_date, post) уже в нужном порядке, сортируются только посты
+    горячих авторов, и SQLite сливает части без общей сортировки. Посты
+    страницы загружаются вторым запросом по первичному ключу.
+
+    Поддерживает то подмножество API QuerySet, которым пользуются
+    Paginator и CursorPaginator: count, срезы, order_by и filter по
+    полям pub_date и pk.
+    """
+    ordered = True
+
+    def __init__(self, user, hot_authors, condition=None, descending=True):
+        self.user = user
+        self.hot_authors = hot_authors
+        self.condition = condition or Q()
+        self.descending = descending
+
+    def _clone(self, **changes):
+        clone = copy.copy(self)
+        clone.__dict__.update(changes)
+        return clone
+
+    def order_by(self, *fields):
+        return self._clone(descending=fields[0].startswith('-'))
+
+    def filter(self, condition):
+        return self._clone(condition=self.condition & condition)
+
+    def keys(self):
+        entries = FeedEntry.objects.filter(
+            entry_condition(self.condition), user=self.user
+        ).order_by().values_list('pub_date', 'post_id')
+        ordering = ('pub_date', 'post_id')
+        if self.descending:
+            ordering = ('-pub_date', '-post_id')
+        if not self.hot_authors:
+            return entries.order_by(*ordering)
+        materialized = FeedEntry.objects.filter(
+            user=self.user, post=OuterRef('pk')
+        )
+        hot = Post.objects.filter(
+            author_id__in=self.hot_authors
+        ).annotate(
+            materialized=Exists(materialized)
+        ).filter(
+            self.condition, materialized=False
+        ).order_by().values_list('pub_date', 'pk')
+        return entries.union(hot, all=True).order_by(*ordering)
+
+    def count(self):
+        return self.keys().order_by().count()
+
+    def exists(self):
+        return bool(self.keys()[:1])
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        ids = [post_id for _, post_id in self.keys()[index]]
+        posts = Post.objects.for_feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+    def __iter__(self):
+        return iter(self[:])
+
+
+def follow_feed(user):
+    """Лента подписок пользователя, см. FollowFeed."""
+    authors = User.objects.filter(following__user=user)
+    return FollowFeed(user, list(hot_authors(authors)))
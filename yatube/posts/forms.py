@@ -1,6 +1,12 @@
+from django import forms
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 
-from .models import Comment, Post
+from .export import CSV, NDJSON
+from .images import ingest_image, is_too_large
+from .models import Comment, Group, Post
 
 
 class PostForm(ModelForm):
@@ -18,6 +24,27 @@ class PostForm(ModelForm):
             'group': 'Группа'
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        image = self.files.get('image')
+        self.image_too_large = bool(image) and is_too_large(image)
+        if self.image_too_large:
+            # Обрезанный обработчиком загрузки файл не передаем в поле,
+            # иначе вместо понятной ошибки будет «битое изображение».
+            self.files = self.files.copy()
+            self.files.pop('image')
+
+    def clean_image(self):
+        if self.image_too_large:
+            limit = settings.IMAGE_MAX_UPLOAD_BYTES // 2 ** 20
+            raise ValidationError(
+                f'Файл слишком большой: допускается не больше {limit} МБ.'
+            )
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            return ingest_image(image)
+        return image
+
 
 class CommentForm(ModelForm):
     class Meta:
@@ -27,3 +54,33 @@ class CommentForm(ModelForm):
         labels = {
             'text': 'Комментарий'
         }
+
+
+class ExportForm(forms.Form):
+    format = forms.ChoiceField(
+        choices=((NDJSON, 'NDJSON'), (CSV, 'CSV')),
+        required=False
+    )
+    group = forms.SlugField(required=False)
+    since = forms.DateField(required=False)
+    until = forms.DateField(required=False)
+
+    def clean_format(self):
+        return self.cleaned_data['format'] or NDJSON
+
+    def clean_group(self):
+        slug = self.cleaned_data['group']
+        if not slug:
+            return None
+        group = Group.objects.filter(slug=slug).first()
+        if group is None:
+            raise ValidationError(f'Группа {slug} не найдена.')
+        return group
+
+    def clean(self):
+        cleaned_data = super().clean()
+        since = cleaned_data.get('since')
+        until = cleaned_data.get('until')
+        if since and until and since > until:
+            raise ValidationError('Начало периода позже его конца.')
+        return cleaned_data
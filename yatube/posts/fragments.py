@@ -0,0 +1,85 @@
+import time
+import uuid
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import caches
+
+VERSION_KEY = 'posts:version:{}'
+GROUPS = 'groups'
+
+
+def _versions():
+    return caches[settings.FRAGMENT_VERSIONS_CACHE]
+
+
+def _token():
+    """Случайный токен с меткой времени выдачи в миллисекундах."""
+    return f'{int(time.time() * 1000):x}-{uuid.uuid4().hex[:8]}'
+
+
+def version_time(version):
+    """
+    Время последнего изменения набора областей — самая поздняя метка
+    среди токенов версии. None, если меток нет.
+    """
+    stamps = [
+        int(token.split('-')[0], 16)
+        for token in version.split('.') if '-' in token
+    ]
+    if not stamps:
+        return None
+    return datetime.fromtimestamp(max(stamps) / 1000, tz=timezone.utc)
+
+
+def get_version(*scopes):
+    """
+    Версия набора областей кэша. Версии хранятся без срока в кэше
+    FRAGMENT_VERSIONS_CACHE, который их не вытесняет. Версия, которой
+    еще нет, выдается заново; метка времени в токене не дает ей
+    совпасть ни с одной прежней.
+    """
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = _versions()
+    found = versions.get_many(keys)
+    missing = {key: _token() for key in keys if key not in found}
+    if missing:
+        versions.set_many(missing, None)
+        found.update(missing)
+    return '.'.join(found[key] for key in keys)
+
+
+def invalidate(*scopes):
+    _versions().set_many(
+        {VERSION_KEY.format(scope): _token() for scope in scopes},
+        None
+    )
+
+
+def forget(*scopes):
+    """
+    Сбрасывает версии удалением ключей: новая версия будет выдана
+    при следующем чтении. В отличие от invalidate ничего не пишет
+    в кэш, поэтому годится для тысяч областей сразу.
+    """
+    _versions().delete_many(
+        [VERSION_KEY.format(scope) for scope in scopes]
+    )
+
+
+def feed_version(scope):
+    return get_version(scope, GROUPS)
+
+
+def post_version(post):
+    if post.group_id is None:
+        return get_version(f'post:{post.pk}')
+    return get_version(f'post:{post.pk}', f'group:{post.group_id}')
+
+
+def post_scopes(post, previous_group_id=None):
+    scopes = {'index', f'post:{post.pk}', f'profile:{post.author_id}'}
+    for group_id in (post.group_id, previous_group_id):
+        if group_id is not None:
+            scopes.add(f'group:{group_id}')
+    return scopes
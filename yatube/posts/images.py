@@ -0,0 +1,118 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from PIL import Image, ImageOps
+from sorl.thumbnail.base import EXTENSIONS
+
+KEPT_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 80, 'method': 4},
+}
+
+MIME_TYPES = {
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+    'GIF': 'image/gif',
+    'WEBP': 'image/webp',
+    'AVIF': 'image/avif',
+}
+
+
+def modern_formats():
+    """Современные форматы, которые умеют писать и Pillow, и sorl."""
+    Image.init()
+    return [
+        name for name in ('AVIF', 'WEBP')
+        if name in Image.SAVE and name in EXTENSIONS
+    ]
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """
+    Пишет загружаемый файл во временный файл на диске, не держа его
+    в памяти. Данные сверх IMAGE_MAX_UPLOAD_BYTES не сохраняются,
+    а файл помечается атрибутом too_large.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.IMAGE_MAX_UPLOAD_BYTES:
+            return None
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.too_large = file_size > settings.IMAGE_MAX_UPLOAD_BYTES
+        return file
+
+
+def is_too_large(upload):
+    return getattr(upload, 'too_large', False) or (
+        upload.size > settings.IMAGE_MAX_UPLOAD_BYTES
+    )
+
+
+def _open(upload):
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError('Не удалось прочитать изображение.')
+    width, height = image.size
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            f'Изображение {width}x{height} слишком большое: допускается '
+            f'не больше {settings.IMAGE_MAX_PIXELS // 10 ** 6} Мп.'
+        )
+    return image
+
+
+def ingest_image(upload):
+    """
+    Проверяет загруженную картинку и пережимает ее: поворачивает по EXIF,
+    уменьшает до IMAGE_MAX_SIDE по большей стороне и удаляет метаданные.
+    Формат сохраняется, если он из KEPT_FORMATS, иначе картинка
+    переводится в PNG (с прозрачностью) или JPEG.
+    """
+    image = _open(upload)
+    if getattr(image, 'is_animated', False):
+        upload.seek(0)
+        return upload
+
+    source_format = image.format
+    max_side = settings.IMAGE_MAX_SIDE
+    image.draft(image.mode, (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    has_alpha = 'A' in image.mode or 'transparency' in image.info
+    if source_format in KEPT_FORMATS:
+        target = source_format
+    else:
+        target = 'PNG' if has_alpha else 'JPEG'
+    if target == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    image.info = {
+        key: value for key, value in image.info.items()
+        if key == 'transparency'
+    }
+
+    buffer = BytesIO()
+    image.save(buffer, target, **SAVE_OPTIONS.get(target, {}))
+    name = os.path.basename(upload.name)
+    if target != source_format:
+        name = f'{os.path.splitext(name)[0]}.{EXTENSIONS[target]}'
+    return SimpleUploadedFile(
+        name, buffer.getvalue(), content_type=MIME_TYPES[target]
+    )
@@ -0,0 +1,48 @@
+from django.http import Http404
+
+from .models import Post
+
+# Выборка каждой модели вместе со связанными строками, которые нужны
+# декораторам, представлениям и шаблонам.
+QUERYSETS = {
+    Post: lambda: Post.objects.select_related('author__stats', 'group'),
+}
+
+
+class IdentityMap:
+    """
+    Объекты, загруженные в рамках одного запроса, по (модель, pk).
+    Повторное обращение к тому же объекту возвращает тот же экземпляр
+    без запроса к базе; отсутствие объекта тоже запоминается.
+    """
+
+    def __init__(self):
+        self._objects = {}
+
+    def get(self, model, pk):
+        key = (model, int(pk))
+        if key not in self._objects:
+            try:
+                obj = QUERYSETS[model]().get(pk=pk)
+            except model.DoesNotExist:
+                obj = None
+            self._objects[key] = obj
+        return self._objects[key]
+
+
+def identity_map(request):
+    if not hasattr(request, 'identity_map'):
+        request.identity_map = IdentityMap()
+    return request.identity_map
+
+
+def load(request, model, pk):
+    """Объект или None; за запрос загружается не больше одного раза."""
+    return identity_map(request).get(model, pk)
+
+
+def load_or_404(request, model, pk):
+    obj = load(request, model, pk)
+    if obj is None:
+        raise Http404(f'{model._meta.object_name} {pk} не найден')
+    return obj
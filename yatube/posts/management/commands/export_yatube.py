@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import CHUNK_SIZE, EXPORTS, export
+from posts.forms import ExportForm
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает все посты или комментарии в NDJSON или CSV потоком, '
+        'не загружая таблицу в память.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS))
+        parser.add_argument('--format', default='')
+        parser.add_argument('--group', default='', help='Слаг группы.')
+        parser.add_argument(
+            '--since', default='', help='Первая дата, ГГГГ-ММ-ДД.'
+        )
+        parser.add_argument(
+            '--until', default='', help='Последняя дата, ГГГГ-ММ-ДД.'
+        )
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument(
+            '--output', help='Файл для выгрузки; по умолчанию stdout.'
+        )
+
+    def handle(self, *args, **options):
+        form = ExportForm({
+            name: options[name]
+            for name in ('format', 'group', 'since', 'until')
+        })
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+
+        chunks = export(
+            options['kind'],
+            form.cleaned_data['format'],
+            group=form.cleaned_data['group'],
+            since=form.cleaned_data['since'],
+            until=form.cleaned_data['until'],
+            chunk_size=options['chunk_size'],
+        )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8',
+                      newline='') as output:
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.notifications import flush
+
+
+class Command(BaseCommand):
+    help = (
+        'Сворачивает в сводки ожидающие события уведомлений, в том числе '
+        'оставшиеся от остановленных процессов.'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Записано событий: {flush()}')
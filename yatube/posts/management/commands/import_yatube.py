@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from posts.bulk_import import KINDS, import_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты, комментарии или подписки из NDJSON-файла '
+        'пачками через bulk_create. Прерванная загрузка продолжается '
+        'с последней записанной пачки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(KINDS))
+        parser.add_argument('path', help='NDJSON-файл, по объекту в строке.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Число процессов, проверяющих пачки параллельно с записью.'
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Начать с начала файла, забыв сохраненный прогресс.'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл прогресса; по умолчанию <path>.checkpoint.'
+        )
+        parser.add_argument(
+            '--no-index',
+            action='store_true',
+            help='Не добавлять строки в поисковый индекс.'
+        )
+
+    def handle(self, *args, **options):
+        import_rows(
+            options['kind'],
+            options['path'],
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            restart=options['restart'],
+            index=not options['no_index'],
+            checkpoint_path=options['checkpoint'],
+            report=self.stdout.write,
+        )
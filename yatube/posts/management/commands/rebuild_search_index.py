@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import reindex
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс постов и комментариев.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        indexed = reindex(batch_size=options['batch_size'])
+        self.stdout.write(f'Проиндексировано документов: {indexed}')
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счетчики пользователей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только сверить счетчики, ничего не записывая.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        mismatched = rebuild_stats(
+            batch_size=options['batch_size'],
+            verify=options['verify']
+        )
+        if options['verify'] and mismatched:
+            raise CommandError(f'Расходятся счетчики у {mismatched} польз.')
+        self.stdout.write(f'Обновлено счетчиков: {mismatched}')
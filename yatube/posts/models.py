@@ -6,20 +6,42 @@ from django.db import models
 User = get_user_model()
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """
+        Выборка для лент: автор и группа подтягиваются одним JOIN,
+        из связанных таблиц читаются только выводимые в шаблоне колонки.
+        """
+        return self.select_related('author', 'group').only(
+            'text',
+            'pub_date',
+            'image',
+            'author',
+            'group',
+            'author__username',
+            'author__first_name',
+            'author__last_name',
+            'group__title',
+            'group__slug',
+        )
+
+
 class Post(models.Model):
     text = models.TextField()
     pub_date = models.DateTimeField(auto_now_add=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
-        related_name='posts'
+        related_name='posts',
+        db_index=False
     )
     group = models.ForeignKey(
         'Group',
         on_delete=models.SET_NULL,
         blank=True,
         null=True,
-        related_name='posts'
+        related_name='posts',
+        db_index=False
     )
     image = models.ImageField(
         'Картинка',
@@ -27,12 +49,38 @@ class Post(models.Model):
         blank=True
     )
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ['-pub_date']
+        # Индексы под сортировку лент; они же заменяют индексы внешних
+        # ключей author и group, которые были бы их префиксами. Индексы
+        # возрастающие: обратный проход по ним дает порядок (-pub_date,
+        # -pk) без сортировки, а прямой — порядок (pub_date, pk).
+        indexes = [
+            models.Index(fields=['pub_date'], name='post_pub_date_idx'),
+            models.Index(
+                fields=['group', 'pub_date'],
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', 'pub_date'],
+                name='post_author_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[0:15]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Группа на момент загрузки: с ней сигнал pre_save сравнивает
+        # новую группу, не перечитывая пост из базы.
+        if 'group_id' in field_names:
+            instance._saved_group_id = instance.group_id
+        return instance
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
@@ -47,7 +95,8 @@ class Comment(models.Model):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
-        related_name='comments'
+        related_name='comments',
+        db_index=False
     )
     author = models.ForeignKey(
         User,
@@ -59,6 +108,12 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='comment_post_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[0:15]
@@ -73,7 +128,8 @@ class Follow(models.Model):
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
-        related_name='following'
+        related_name='following',
+        db_index=False
     )
 
     class Meta:
@@ -83,3 +139,204 @@ class Follow(models.Model):
                 name='unique_subscription'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx'
+            ),
+        ]
+
+
+class FeedEntry(models.Model):
+    """Запись ленты подписок, материализованная при публикации поста."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-pub_date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_feed_entry'
+            )
+        ]
+        # Обратный проход по индексу дает ленту пользователя в порядке
+        # (-pub_date, -post) без сортировки и без чтения самой таблицы.
+        indexes = [
+            models.Index(
+                fields=['user', 'pub_date', 'post'],
+                name='feed_user_pub_date_post_idx'
+            )
+        ]
+
+
+class UserStats(models.Model):
+    """Денормализованные счетчики пользователя."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts = models.PositiveIntegerField(default=0)
+    comments = models.PositiveIntegerField(default=0)
+    followers = models.PositiveIntegerField(default=0)
+    following = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.user_id}: {self.posts} / {self.followers}'
+
+
+class SearchTerm(models.Model):
+    """
+    Запись обратного индекса для поиска без FTS5: сколько раз терм
+    встречается в посте или комментарии.
+    """
+    TERM_LENGTH = 64
+
+    term = models.CharField(max_length=TERM_LENGTH)
+    kind = models.CharField(max_length=16)
+    object_id = models.PositiveIntegerField()
+    post_id = models.PositiveIntegerField()
+    count = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term'], name='search_term_idx'),
+            models.Index(
+                fields=['kind', 'object_id'],
+                name='search_document_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.term}: {self.kind} {self.object_id}'
+
+
+class Notification(models.Model):
+    """
+    Сводка однотипных событий для получателя: новые подписчики или новые
+    комментарии к посту. Пока сводка не прочитана, следующие события
+    того же вида увеличивают ее счетчик, а не добавляют строки.
+    """
+    FOLLOW = 'follow'
+    COMMENT = 'comment'
+    KINDS = (
+        (FOLLOW, 'Новые подписчики'),
+        (COMMENT, 'Новые комментарии'),
+    )
+
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        db_index=False
+    )
+    kind = models.CharField(max_length=10, choices=KINDS)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='+'
+    )
+    # Последний, кто подписался или написал комментарий.
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+'
+    )
+    count = models.PositiveIntegerField(default=0)
+    created = models.DateTimeField()
+    updated = models.DateTimeField()
+    read = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['-updated']
+        indexes = [
+            models.Index(
+                fields=['recipient', 'read', 'updated'],
+                name='notification_recipient_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipient_id}: {self.kind} × {self.count}'
+
+
+class NotificationEvent(models.Model):
+    """
+    Событие, еще не свернутое в сводку Notification. Пишется в одной
+    транзакции с подпиской или комментарием и удаляется, как только
+    попадает в сводку.
+    """
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        db_index=False
+    )
+    kind = models.CharField(max_length=10, choices=Notification.KINDS)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='+'
+    )
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+'
+    )
+    created = models.DateTimeField()
+    # Метка сворачивающего процесса; пустая — событие ждет своей сводки.
+    claim = models.CharField(max_length=32, blank=True)
+
+    class Meta:
+        ordering = ['pk']
+        indexes = [
+            models.Index(
+                fields=['claim'],
+                name='notification_event_claim_idx'
+            ),
+        ]
+
+
+class ImportedId(models.Model):
+    """
+    id строки исходной системы и pk, который она получила при загрузке
+    (posts.bulk_import).
+    """
+    POSTS = 'posts'
+    COMMENTS = 'comments'
+    KINDS = [
+        (POSTS, 'Пост'),
+        (COMMENTS, 'Комментарий'),
+    ]
+
+    kind = models.CharField(max_length=16, choices=KINDS)
+    source_id = models.BigIntegerField()
+    object_id = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'source_id'],
+                name='unique_imported_id'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.source_id} -> {self.object_id}'
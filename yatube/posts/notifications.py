@@ -0,0 +1,162 @@
+"""
+Уведомления о подписках и комментариях.
+
+Событие пишется строкой NotificationEvent в той же транзакции, что
+подписка или комментарий, а раз в NOTIFICATION_WINDOW секунд события
+сворачиваются в сводки — одна непрочитанная сводка на получателя, вид
+события и пост. Новые сводки вставляются одним bulk_create, у
+существующих одним bulk_update растут счетчики. Поэтому сотня подписок
+на популярного автора за окно — одна запись, а не сотня.
+
+Таймер окна — только повод свернуть очередь: flush забирает все
+ожидающие события, чьи бы они ни были, поэтому события остановленного
+процесса свернет следующий flush любого воркера или команда
+flush_notifications.
+
+Число непрочитанных событий хранится в кэше и пересчитывается только
+после записи сводок или их прочтения.
+"""
+import logging
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Notification, NotificationEvent
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_timer = None
+
+
+def unread_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def unread_count(user_id):
+    """Число непрочитанных событий; из базы — только при промахе кэша."""
+    count = cache.get(unread_key(user_id))
+    if count is None:
+        count = Notification.objects.filter(
+            recipient_id=user_id, read=False
+        ).aggregate(total=Sum('count'))['total'] or 0
+        cache.set(unread_key(user_id), count, None)
+    return count
+
+
+def notify(recipient_id, kind, actor_id, post_id=None):
+    """
+    Записывает событие в текущей транзакции и после ее фиксации ставит
+    сворачивание очереди.
+    """
+    if recipient_id == actor_id:
+        return
+    NotificationEvent.objects.create(
+        recipient_id=recipient_id,
+        kind=kind,
+        post_id=post_id,
+        actor_id=actor_id,
+        created=timezone.now(),
+    )
+    transaction.on_commit(schedule)
+
+
+def schedule():
+    global _timer
+    if not settings.NOTIFICATION_WINDOW:
+        flush()
+        return
+    with _lock:
+        if _timer is None:
+            _timer = threading.Timer(settings.NOTIFICATION_WINDOW, _flush)
+            _timer.daemon = True
+            _timer.start()
+
+
+def flush():
+    """Сворачивает в сводки все ожидающие события; возвращает их число."""
+    global _timer
+    with _lock:
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+    claim = uuid.uuid4().hex
+    # Транзакция начинается с записи: параллельный flush ждет ее
+    # фиксации и уже не видит забранных событий, поэтому сводку
+    # не создадут дважды.
+    with transaction.atomic():
+        NotificationEvent.objects.filter(claim='').update(claim=claim)
+        claimed = NotificationEvent.objects.filter(claim=claim)
+        events = list(claimed)
+        if not events:
+            return 0
+        recipients = write_digests(events)
+        claimed.delete()
+    cache.delete_many([unread_key(user_id) for user_id in recipients])
+    return len(events)
+
+
+def _flush():
+    try:
+        flush()
+    except Exception:
+        logger.exception('Не удалось записать уведомления')
+    finally:
+        connections.close_all()
+
+
+def coalesce(events):
+    """Сворачивает события в {(получатель, вид, пост): события}."""
+    groups = {}
+    for event in sorted(events, key=lambda event: event.created):
+        key = (event.recipient_id, event.kind, event.post_id)
+        groups.setdefault(key, []).append(event)
+    return groups
+
+
+def write_digests(events):
+    """Пишет сводки событий; возвращает id их получателей."""
+    groups = coalesce(events)
+    recipients = {recipient_id for recipient_id, _, _ in groups}
+    unread = {
+        (digest.recipient_id, digest.kind, digest.post_id): digest
+        for digest in Notification.objects.filter(
+            recipient_id__in=recipients,
+            kind__in={kind for _, kind, _ in groups},
+            read=False,
+        )
+    }
+    created, updated = [], []
+    for key, group in groups.items():
+        digest = unread.get(key)
+        if digest is None:
+            digest = Notification(
+                recipient_id=key[0],
+                kind=key[1],
+                post_id=key[2],
+                created=group[0].created,
+            )
+            created.append(digest)
+        else:
+            updated.append(digest)
+        digest.count += len(group)
+        digest.actor_id = group[-1].actor_id
+        digest.updated = group[-1].created
+    Notification.objects.bulk_create(created)
+    Notification.objects.bulk_update(updated, ['count', 'actor', 'updated'])
+    return recipients
+
+
+def mark_read(user_id, pks):
+    """Помечает прочитанными сводки pks, которые получатель увидел."""
+    if not pks:
+        return
+    Notification.objects.filter(
+        recipient_id=user_id, pk__in=pks, read=False
+    ).update(read=True)
+    cache.delete(unread_key(user_id))
@@ -0,0 +1,122 @@
+import base64
+import hashlib
+import json
+import re
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+
+from .fragments import get_version
+
+PAGE_KEY = 'posts:page:{}'
+
+ANONYMOUS = 'anonymous'
+SKELETON = 'skeleton'
+
+HOLE = '<!--personal:{}-->'
+HOLE_RE = re.compile(r'<!--personal:([A-Za-z0-9_=-]+)-->')
+
+
+def page_key(request, version, variant):
+    raw = (
+        f'{request.resolver_match.view_name}|{request.path}|'
+        f'{request.GET.urlencode()}|{version}|{variant}'
+    )
+    return PAGE_KEY.format(hashlib.md5(raw.encode()).hexdigest())
+
+
+def hole_marker(template_name, context):
+    """Метка на месте персональной части страницы в каркасе."""
+    data = json.dumps({'template': template_name, 'context': context})
+    return HOLE.format(base64.urlsafe_b64encode(data.encode()).decode())
+
+
+def fill_holes(request, skeleton):
+    """Рендерит персональные части каркаса для пользователя запроса."""
+    def render_hole(match):
+        data = json.loads(base64.urlsafe_b64decode(match.group(1)))
+        return render_to_string(
+            data['template'], data['context'], request=request
+        )
+    return HOLE_RE.sub(render_hole, skeleton)
+
+
+def is_skeleton(request):
+    return getattr(request, 'page_skeleton', False)
+
+
+def page_version(request, scopes_func, kwargs):
+    """
+    Версия, уже найденная conditional_page, или версия областей
+    scopes_func; None, если объекта страницы нет.
+    """
+    version = getattr(request, 'page_version', None)
+    if version is None:
+        scopes = scopes_func(request, **kwargs)
+        if scopes is not None:
+            version = get_version(*scopes)
+    return version
+
+
+def render_skeleton(view, request, *args, **kwargs):
+    """Ответ представления, отрендеренный каркасом."""
+    request.page_skeleton = True
+    try:
+        return view(request, *args, **kwargs)
+    finally:
+        request.page_skeleton = False
+
+
+def cached_page(scopes_func):
+    """
+    Кэширует страницу целиком на PAGE_CACHE_TIMEOUT секунд. Ключ —
+    путь, параметры запроса и версия областей scopes_func(request, ...),
+    поэтому сигналы об изменении постов и групп сбрасывают страницу
+    без явного удаления.
+
+    Представление рендерит каркас: персональные части, отмеченные
+    тегом {% personal %}, заменяются метками. Анонимам отдается
+    сохраненная страница с уже подставленными частями, вошедшим
+    пользователям — каркас, части которого рендерятся на каждый запрос.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            version = page_version(request, scopes_func, kwargs)
+            if version is None:
+                return view(request, *args, **kwargs)
+            anonymous = not request.user.is_authenticated
+
+            if anonymous:
+                content = cache.get(page_key(request, version, ANONYMOUS))
+                if content is not None:
+                    return HttpResponse(content)
+            response = HttpResponse()
+            skeleton = cache.get(page_key(request, version, SKELETON))
+            if skeleton is None:
+                response = render_skeleton(view, request, *args, **kwargs)
+                skeleton = response.content.decode()
+                if response.status_code != 200 or response.cookies:
+                    response.content = fill_holes(request, skeleton)
+                    return response
+                cache.set(
+                    page_key(request, version, SKELETON),
+                    skeleton,
+                    settings.PAGE_CACHE_TIMEOUT
+                )
+
+            response.content = fill_holes(request, skeleton)
+            if anonymous:
+                cache.set(
+                    page_key(request, version, ANONYMOUS),
+                    response.content.decode(),
+                    settings.PAGE_CACHE_TIMEOUT
+                )
+            return response
+        return wrapper
+    return decorator
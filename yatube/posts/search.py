@@ -0,0 +1,346 @@
+import math
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, FloatField, Sum, When
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+
+from .models import Comment, Post, SearchTerm
+
+FTS_TABLE = 'posts_search'
+
+POST = 'post'
+COMMENT = 'comment'
+
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+SNIPPET_WORDS = 16
+
+WORD_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return WORD_RE.findall(text.lower())
+
+
+def render_snippet(text):
+    """Экранирует фрагмент и заменяет служебные маркеры на <mark>."""
+    return escape(text).replace(MARK_START, '<mark>').replace(
+        MARK_END, '</mark>'
+    )
+
+
+def documents(obj):
+    if isinstance(obj, Post):
+        return POST, obj.pk, obj.pk, obj.text
+    return COMMENT, obj.pk, obj.post_id, obj.text
+
+
+class SearchHit:
+    def __init__(self, kind, object_id, post_id, snippet, score):
+        self.kind = kind
+        self.object_id = object_id
+        self.post_id = post_id
+        self.snippet = snippet
+        self.score = score
+        self.post = None
+
+    @property
+    def is_comment(self):
+        return self.kind == COMMENT
+
+
+class SearchResults:
+    """
+    Ленивый список результатов поиска: поддерживает count() и срезы,
+    поэтому его можно отдавать обычному Paginator.
+    """
+
+    def __init__(self, backend, query):
+        self.backend = backend
+        self.query = query
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count(self.query)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = self.count() if index.stop is None else index.stop
+        if stop <= start:
+            return []
+        return self.backend.search(self.query, start, stop - start)
+
+
+class SQLiteSearchBackend:
+    """
+    Индекс в виртуальной таблице FTS5. Сортировка по rank (по умолчанию
+    это bm25) выполняется самим FTS5, без отдельной сортировки строк.
+    """
+
+    @staticmethod
+    def match_expression(query):
+        tokens = tokenize(query)
+        return ' '.join(f'"{token}"*' for token in tokens)
+
+    @staticmethod
+    def rowid(kind, object_id):
+        """Строка FTS5 однозначно выводится из документа: удаление по rowid."""
+        return object_id * 2 + (kind == COMMENT)
+
+    def index(self, objs):
+        rows = [documents(obj) for obj in objs]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(self.rowid(kind, object_id),)
+                 for kind, object_id, _, _ in rows]
+            )
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} '
+                '(rowid, kind, object_id, post_id, text) '
+                'VALUES (%s, %s, %s, %s, %s)',
+                [(self.rowid(kind, object_id), kind, object_id, post_id, text)
+                 for kind, object_id, post_id, text in rows]
+            )
+
+    def remove(self, kind, object_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [self.rowid(kind, object_id)]
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def count(self, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s',
+                [expression]
+            )
+            return cursor.fetchone()[0]
+
+    def search(self, query, offset, limit):
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT kind, object_id, post_id, '
+                f'snippet({FTS_TABLE}, 3, %s, %s, %s, %s), '
+                'rank '
+                f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                'ORDER BY rank LIMIT %s OFFSET %s',
+                [MARK_START, MARK_END, '…', SNIPPET_WORDS,
+                 expression, limit, offset]
+            )
+            return [
+                SearchHit(kind, object_id, post_id,
+                          render_snippet(snippet), -score)
+                for kind, object_id, post_id, snippet, score in cursor
+            ]
+
+
+class PythonSearchBackend:
+    """
+    Переносимый обратный индекс в таблице SearchTerm: терм и число его
+    вхождений в документ. Ищутся документы, содержащие все термы запроса
+    целиком; ранжирование — сумма tf * idf по этим термам.
+    """
+
+    def index(self, objs):
+        rows = [documents(obj) for obj in objs]
+        terms = []
+        for kind, object_id, post_id, text in rows:
+            SearchTerm.objects.filter(kind=kind, object_id=object_id).delete()
+            for term, count in Counter(tokenize(text)).items():
+                terms.append(SearchTerm(
+                    term=term[:SearchTerm.TERM_LENGTH],
+                    kind=kind,
+                    object_id=object_id,
+                    post_id=post_id,
+                    count=count,
+                ))
+        SearchTerm.objects.bulk_create(terms, batch_size=1000)
+
+    def remove(self, kind, object_id):
+        SearchTerm.objects.filter(kind=kind, object_id=object_id).delete()
+
+    def clear(self):
+        SearchTerm.objects.all().delete()
+
+    def _matches(self, tokens):
+        return SearchTerm.objects.filter(term__in=tokens).values(
+            'kind', 'object_id', 'post_id'
+        ).annotate(
+            matched=Count('term', distinct=True)
+        ).filter(matched=len(tokens))
+
+    def count(self, query):
+        tokens = set(tokenize(query))
+        if not tokens:
+            return 0
+        return self._matches(tokens).count()
+
+    def search(self, query, offset, limit):
+        tokens = set(tokenize(query))
+        if not tokens:
+            return []
+        total = SearchTerm.objects.values('kind', 'object_id').distinct()
+        total = total.count() or 1
+        frequencies = dict(
+            SearchTerm.objects.filter(term__in=tokens).values_list(
+                'term'
+            ).annotate(documents=Count('pk'))
+        )
+        weights = [
+            When(term=term, then=F('count') * math.log(1 + total / df))
+            for term, df in frequencies.items()
+        ]
+        rows = self._matches(tokens).annotate(
+            score=Sum(Case(*weights, output_field=FloatField()))
+        ).order_by('-score', '-object_id')[offset:offset + limit]
+        hits = [
+            SearchHit(row['kind'], row['object_id'], row['post_id'],
+                      '', row['score'])
+            for row in rows
+        ]
+        self._highlight(hits, tokens)
+        return hits
+
+    def _highlight(self, hits, tokens):
+        texts = {
+            (POST, pk): text
+            for pk, text in Post.objects.filter(
+                pk__in=[h.object_id for h in hits if h.kind == POST]
+            ).values_list('pk', 'text')
+        }
+        texts.update({
+            (COMMENT, pk): text
+            for pk, text in Comment.objects.filter(
+                pk__in=[h.object_id for h in hits if h.kind == COMMENT]
+            ).values_list('pk', 'text')
+        })
+        for hit in hits:
+            hit.snippet = python_snippet(
+                texts.get((hit.kind, hit.object_id), ''), tokens
+            )
+
+
+def python_snippet(text, tokens):
+    def is_match(word):
+        return any(token in tokens for token in tokenize(word))
+
+    def mark(match):
+        word = match.group()
+        if word.lower() in tokens:
+            return f'{MARK_START}{word}{MARK_END}'
+        return word
+
+    words = text.split()
+    first = next((i for i, word in enumerate(words) if is_match(word)), 0)
+    start = max(0, first - SNIPPET_WORDS // 4)
+    snippet = WORD_RE.sub(
+        mark, ' '.join(words[start:start + SNIPPET_WORDS])
+    )
+    if start > 0:
+        snippet = f'…{snippet}'
+    if start + SNIPPET_WORDS < len(words):
+        snippet = f'{snippet}…'
+    return render_snippet(snippet)
+
+
+def fts5_available():
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+            [FTS_TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if settings.SEARCH_BACKEND:
+            _backend = import_string(settings.SEARCH_BACKEND)()
+        elif fts5_available():
+            _backend = SQLiteSearchBackend()
+        else:
+            _backend = PythonSearchBackend()
+    return _backend
+
+
+def index_objects(objs):
+    get_backend().index(objs)
+
+
+def remove_object(obj):
+    kind, object_id, _, _ = documents(obj)
+    get_backend().remove(kind, object_id)
+
+
+def search(query):
+    return SearchResults(get_backend(), query)
+
+
+def attach_posts(hits):
+    posts = Post.objects.for_feed().in_bulk({hit.post_id for hit in hits})
+    for hit in hits:
+        hit.post = posts.get(hit.post_id)
+    return hits
+
+
+def _batches(queryset, batch_size):
+    batch = []
+    for obj in queryset.iterator(chunk_size=batch_size):
+        batch.append(obj)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def reindex(batch_size=1000):
+    """
+    Перестраивает индекс, читая посты и комментарии пачками по
+    batch_size: в памяти не бывает больше одной пачки документов.
+    """
+    backend = get_backend()
+    with transaction.atomic():
+        backend.clear()
+    indexed = 0
+    querysets = (
+        Post.objects.only('text'),
+        Comment.objects.only('text', 'post'),
+    )
+    for queryset in querysets:
+        for batch in _batches(queryset.order_by('pk'), batch_size):
+            with transaction.atomic():
+                backend.index(batch)
+            indexed += len(batch)
+    return indexed
@@ -0,0 +1,285 @@
+import itertools
+import multiprocessing
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .feed import materialize_feeds
+from .fragments import GROUPS, invalidate
+from .models import Comment, Follow, Group, Post, User
+from .search import reindex
+from .stats import rebuild_stats
+
+WORDS = (
+    'день', 'город', 'время', 'дорога', 'друг', 'книга', 'море', 'небо',
+    'работа', 'вечер', 'утро', 'кофе', 'поезд', 'дом', 'лес', 'река',
+    'письмо', 'музыка', 'фильм', 'история', 'новость', 'проект', 'код',
+    'идея', 'вопрос', 'ответ', 'погода', 'дождь', 'солнце', 'снег',
+    'сегодня', 'вчера', 'завтра', 'опять', 'снова', 'очень', 'совсем',
+    'новый', 'старый', 'большой', 'тихий', 'смешной', 'важный', 'долгий',
+    'читаю', 'пишу', 'смотрю', 'думаю', 'гуляю', 'жду', 'помню', 'люблю',
+    'и', 'в', 'на', 'с', 'про', 'после', 'без', 'или', 'но', 'как',
+)
+
+# Показатель степенного распределения: чем меньше, тем сильнее выделяются
+# немногие мега-авторы и вирусные посты на фоне длинного хвоста.
+PARETO_ALPHA = 1.2
+
+PASSWORD = 'seed-password'
+
+_state = {}
+
+
+def power_law(count, rng, alpha=PARETO_ALPHA):
+    """Накопленные веса для random.choices(cum_weights=...)."""
+    return list(itertools.accumulate(
+        rng.paretovariate(alpha) for _ in range(count)
+    ))
+
+
+def sentence(rng, low, high):
+    words = rng.choices(WORDS, k=rng.randint(low, high))
+    return ' '.join(words).capitalize() + '.'
+
+
+def _random_date(rng):
+    return _state['now'] - timedelta(
+        seconds=rng.randrange(_state['days'] * 24 * 60 * 60)
+    )
+
+
+def _post_rows(rng, size):
+    authors = rng.choices(
+        range(len(_state['users'])), cum_weights=_state['weights'], k=size
+    )
+    groups = _state['groups']
+    return [
+        (
+            author,
+            rng.randrange(len(groups)) if groups and rng.random() < 0.7
+            else None,
+            sentence(rng, 5, 60),
+            _random_date(rng),
+        )
+        for author in authors
+    ]
+
+
+def _date_after(rng, start):
+    """Случайный момент между start и моментом заполнения."""
+    span = (_state['now'] - start).total_seconds()
+    return start + timedelta(seconds=rng.random() * span)
+
+
+def _comment_rows(rng, size):
+    posts = rng.choices(
+        range(len(_state['posts'])), cum_weights=_state['weights'], k=size
+    )
+    return [
+        (post, rng.randrange(len(_state['users'])), sentence(rng, 2, 20),
+         _date_after(rng, _state['post_dates'][post]))
+        for post in posts
+    ]
+
+
+def _follow_rows(rng, size):
+    authors = rng.choices(
+        range(len(_state['users'])), cum_weights=_state['weights'], k=size
+    )
+    return [
+        (rng.randrange(len(_state['users'])), author) for author in authors
+    ]
+
+
+def _init_worker(state):
+    _state.clear()
+    _state.update(state)
+
+
+def _run(job):
+    task, index, size = job
+    rng = random.Random(f'{_state["seed"]}:{task.__name__}:{index}')
+    return task(rng, size)
+
+
+@contextmanager
+def _rows(task, total, batch_size, workers, state):
+    """
+    Пачки строк для task. С workers > 1 пачки генерируются в дочерних
+    процессах, пока родитель пишет предыдущие в базу.
+    """
+    jobs = [
+        (task, index, min(batch_size, total - start))
+        for index, start in enumerate(range(0, total, batch_size))
+    ]
+    if workers <= 1:
+        _init_worker(state)
+        yield map(_run, jobs)
+        return
+    connections.close_all()
+    with multiprocessing.Pool(
+        workers, initializer=_init_worker, initargs=(state,)
+    ) as pool:
+        yield pool.imap(_run, jobs)
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Отключает auto_now_add, чтобы bulk_create сохранил свои даты."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def new_pks(model, last):
+    """pk строк, вставленных после строки last, по порядку вставки."""
+    return list(
+        model.objects.filter(pk__gt=last).order_by('pk').values_list(
+            'pk', flat=True
+        )
+    )
+
+
+def last_pk(model):
+    return model.objects.order_by('-pk').values_list(
+        'pk', flat=True
+    ).first() or 0
+
+
+def _insert(model, objs, **kwargs):
+    """
+    Одна пачка — одна транзакция. Размер отдельного INSERT bulk_create
+    подбирает сам под ограничения бэкенда (в SQLite — 500 строк).
+    """
+    with transaction.atomic():
+        model.objects.bulk_create(objs, **kwargs)
+
+
+def _seed_users(count, rng, batch_size):
+    last = last_pk(User)
+    password = make_password(PASSWORD)
+    end = last + count + 1
+    for start in range(last + 1, end, batch_size):
+        numbers = range(start, min(start + batch_size, end))
+        _insert(User, [
+            User(
+                username=f'seed{number}',
+                password=password,
+                first_name=rng.choice(WORDS).capitalize(),
+            )
+            for number in numbers
+        ])
+    return new_pks(User, last)
+
+
+def _seed_groups(count, rng, batch_size):
+    last = last_pk(Group)
+    _insert(Group, [
+        Group(
+            title=f'Группа {number}',
+            slug=f'seed-group-{number}',
+            description=sentence(rng, 5, 30),
+        )
+        for number in range(last + 1, last + count + 1)
+    ])
+    return new_pks(Group, last)
+
+
+def _seed_posts(count, batch_size, workers, state):
+    last = last_pk(Post)
+    users, groups = state['users'], state['groups']
+    with explicit_dates(Post._meta.get_field('pub_date')):
+        with _rows(_post_rows, count, batch_size, workers, state) as rows:
+            for batch in rows:
+                _insert(Post, [
+                    Post(
+                        author_id=users[author],
+                        group_id=None if group is None else groups[group],
+                        text=text,
+                        pub_date=pub_date,
+                    )
+                    for author, group, text, pub_date in batch
+                ])
+    return list(
+        Post.objects.filter(pk__gt=last).order_by('pk').values_list(
+            'pk', 'pub_date'
+        )
+    )
+
+
+def _seed_follows(count, batch_size, workers, state):
+    users = state['users']
+    with _rows(_follow_rows, count, batch_size, workers, state) as rows:
+        for batch in rows:
+            _insert(Follow, [
+                Follow(user_id=users[user], author_id=users[author])
+                for user, author in batch if user != author
+            ], ignore_conflicts=True)
+
+
+def _seed_comments(count, batch_size, workers, state):
+    users, posts = state['users'], state['posts']
+    created_count = 0
+    with explicit_dates(Comment._meta.get_field('created')):
+        with _rows(_comment_rows, count, batch_size, workers, state) as rows:
+            for batch in rows:
+                comments = [
+                    Comment(
+                        post_id=posts[post],
+                        author_id=users[author],
+                        text=text,
+                        created=created,
+                    )
+                    for post, author, text, created in batch
+                ]
+                _insert(Comment, comments)
+                created_count += len(comments)
+    return created_count
+
+
+def seed(users, groups, posts, comments, follows, batch_size=5000,
+         workers=1, seed=0, days=365, index=True, report=print):
+    """
+    Заполняет базу синтетическими данными через bulk_create в обход
+    сигналов, а затем одним проходом пересчитывает все, что сигналы
+    обычно поддерживают: счетчики, ленты, поисковый индекс и версии
+    кэша. Авторы постов, цели подписок и комментируемые посты выбираются
+    по степенному закону.
+    """
+    rng = random.Random(seed)
+    state = {'seed': seed, 'now': timezone.now(), 'days': days}
+
+    state['users'] = _seed_users(users, rng, batch_size)
+    report(f'Пользователей: {len(state["users"])}')
+    state['groups'] = _seed_groups(groups, rng, batch_size)
+    report(f'Групп: {len(state["groups"])}')
+    if not state['users']:
+        return
+
+    state['weights'] = power_law(len(state['users']), rng)
+    seeded_posts = _seed_posts(posts, batch_size, workers, state)
+    state['posts'] = [pk for pk, _ in seeded_posts]
+    state['post_dates'] = [pub_date for _, pub_date in seeded_posts]
+    report(f'Постов: {len(state["posts"])}')
+    _seed_follows(follows, batch_size, workers, state)
+    report(f'Подписок всего: {Follow.objects.count()}')
+
+    created = 0
+    if state['posts']:
+        state['weights'] = power_law(len(state['posts']), rng)
+        created = _seed_comments(comments, batch_size, workers, state)
+    report(f'Комментариев: {created}')
+
+    rebuild_stats(batch_size=batch_size)
+    report(f'Записей в лентах: {materialize_feeds()}')
+    if index:
+        report(f'Проиндексировано: {reindex(batch_size=batch_size)}')
+    invalidate('index', GROUPS)
@@ -0,0 +1,136 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .feed import backfill_feed, cool_down, fan_out_post, prune_feed
+from .fragments import GROUPS, forget, invalidate, post_scopes
+from .models import Comment, Follow, Group, Notification, Post, User
+from .notifications import notify
+from .search import index_objects, remove_object
+from .stats import bump
+from .thumbnails import schedule_post
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, raw=False, **kwargs):
+    instance._previous_group_id = None
+    if instance.pk is None or raw:
+        return
+    if hasattr(instance, '_saved_group_id'):
+        instance._previous_group_id = instance._saved_group_id
+    else:
+        instance._previous_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    invalidate(*post_scopes(
+        instance, getattr(instance, '_previous_group_id', None)
+    ))
+    instance._saved_group_id = instance.group_id
+    index_objects([instance])
+    if not raw:
+        schedule_post(instance)
+    if created and not raw:
+        bump(instance.author_id, 'posts', 1)
+        fan_out_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    invalidate(*post_scopes(instance))
+    remove_object(instance)
+    bump(instance.author_id, 'posts', -1)
+
+
+# Поля пользователя, которые выводятся в постах, комментариях и профиле.
+NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def author_scopes(user_id):
+    """Области кэша со страницами и фрагментами, где видно имя user_id."""
+    scopes = {'index', f'profile:{user_id}'}
+    posts = Post.objects.filter(author_id=user_id).values_list(
+        'pk', 'group_id'
+    )
+    for pk, group_id in posts.iterator():
+        scopes.add(f'post:{pk}')
+        if group_id is not None:
+            scopes.add(f'group:{group_id}')
+    commented = Comment.objects.filter(author_id=user_id).values_list(
+        'post_id', flat=True
+    ).distinct()
+    scopes.update(f'comments:{post_id}' for post_id in commented.iterator())
+    return scopes
+
+
+@receiver(pre_save, sender=User)
+def user_changing(sender, instance, raw=False, update_fields=None,
+                  **kwargs):
+    # Вход обновляет только last_login, и читать имя из базы незачем.
+    instance._renamed = False
+    if instance.pk is None or raw:
+        return
+    if update_fields is not None and not set(NAME_FIELDS) & set(
+        update_fields
+    ):
+        return
+    saved = User.objects.filter(pk=instance.pk).values_list(
+        *NAME_FIELDS
+    ).first()
+    instance._renamed = saved is not None and saved != tuple(
+        getattr(instance, field) for field in NAME_FIELDS
+    )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, **kwargs):
+    if getattr(instance, '_renamed', False):
+        forget(*author_scopes(instance.pk))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    invalidate(f'group:{instance.pk}', GROUPS)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    index_objects([instance])
+    invalidate(f'comments:{instance.post_id}')
+    if created and not raw:
+        bump(instance.author_id, 'comments', 1)
+        notify(
+            instance.post.author_id,
+            Notification.COMMENT,
+            instance.author_id,
+            post_id=instance.post_id
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    remove_object(instance)
+    invalidate(f'comments:{instance.post_id}')
+    bump(instance.author_id, 'comments', -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    invalidate(f'follows:{instance.user_id}', f'follows:{instance.author_id}')
+    if created and not raw:
+        bump(instance.author_id, 'followers', 1)
+        bump(instance.user_id, 'following', 1)
+        backfill_feed(instance)
+        notify(instance.author_id, Notification.FOLLOW, instance.user_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    invalidate(f'follows:{instance.user_id}', f'follows:{instance.author_id}')
+    bump(instance.author_id, 'followers', -1)
+    bump(instance.user_id, 'following', -1)
+    prune_feed(instance)
+    cool_down(instance.author_id)
@@ -0,0 +1,110 @@
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core.db import atomic
+
+from .models import Comment, Follow, Post, User, UserStats
+
+COUNTERS = {
+    'posts': (Post, 'author'),
+    'comments': (Comment, 'author'),
+    'followers': (Follow, 'author'),
+    'following': (Follow, 'user'),
+}
+
+
+def count_subquery(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')[:1],
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def with_counters(users):
+    """Аннотирует пользователей счетчиками, посчитанными по таблицам."""
+    return users.annotate(**{
+        f'{name}_total': count_subquery(model, field)
+        for name, (model, field) in COUNTERS.items()
+    })
+
+
+def counters_of(annotated_user):
+    return {
+        name: getattr(annotated_user, f'{name}_total') for name in COUNTERS
+    }
+
+
+def get_stats(user):
+    """Счетчики пользователя; при отсутствии строки она создается."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        pass
+    fresh = with_counters(User.objects.filter(pk=user.pk)).get()
+    with atomic(immediate=True):
+        stats, _ = UserStats.objects.get_or_create(
+            user_id=user.pk,
+            defaults=counters_of(fresh)
+        )
+    user.stats = stats
+    return stats
+
+
+def bump(user_id, name, delta):
+    """Атомарно изменяет один счетчик пользователя на delta."""
+    stats = UserStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        stats = stats.filter(**{f'{name}__gte': -delta})
+    with transaction.atomic():
+        updated = stats.update(**{name: F(name) + delta})
+        if not updated and delta > 0:
+            user = User.objects.filter(pk=user_id).first()
+            if user is not None:
+                get_stats(user)
+
+
+def rebuild_stats(batch_size=1000, verify=False):
+    """
+    Пересчитывает счетчики всех пользователей пачками по batch_size.
+    Возвращает число расходившихся строк; при verify=True ничего
+    не записывает.
+    """
+    mismatched = 0
+    users = with_counters(User.objects.order_by('pk')).iterator(
+        chunk_size=batch_size
+    )
+    batch = []
+    for user in users:
+        batch.append(user)
+        if len(batch) == batch_size:
+            mismatched += _sync_batch(batch, verify)
+            batch = []
+    if batch:
+        mismatched += _sync_batch(batch, verify)
+    return mismatched
+
+
+def _sync_batch(users, verify):
+    existing = UserStats.objects.in_bulk([user.pk for user in users])
+    to_create, to_update = [], []
+    for user in users:
+        fresh = counters_of(user)
+        stats = existing.get(user.pk)
+        if stats is None:
+            to_create.append(UserStats(user_id=user.pk, **fresh))
+        elif any(getattr(stats, k) != v for k, v in fresh.items()):
+            for name, value in fresh.items():
+                setattr(stats, name, value)
+            to_update.append(stats)
+    if not verify:
+        UserStats.objects.bulk_create(to_create, ignore_conflicts=True)
+        UserStats.objects.bulk_update(to_update, list(COUNTERS))
+    return len(to_create) + len(to_update)
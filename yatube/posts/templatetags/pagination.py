@@ -0,0 +1,10 @@
+from django import template
+
+from posts.utils import page_window as get_page_window
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_window(page_obj, on_each_side=2, on_ends=1):
+    return get_page_window(page_obj, on_each_side, on_ends)
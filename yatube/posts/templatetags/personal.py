@@ -0,0 +1,43 @@
+from django import template
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from posts.models import Follow
+from posts.notifications import unread_count
+from posts.page_cache import hole_marker, is_skeleton
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def personal(context, template_name, **values):
+    """
+    Персональная часть страницы. В каркасе кэшируемой страницы вместо нее
+    остается метка, и шаблон рендерится для каждого запроса отдельно,
+    только со значениями values, пользователем и запросом.
+    """
+    request = context.get('request')
+    if request is not None and is_skeleton(request):
+        return mark_safe(hole_marker(template_name, values))
+    # Так же, как при заполнении каркаса: только values, пользователь
+    # и запрос, а не контекст страницы.
+    return render_to_string(template_name, values, request=request)
+
+
+@register.simple_tag(takes_context=True)
+def is_following(context, username):
+    user = context.get('user')
+    if user is None or not user.is_authenticated:
+        return False
+    return Follow.objects.filter(
+        user=user, author__username=username
+    ).exists()
+
+
+@register.simple_tag(takes_context=True)
+def unread_notifications(context):
+    """Число непрочитанных уведомлений; на каждой странице — из кэша."""
+    user = context.get('user')
+    if user is None or not user.is_authenticated:
+        return 0
+    return unread_count(user.pk)
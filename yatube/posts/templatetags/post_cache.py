@@ -0,0 +1,10 @@
+from django import template
+
+from posts.fragments import post_version
+
+register = template.Library()
+
+
+@register.filter
+def fragment_version(post):
+    return f'{post.group_id}.{post_version(post)}'
@@ -0,0 +1,16 @@
+from django import template
+
+from posts.images import MIME_TYPES, modern_formats
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/post_image.html')
+def post_image(post):
+    return {
+        'post': post,
+        'modern_formats': [
+            {'name': name, 'mime': MIME_TYPES[name]}
+            for name in modern_formats()
+        ],
+    }
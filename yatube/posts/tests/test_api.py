@@ -0,0 +1,193 @@
+import gzip
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='group',
+            description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {i}',
+                author=cls.author,
+                group=cls.group if i % 2 else None
+            )
+            for i in range(5)
+        ]
+        cls.post = cls.posts[-1]
+        for i in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Комментарий {i}'
+            )
+        Post.objects.create(text='Пост читателя', author=cls.reader)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader = Client()
+        self.reader.force_login(ApiTest.reader)
+
+    def get_json(self, url, client=None, **params):
+        response = (client or self.client).get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return json.loads(response.content)
+
+    def walk(self, url, client=None, **params):
+        """Все страницы списка, от первой до последней."""
+        ids = []
+        data = self.get_json(url, client, **params)
+        while True:
+            ids.extend(item['id'] for item in data['results'])
+            if data['next'] is None:
+                return ids
+            data = self.get_json(url, client, cursor=data['next'], **params)
+
+    def test_index_matches_html_feed(self):
+        ids = self.walk(reverse('posts:api_index'), limit=2)
+        expected = list(
+            Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True
+            )
+        )
+        self.assertEqual(ids, expected)
+
+    def test_filters(self):
+        url = reverse('posts:api_index')
+        cases = (
+            ({'group': 'group'}, Post.objects.filter(group=ApiTest.group)),
+            ({'author': 'reader'}, Post.objects.filter(author=ApiTest.reader)),
+            (
+                {'group': 'group', 'author': 'author'},
+                Post.objects.filter(
+                    group=ApiTest.group, author=ApiTest.author
+                )
+            ),
+        )
+        for params, queryset in cases:
+            with self.subTest(params=params):
+                self.assertCountEqual(
+                    self.walk(url, limit=2, **params),
+                    queryset.values_list('pk', flat=True)
+                )
+        for params in ({'group': 'missing'}, {'author': 'missing'}):
+            with self.subTest(params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn('detail', json.loads(response.content))
+
+    def test_post_detail(self):
+        post = ApiTest.post
+        data = self.get_json(
+            reverse('posts:api_post_detail', args=[post.pk])
+        )
+        self.assertEqual(data, {
+            'id': post.pk,
+            'text': post.text,
+            'pub_date': post.pub_date.isoformat(),
+            'author': 'author',
+            'group': None,
+            'image': None,
+        })
+        response = self.client.get(
+            reverse('posts:api_post_detail', args=[post.pk + 100])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    @mock.patch('posts.api.COMMENTS_BY_PAGE', 2)
+    def test_comments(self):
+        url = reverse('posts:api_post_comments', args=[ApiTest.post.pk])
+        data = self.get_json(url)
+        self.assertEqual(len(data['results']), 2)
+        self.assertEqual(
+            self.walk(url),
+            list(ApiTest.post.comments.order_by(
+                '-created', '-pk'
+            ).values_list('pk', flat=True))
+        )
+        self.assertEqual(
+            set(data['results'][0]),
+            {'id', 'text', 'created', 'author', 'post'}
+        )
+
+    def test_follow_feed(self):
+        url = reverse('posts:api_follow_index')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 401)
+        self.assertCountEqual(
+            self.walk(url, self.reader),
+            [post.pk for post in ApiTest.posts]
+        )
+        first = self.reader.get(url)
+        again = self.reader.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_sparse_fields(self):
+        data = self.get_json(reverse('posts:api_index'), fields='id,author')
+        for item in data['results']:
+            self.assertEqual(set(item), {'id', 'author'})
+        response = self.client.get(
+            reverse('posts:api_index'), {'fields': 'id,password'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_limit_is_validated(self):
+        url = reverse('posts:api_index')
+        for limit in ('0', '-1', 'ten', '1000'):
+            with self.subTest(limit=limit):
+                response = self.client.get(url, {'limit': limit})
+                self.assertEqual(response.status_code, 400)
+
+    def test_etag(self):
+        url = reverse('posts:api_post_detail', args=[ApiTest.post.pk])
+        response = self.client.get(url)
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        post = Post.objects.get(pk=ApiTest.post.pk)
+        post.text = 'Новый текст'
+        post.save()
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 200)
+
+        url = reverse('posts:api_post_comments', args=[ApiTest.post.pk])
+        response = self.client.get(url)
+        Comment.objects.create(
+            post=ApiTest.post, author=ApiTest.reader, text='Новый'
+        )
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 200)
+
+    def test_compact_gzip_response(self):
+        response = self.client.get(
+            reverse('posts:api_index'),
+            {'limit': 5},
+            HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        body = gzip.decompress(response.content).decode()
+        self.assertNotIn(', ', body)
+        self.assertNotIn('\\u', body)
+        self.assertIn('Пост', body)
+
+    def test_only_get(self):
+        response = self.reader.post(reverse('posts:api_index'))
+        self.assertEqual(response.status_code, 405)
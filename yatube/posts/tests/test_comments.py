@@ -0,0 +1,88 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+@mock.patch('posts.views.COMMENTS_BY_PAGE', 5)
+class CommentPaginationTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        for i in range(12):
+            commenter = User.objects.create_user(username=f'reader{i}')
+            Comment.objects.create(
+                post=cls.post,
+                author=commenter,
+                text=f'Комментарий {i}'
+            )
+
+    def detail(self, **params):
+        return self.client.get(
+            reverse(
+                'posts:post_detail',
+                kwargs={'post_id': CommentPaginationTest.post.pk}
+            ),
+            params
+        )
+
+    def more(self, cursor):
+        return self.client.get(
+            reverse(
+                'posts:post_comments',
+                kwargs={'post_id': CommentPaginationTest.post.pk}
+            ),
+            {'comments': cursor}
+        )
+
+    def test_detail_shows_first_page(self):
+        comments = self.detail().context['comments']
+        self.assertEqual(
+            [comment.text for comment in comments],
+            [f'Комментарий {i}' for i in range(11, 6, -1)]
+        )
+        self.assertTrue(comments.has_next())
+
+    def test_fragments_load_all_comments_once(self):
+        comments = self.detail().context['comments']
+        texts = [comment.text for comment in comments]
+        while comments.has_next():
+            response = self.more(comments.next_cursor)
+            self.assertNotContains(response, '<html')
+            comments = response.context['comments']
+            texts.extend(comment.text for comment in comments)
+        self.assertEqual(len(texts), 12)
+        self.assertEqual(len(set(texts)), 12)
+        self.assertNotContains(response, 'data-comments-url')
+
+    def test_detail_query_count_does_not_depend_on_comments(self):
+        with CaptureQueriesContext(connection) as before:
+            self.detail()
+        for i in range(20):
+            Comment.objects.create(
+                post=CommentPaginationTest.post,
+                author=User.objects.create_user(username=f'late{i}'),
+                text='Еще'
+            )
+        with CaptureQueriesContext(connection) as after:
+            self.detail()
+        self.assertEqual(
+            len(before.captured_queries), len(after.captured_queries)
+        )
+
+    def test_fragment_for_missing_post(self):
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 10 ** 6})
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,129 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='group',
+            description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Пост',
+            author=cls.author,
+            group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader = Client()
+        self.reader.force_login(ConditionalGetTest.reader)
+
+    def urls(self):
+        return (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'group'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse(
+                'posts:post_detail',
+                kwargs={'post_id': ConditionalGetTest.post.pk}
+            ),
+        )
+
+    def revalidate(self, client, url, response):
+        return client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_pages_are_not_modified(self):
+        for url in self.urls():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response.has_header('Last-Modified'))
+                again = self.revalidate(self.client, url, response)
+                self.assertEqual(again.status_code, 304)
+                self.assertEqual(again.content, b'')
+                since = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                )
+                self.assertEqual(since.status_code, 304)
+
+    def test_not_modified_does_not_render(self):
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            again = self.revalidate(self.client, url, response)
+        self.assertEqual(again.status_code, 304)
+
+    def test_changes_invalidate_validators(self):
+        post = ConditionalGetTest.post
+        changes = (
+            lambda: Post.objects.create(
+                text='Новый', author=ConditionalGetTest.author
+            ),
+            lambda: Post.objects.get(pk=post.pk).save(),
+            lambda: Comment.objects.create(
+                post=post, author=ConditionalGetTest.reader, text='К'
+            ),
+            lambda: Follow.objects.create(
+                user=ConditionalGetTest.reader,
+                author=ConditionalGetTest.author
+            ),
+            lambda: Group.objects.get(pk=ConditionalGetTest.group.pk).save(),
+        )
+        affected = {
+            0: (0, 2, 3),
+            1: (0, 1, 2, 3),
+            2: (3,),
+            3: (2,),
+            4: (0, 1, 2, 3),
+        }
+        for number, change in enumerate(changes):
+            responses = [self.client.get(url) for url in self.urls()]
+            change()
+            for index, url in enumerate(self.urls()):
+                with self.subTest(change=number, url=url):
+                    status = self.revalidate(
+                        self.client, url, responses[index]
+                    ).status_code
+                    self.assertEqual(
+                        status,
+                        200 if index in affected[number] else 304
+                    )
+
+    def test_validators_depend_on_viewer(self):
+        url = reverse('posts:index')
+        anonymous = self.client.get(url)
+        authorized = self.reader.get(url)
+        self.assertNotEqual(anonymous['ETag'], authorized['ETag'])
+        self.assertEqual(
+            self.revalidate(self.reader, url, anonymous).status_code, 200
+        )
+
+    def test_cache_headers(self):
+        url = reverse('posts:index')
+        anonymous = self.client.get(url)
+        self.assertIn('public', anonymous['Cache-Control'])
+        self.assertIn('must-revalidate', anonymous['Cache-Control'])
+        self.assertIn('Cookie', anonymous['Vary'])
+        authorized = self.reader.get(url)
+        self.assertIn('private', authorized['Cache-Control'])
+        self.assertIn('Cookie', authorized['Vary'])
+
+    def test_missing_objects_are_still_404(self):
+        response = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': 'missing'})
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
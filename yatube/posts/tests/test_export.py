@@ -0,0 +1,168 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.export import export
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+def moment(day):
+    return timezone.make_aware(datetime(2023, 3, day, 12))
+
+
+class ExportTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.staff = User.objects.create_user(
+            username='staff', is_staff=True
+        )
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='group',
+            description='Описание'
+        )
+        cls.posts = []
+        for day in range(1, 6):
+            post = Post.objects.create(
+                text=f'Пост, "{day}"\nвторая строка',
+                author=cls.author,
+                group=cls.group if day % 2 else None
+            )
+            Post.objects.filter(pk=post.pk).update(pub_date=moment(day))
+            cls.posts.append(post)
+            comment = Comment.objects.create(
+                post=post, author=cls.author, text=f'Комментарий {day}'
+            )
+            Comment.objects.filter(pk=comment.pk).update(
+                created=moment(day)
+            )
+
+    def ndjson(self, *args, **kwargs):
+        return [
+            json.loads(line)
+            for line in ''.join(export(*args, **kwargs)).splitlines()
+        ]
+
+    def test_ndjson(self):
+        rows = self.ndjson('posts', chunk_size=2)
+        self.assertEqual(
+            [row['id'] for row in rows],
+            [post.pk for post in ExportTest.posts]
+        )
+        self.assertEqual(
+            datetime.fromisoformat(rows[0].pop('pub_date')), moment(1)
+        )
+        self.assertEqual(rows[0], {
+            'id': ExportTest.posts[0].pk,
+            'author_id': ExportTest.author.pk,
+            'author': 'author',
+            'group': 'group',
+            'text': 'Пост, "1"\nвторая строка',
+            'image': '',
+        })
+
+    def test_csv(self):
+        content = ''.join(export('comments', 'csv', chunk_size=2))
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(
+            rows[0], ['id', 'created', 'post_id', 'author_id', 'author',
+                      'text']
+        )
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[1][-1], 'Комментарий 1')
+
+        content = ''.join(export('posts', 'csv'))
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[1][-2], 'Пост, "1"\nвторая строка')
+
+    def test_filters(self):
+        group = ExportTest.group
+        self.assertEqual(
+            [row['id'] for row in self.ndjson('posts', group=group)],
+            [post.pk for post in ExportTest.posts[::2]]
+        )
+        rows = self.ndjson(
+            'comments',
+            since=moment(2).date(),
+            until=moment(4).date()
+        )
+        self.assertEqual(
+            [row['post_id'] for row in rows],
+            [post.pk for post in ExportTest.posts[1:4]]
+        )
+        rows = self.ndjson('comments', group=group, since=moment(2).date())
+        self.assertEqual(
+            [row['post_id'] for row in rows],
+            [ExportTest.posts[2].pk, ExportTest.posts[4].pk]
+        )
+
+    def test_view_is_staff_only(self):
+        url = reverse('posts:export', kwargs={'kind': 'posts'})
+        client = Client()
+        client.force_login(ExportTest.author)
+        response = client.get(url)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('admin:login'), response.url)
+
+    def test_view_streams(self):
+        client = Client()
+        client.force_login(ExportTest.staff)
+        response = client.get(
+            reverse('posts:export', kwargs={'kind': 'comments'}),
+            {'format': 'csv', 'group': 'group'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('comments.csv', response['Content-Disposition'])
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(len(content.splitlines()), 4)
+
+    def test_view_validates(self):
+        client = Client()
+        client.force_login(ExportTest.staff)
+        url = reverse('posts:export', kwargs={'kind': 'posts'})
+        for params in (
+            {'format': 'xml'},
+            {'group': 'missing'},
+            {'since': 'вчера'},
+            {'since': '2023-03-05', 'until': '2023-03-01'},
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(client.get(url, params).status_code, 400)
+        response = client.get(
+            reverse('posts:export', kwargs={'kind': 'users'})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_command(self):
+        stdout = io.StringIO()
+        call_command('export_yatube', 'posts', '--group=group', stdout=stdout)
+        self.assertEqual(len(stdout.getvalue().splitlines()), 3)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'comments.csv')
+            call_command(
+                'export_yatube', 'comments', '--format=csv',
+                f'--output={path}'
+            )
+            with open(path, encoding='utf-8') as file:
+                self.assertEqual(len(list(csv.reader(file))), 6)
+
+        with self.assertRaises(CommandError):
+            call_command('export_yatube', 'posts', '--since=2023-13-01')
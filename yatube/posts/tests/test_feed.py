@@ -0,0 +1,179 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.feed import follow_feed, materialize_feeds
+from posts.models import FeedEntry, Follow, Post, UserStats
+from posts.utils import CursorPaginator
+
+User = get_user_model()
+
+
+class FollowFeedTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.old_post = Post.objects.create(
+            text='Пост до подписки',
+            author=cls.author
+        )
+
+    def setUp(self):
+        self.follower = Client()
+        self.follower.force_login(FollowFeedTest.follower)
+
+    def follow(self):
+        self.follower.get(
+            reverse(
+                'posts:profile_follow',
+                kwargs={'username': FollowFeedTest.author.username}
+            )
+        )
+
+    def test_follow_backfills_feed(self):
+        self.follow()
+        self.assertTrue(
+            FeedEntry.objects.filter(
+                user=FollowFeedTest.follower,
+                post=FollowFeedTest.old_post
+            ).exists(),
+            'Старые посты автора не попали в ленту после подписки'
+        )
+
+    def test_new_post_fans_out(self):
+        self.follow()
+        post = Post.objects.create(
+            text='Новый пост',
+            author=FollowFeedTest.author
+        )
+        entry = FeedEntry.objects.get(user=FollowFeedTest.follower, post=post)
+        self.assertEqual(entry.pub_date, post.pub_date)
+        response = self.follower.get(reverse('posts:follow_index'))
+        self.assertIn(post, response.context['page_obj'])
+
+    def test_unfollow_prunes_feed(self):
+        self.follow()
+        self.follower.get(
+            reverse(
+                'posts:profile_unfollow',
+                kwargs={'username': FollowFeedTest.author.username}
+            )
+        )
+        self.assertFalse(
+            FeedEntry.objects.filter(user=FollowFeedTest.follower).exists()
+        )
+        self.assertFalse(follow_feed(FollowFeedTest.follower).exists())
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_hot_author_is_read_on_demand(self):
+        """Посты популярного автора подмешиваются в ленту при чтении."""
+        self.follow()
+        post = Post.objects.create(
+            text='Новый пост',
+            author=FollowFeedTest.author
+        )
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(
+            list(follow_feed(FollowFeedTest.follower)),
+            [post, FollowFeedTest.old_post]
+        )
+
+    def test_feed_has_no_duplicates(self):
+        self.follow()
+        Follow.objects.get_or_create(
+            user=FollowFeedTest.follower,
+            author=FollowFeedTest.author
+        )
+        with override_settings(FEED_FANOUT_LIMIT=0):
+            feed = list(follow_feed(FollowFeedTest.follower))
+        self.assertEqual(feed, [FollowFeedTest.old_post])
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_feed_survives_fanout_limit_crossings(self):
+        """Посты не пропадают, когда автор становится горячим и обратно."""
+        author = FollowFeedTest.author
+        first = FollowFeedTest.follower
+        second = User.objects.create_user(username='second')
+        Follow.objects.create(user=first, author=author)
+        Follow.objects.create(user=second, author=author)
+        hot_post = Post.objects.create(text='Горячий пост', author=author)
+        self.assertFalse(
+            FeedEntry.objects.filter(user=second).exists(),
+            'Горячий автор разослал пост по лентам'
+        )
+        expected = [hot_post, FollowFeedTest.old_post]
+        self.assertEqual(list(follow_feed(first)), expected)
+        self.assertEqual(list(follow_feed(second)), expected)
+
+        Follow.objects.filter(user=first, author=author).delete()
+        self.assertEqual(
+            set(FeedEntry.objects.filter(user=second).values_list(
+                'post_id', flat=True
+            )),
+            {hot_post.pk, FollowFeedTest.old_post.pk},
+            'Посты остывшего автора не попали в ленты'
+        )
+        self.assertEqual(list(follow_feed(second)), expected)
+
+        Follow.objects.create(user=first, author=author)
+        new_post = Post.objects.create(text='Снова горячий', author=author)
+        self.assertEqual(list(follow_feed(second)), [new_post] + expected)
+        self.assertEqual(follow_feed(second).count(), 3)
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_authors_without_stats(self):
+        """
+        У данных, загруженных в обход сигналов, нет UserStats: подписчики
+        считаются по Follow и при раскладке, и при чтении.
+        """
+        author = FollowFeedTest.author
+        cold = User.objects.create_user(username='cold')
+        first, second = (
+            User.objects.create_user(username=name)
+            for name in ('first', 'second')
+        )
+        Follow.objects.bulk_create([
+            Follow(user=first, author=cold),
+            Follow(user=first, author=author),
+            Follow(user=second, author=author),
+        ])
+        Post.objects.bulk_create([
+            Post(text='Пост холодного автора', author=cold)
+        ])
+        cold_post = Post.objects.get(author=cold)
+        UserStats.objects.all().delete()
+
+        materialize_feeds()
+        self.assertEqual(
+            list(FeedEntry.objects.values_list('user', 'post')),
+            [(first.pk, cold_post.pk)],
+            'Пропущен холодный автор или разослан горячий'
+        )
+        self.assertEqual(
+            list(follow_feed(first)), [cold_post, FollowFeedTest.old_post]
+        )
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_cursor_pages_merge_hot_posts(self):
+        author = FollowFeedTest.author
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=FollowFeedTest.follower, author=reader)
+        Follow.objects.create(user=reader, author=author)
+        self.follow()
+        for i in range(3):
+            Post.objects.create(text=f'Горячий {i}', author=author)
+            Post.objects.create(text=f'Обычный {i}', author=reader)
+        feed = follow_feed(FollowFeedTest.follower)
+        expected = list(feed)
+        self.assertEqual(len(expected), 7)
+        paginator = CursorPaginator(feed, 2)
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        self.assertEqual([post for page in pages for post in page], expected)
+        previous = paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual(list(previous), list(pages[-2]))
@@ -0,0 +1,94 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import (Client, RequestFactory, TestCase,
+                         override_settings)
+from django.urls import reverse
+from PIL import Image
+
+from posts.models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+ORIENTATION = 0x0112
+
+
+def make_jpeg(size, name='photo.jpg'):
+    image = Image.new('RGB', size, color=(200, 30, 30))
+    exif = Image.Exif()
+    exif[ORIENTATION] = 6
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', exif=exif.tobytes())
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_MAX_SIDE=64)
+class ImageIngestionTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(ImageIngestionTest.author)
+
+    def upload(self, image):
+        return self.client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с фото', 'image': image}
+        )
+
+    def test_original_is_downscaled_rotated_and_stripped(self):
+        self.upload(make_jpeg((200, 100)))
+        post = Post.objects.get()
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.format, 'JPEG')
+            self.assertEqual(stored.size, (32, 64))
+            self.assertNotIn('exif', stored.info)
+
+    @override_settings(IMAGE_MAX_PIXELS=100)
+    def test_pixel_limit(self):
+        response = self.upload(make_jpeg((20, 20)))
+        self.assertFalse(Post.objects.exists())
+        self.assertFormError(
+            response, 'form', 'image',
+            'Изображение 20x20 слишком большое: допускается не больше 0 Мп.'
+        )
+
+    @override_settings(IMAGE_MAX_UPLOAD_BYTES=100)
+    def test_byte_limit_is_checked_while_streaming(self):
+        response = self.upload(make_jpeg((50, 50)))
+        self.assertFalse(Post.objects.exists())
+        self.assertIn('Файл слишком большой', str(response.context['form']))
+
+    @override_settings(IMAGE_MAX_UPLOAD_BYTES=100)
+    def test_other_forms_receive_whole_files(self):
+        data = make_jpeg((50, 50)).read()
+        request = RequestFactory().post(
+            '/admin/', {'file': SimpleUploadedFile('photo.jpg', data)}
+        )
+        upload = request.FILES['file']
+        self.assertEqual(upload.read(), data)
+        self.assertFalse(getattr(upload, 'too_large', False))
+
+    def test_post_create_checks_csrf(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(ImageIngestionTest.author)
+        response = client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с фото', 'image': make_jpeg((20, 20))}
+        )
+        self.assertTemplateUsed(response, 'core/403csrf.html')
+        self.assertFalse(Post.objects.exists())
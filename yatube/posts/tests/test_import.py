@@ -0,0 +1,240 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts import bulk_import, search
+from posts.bulk_import import import_rows
+from posts.fragments import get_version
+from posts.models import (Comment, FeedEntry, Follow, Group, ImportedId,
+                          Post)
+from posts.stats import get_stats
+
+User = get_user_model()
+
+
+def post_row(pk, author='author', **fields):
+    return {
+        'id': pk,
+        'author': author,
+        'group': None,
+        'text': f'Импортированный пост {pk}',
+        'pub_date': f'2023-03-{pk % 28 + 1:02d}T12:00:00+00:00',
+        **fields,
+    }
+
+
+def stats(username):
+    return get_stats(User.objects.get(username=username))
+
+
+def imported(model, source_id):
+    """Объект, загруженный из строки с id source_id."""
+    return model.objects.get(pk=ImportedId.objects.get(
+        kind=ImportedId.POSTS if model is Post else ImportedId.COMMENTS,
+        source_id=source_id
+    ).object_id)
+
+
+class ImportTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='group',
+            description='Описание'
+        )
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.messages = []
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write(self, name, rows):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            for row in rows:
+                line = row if isinstance(row, str) else json.dumps(row)
+                file.write(line + '\n')
+        return path
+
+    def load(self, kind, path, **kwargs):
+        return import_rows(
+            kind, path, batch_size=3, report=self.messages.append, **kwargs
+        )
+
+    def test_posts(self):
+        Follow.objects.create(
+            user=ImportTest.reader, author=ImportTest.author
+        )
+        path = self.write('posts.ndjson', [
+            post_row(100),
+            post_row(101, group='group', image='posts/1.jpg'),
+            post_row(102, author='reader', text='Уникальное слово'),
+            post_row(103),
+        ])
+        totals = self.load('posts', path)
+        self.assertEqual(
+            totals, {'written': 4, 'skipped': 0, 'errors': 0}
+        )
+
+        post = imported(Post, 101)
+        self.assertEqual(post.group, ImportTest.group)
+        self.assertEqual(post.image.name, 'posts/1.jpg')
+        self.assertEqual(post.pub_date.isoformat(), post_row(101)['pub_date'])
+        self.assertEqual(stats('author').posts, 3)
+        self.assertEqual(
+            FeedEntry.objects.filter(user=ImportTest.reader).count(), 3
+        )
+        self.assertEqual(
+            [hit.post_id for hit in search.search('уникальное')[:10]],
+            [imported(Post, 102).pk]
+        )
+        self.assertFalse(os.path.exists(f'{path}.checkpoint'))
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        path = self.write('posts.ndjson', [
+            post_row(200),
+            '{не json',
+            '[1, 2]',
+            post_row(201, author='nobody'),
+            post_row(202, group='missing'),
+            post_row(203, text='   '),
+            post_row(204, pub_date='вчера'),
+            post_row(205, id='205'),
+            '',
+            post_row(206),
+        ])
+        totals = self.load('posts', path)
+        self.assertEqual(totals, {'written': 2, 'skipped': 0, 'errors': 7})
+        self.assertCountEqual(
+            ImportedId.objects.values_list('source_id', flat=True),
+            [200, 206]
+        )
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertIn('Строка 2: ', '\n'.join(self.messages))
+        self.assertIn("'nobody' не найден", '\n'.join(self.messages))
+
+    def test_repeated_import_skips_existing_rows(self):
+        path = self.write(
+            'posts.ndjson',
+            [post_row(pk) for pk in (300, 301, 301, 302)]
+        )
+        self.assertEqual(self.load('posts', path)['written'], 3)
+        self.assertEqual(
+            self.load('posts', path),
+            {'written': 0, 'skipped': 4, 'errors': 0}
+        )
+        self.assertEqual(Post.objects.count(), 3)
+
+    def test_resumes_after_failure(self):
+        path = self.write(
+            'posts.ndjson', [post_row(pk) for pk in range(400, 407)]
+        )
+        write_posts = bulk_import.write_posts
+        calls = []
+
+        def failing(rows, index):
+            calls.append(rows)
+            if len(calls) == 2:
+                raise RuntimeError('обрыв')
+            return write_posts(rows, index)
+
+        with mock.patch.dict(
+            bulk_import.KINDS,
+            {'posts': (bulk_import.validate_posts, failing, Post)}
+        ):
+            with self.assertRaises(RuntimeError):
+                self.load('posts', path)
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertTrue(os.path.exists(f'{path}.checkpoint'))
+
+        totals = self.load('posts', path)
+        self.assertEqual(totals, {'written': 4, 'skipped': 0, 'errors': 0})
+        self.assertIn('Продолжение со строки 4', self.messages)
+        self.assertEqual(Post.objects.count(), 7)
+
+    def test_comments(self):
+        self.load('posts', self.write('posts.ndjson', [post_row(1)]))
+        post = imported(Post, 1)
+        version = get_version(f'comments:{post.pk}')
+        path = self.write('comments.ndjson', [
+            {'id': 10, 'post_id': 1, 'author': 'reader',
+             'text': 'Комментарий', 'created': '2023-03-01T12:00:00'},
+            {'id': 11, 'post_id': 2, 'author': 'reader',
+             'text': 'Без поста', 'created': '2023-03-01T12:00:00'},
+        ])
+        totals = self.load('comments', path)
+        self.assertEqual(totals, {'written': 1, 'skipped': 0, 'errors': 1})
+        self.assertEqual(imported(Comment, 10).post, post)
+        self.assertEqual(stats('reader').comments, 1)
+        self.assertNotEqual(get_version(f'comments:{post.pk}'), version)
+
+    def test_import_into_database_with_posts(self):
+        own = Post.objects.create(text='Свой пост', author=ImportTest.reader)
+        Comment.objects.create(
+            post=own, author=ImportTest.reader, text='Свой комментарий'
+        )
+        self.load('posts', self.write('posts.ndjson', [
+            post_row(own.pk), post_row(own.pk + 1)
+        ]))
+        self.load('comments', self.write('comments.ndjson', [
+            {'id': 1, 'post_id': own.pk, 'author': 'author',
+             'text': 'Импортированный', 'created': '2023-03-01T12:00:00'},
+        ]))
+
+        post = imported(Post, own.pk)
+        self.assertNotEqual(post.pk, own.pk)
+        self.assertEqual(Post.objects.count(), 3)
+        own.refresh_from_db()
+        self.assertEqual(own.text, 'Свой пост')
+        self.assertEqual(own.author, ImportTest.reader)
+        self.assertEqual(
+            list(own.comments.values_list('text', flat=True)),
+            ['Свой комментарий']
+        )
+        self.assertEqual(
+            list(post.comments.values_list('text', flat=True)),
+            ['Импортированный']
+        )
+        self.assertEqual(Comment.objects.count(), 2)
+
+    def test_follows(self):
+        Follow.objects.create(
+            user=ImportTest.reader, author=ImportTest.author
+        )
+        User.objects.create_user(username='third')
+        path = self.write('follows.ndjson', [
+            {'user': 'reader', 'author': 'author'},
+            {'user': 'author', 'author': 'reader'},
+            {'user': 'author', 'author': 'reader'},
+            {'user': 'third', 'author': 'third'},
+            {'user': 'third', 'author': 'author'},
+        ])
+        totals = self.load('follows', path)
+        self.assertEqual(totals, {'written': 2, 'skipped': 2, 'errors': 1})
+        self.assertEqual(Follow.objects.count(), 3)
+        self.assertEqual(stats('author').followers, 2)
+
+    def test_command(self):
+        path = self.write('posts.ndjson', [post_row(500), post_row(501)])
+        stdout = StringIO()
+        call_command(
+            'import_yatube', 'posts', path, '--workers=1', '--no-index',
+            stdout=stdout
+        )
+        self.assertIn('Записано: 2', stdout.getvalue())
+        self.assertEqual(search.search('импортированный').count(), 0)
@@ -0,0 +1,208 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Notification, NotificationEvent, Post
+from posts.notifications import flush, notify, unread_count
+
+User = get_user_model()
+
+
+def run_on_commit(func):
+    func()
+
+
+@override_settings(NOTIFICATION_WINDOW=0)
+@mock.patch('posts.notifications.transaction.on_commit', run_on_commit)
+class NotificationTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        cls.readers = [
+            User.objects.create_user(username=f'reader{i}') for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.author = Client()
+        self.author.force_login(NotificationTest.author)
+
+    def client_for(self, user):
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def test_follows_and_comments_are_coalesced(self):
+        for reader in NotificationTest.readers:
+            client = self.client_for(reader)
+            client.get(
+                reverse('posts:profile_follow', kwargs={'username': 'author'})
+            )
+            client.post(
+                reverse(
+                    'posts:add_comment',
+                    kwargs={'post_id': NotificationTest.post.pk}
+                ),
+                {'text': 'Комментарий'}
+            )
+        digests = {
+            digest.kind: digest for digest in
+            Notification.objects.filter(recipient=NotificationTest.author)
+        }
+        self.assertEqual(len(digests), 2)
+        self.assertEqual(digests[Notification.FOLLOW].count, 3)
+        self.assertEqual(digests[Notification.COMMENT].count, 3)
+        self.assertEqual(
+            digests[Notification.COMMENT].post, NotificationTest.post
+        )
+        self.assertEqual(
+            digests[Notification.FOLLOW].actor, NotificationTest.readers[-1]
+        )
+
+    def test_own_comment_is_not_notified(self):
+        self.author.post(
+            reverse(
+                'posts:add_comment',
+                kwargs={'post_id': NotificationTest.post.pk}
+            ),
+            {'text': 'Сам себе'}
+        )
+        self.assertFalse(Notification.objects.exists())
+
+    def test_unread_counter_is_cached(self):
+        author_id = NotificationTest.author.pk
+        self.assertEqual(unread_count(author_id), 0)
+        for reader in NotificationTest.readers:
+            notify(author_id, Notification.FOLLOW, reader.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(unread_count(author_id), 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(unread_count(author_id), 3)
+
+    def test_notifications_page_marks_digests_read(self):
+        notify(
+            NotificationTest.author.pk,
+            Notification.FOLLOW,
+            NotificationTest.readers[0].pk
+        )
+        url = reverse('posts:notifications')
+        response = self.author.get(url)
+        self.assertContains(response, 'Новых подписчиков: 1')
+        self.assertContains(response, 'fw-bold')
+        self.assertEqual(unread_count(NotificationTest.author.pk), 0)
+
+        response = self.author.get(url)
+        self.assertNotContains(response, 'fw-bold')
+
+        notify(
+            NotificationTest.author.pk,
+            Notification.FOLLOW,
+            NotificationTest.readers[1].pk
+        )
+        self.assertEqual(Notification.objects.count(), 2)
+        response = self.author.get(reverse('posts:index'))
+        self.assertContains(response, 'bg-danger">1<')
+
+    @mock.patch('posts.views.NOTIFICATIONS_BY_PAGE', 1)
+    def test_only_shown_digests_are_marked_read(self):
+        author_id = NotificationTest.author.pk
+        notify(author_id, Notification.FOLLOW, NotificationTest.readers[0].pk)
+        notify(author_id, Notification.COMMENT, NotificationTest.readers[0].pk,
+               post_id=NotificationTest.post.pk)
+        self.author.get(reverse('posts:notifications'))
+        self.assertEqual(unread_count(author_id), 1)
+        self.assertFalse(
+            Notification.objects.get(kind=Notification.FOLLOW).read
+        )
+
+        self.author.get(reverse('posts:notifications') + '?page=2')
+        self.assertEqual(unread_count(author_id), 0)
+
+    def test_new_notification_changes_page_etag(self):
+        url = reverse('posts:index')
+        etag = self.author.get(url)['ETag']
+        response = self.author.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        notify(
+            NotificationTest.author.pk,
+            Notification.FOLLOW,
+            NotificationTest.readers[0].pk
+        )
+        response = self.author.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(NOTIFICATION_WINDOW=60)
+@mock.patch('posts.notifications.transaction.on_commit', run_on_commit)
+class NotificationWindowTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        cls.readers = [
+            User.objects.create_user(username=f'reader{i}') for i in range(20)
+        ]
+
+    def tearDown(self):
+        flush()
+
+    def queue(self, readers):
+        for reader in readers:
+            notify(NotificationWindowTest.author.pk, Notification.FOLLOW,
+                   reader.pk)
+            notify(NotificationWindowTest.author.pk, Notification.COMMENT,
+                   reader.pk, post_id=NotificationWindowTest.post.pk)
+
+    def test_window_is_written_in_constant_queries(self):
+        readers = NotificationWindowTest.readers
+        self.queue(readers[:1])
+        self.assertFalse(Notification.objects.exists())
+        with self.assertNumQueries(7):
+            self.assertEqual(flush(), 2)
+
+        self.queue(readers)
+        with self.assertNumQueries(7):
+            self.assertEqual(flush(), 40)
+        self.assertEqual(
+            sorted(Notification.objects.values_list('kind', 'count')),
+            [(Notification.COMMENT, 21), (Notification.FOLLOW, 21)]
+        )
+
+    def test_events_for_deleted_posts_are_dropped(self):
+        post = Post.objects.create(
+            text='Удаляемый', author=NotificationWindowTest.author
+        )
+        notify(NotificationWindowTest.author.pk, Notification.COMMENT,
+               NotificationWindowTest.readers[0].pk, post_id=post.pk)
+        post.delete()
+        flush()
+        self.assertFalse(Notification.objects.exists())
+
+    def test_events_wait_in_database(self):
+        """События переживают процесс: их сворачивает любой flush."""
+        self.queue(NotificationWindowTest.readers[:2])
+        self.assertEqual(NotificationEvent.objects.count(), 4)
+        call_command('flush_notifications', stdout=StringIO())
+        self.assertFalse(NotificationEvent.objects.exists())
+        self.assertEqual(
+            sorted(Notification.objects.values_list('kind', 'count')),
+            [(Notification.COMMENT, 2), (Notification.FOLLOW, 2)]
+        )
+
+    def test_claimed_events_are_not_written_twice(self):
+        self.queue(NotificationWindowTest.readers[:1])
+        NotificationEvent.objects.update(claim='other')
+        self.assertEqual(flush(), 0)
+        self.assertFalse(Notification.objects.exists())
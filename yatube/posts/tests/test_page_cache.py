@@ -0,0 +1,150 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.fragments import feed_version
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class PageCacheTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='group',
+            description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Первый пост',
+            author=cls.author,
+            group=cls.group
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader = Client()
+        self.reader.force_login(PageCacheTest.reader)
+        self.other = Client()
+        self.other.force_login(PageCacheTest.other)
+
+    def urls(self):
+        return (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'group'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+        )
+
+    def post_queries(self, client, url):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, [
+            query['sql'] for query in context.captured_queries
+            if 'posts_post' in query['sql']
+        ]
+
+    def test_anonymous_index_hit_skips_database(self):
+        url = reverse('posts:index')
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(first.content, second.content)
+
+    def test_hits_do_not_query_posts(self):
+        for client in (self.client, self.reader):
+            cache.clear()
+            for url in self.urls():
+                with self.subTest(url=url):
+                    _, queries = self.post_queries(client, url)
+                    self.assertTrue(queries)
+                    _, queries = self.post_queries(client, url)
+                    self.assertEqual(queries, [])
+
+    def test_changes_reach_cached_pages(self):
+        for url in self.urls():
+            self.client.get(url)
+        Post.objects.create(
+            text='Второй пост',
+            author=PageCacheTest.author,
+            group=PageCacheTest.group
+        )
+        for url in self.urls():
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Второй пост')
+
+        post = Post.objects.get(pk=PageCacheTest.post.pk)
+        post.text = 'Исправленный пост'
+        post.save()
+        for url in self.urls():
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Исправленный')
+
+        group = Group.objects.get(pk=PageCacheTest.group.pk)
+        group.title = 'Новая группа'
+        group.save()
+        for url in self.urls():
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Новая группа')
+
+    def test_header_is_personal(self):
+        url = reverse('posts:index')
+        self.reader.get(url)
+        response = self.other.get(url)
+        self.assertContains(response, 'Пользователь: other')
+        self.assertNotContains(response, 'Пользователь: reader')
+        self.assertContains(response, 'Избранные авторы')
+
+        response = self.client.get(url)
+        self.assertNotContains(response, 'Пользователь:')
+        self.assertNotContains(response, 'Избранные авторы')
+        self.assertContains(response, 'Регистрация')
+
+    def test_header_is_personal_on_uncached_pages(self):
+        url = reverse(
+            'posts:post_detail', kwargs={'post_id': PageCacheTest.post.pk}
+        )
+        response = self.reader.get(url)
+        self.assertContains(response, 'Пользователь: reader')
+        self.assertNotContains(response, 'Регистрация')
+
+    def test_follow_button_is_personal(self):
+        url = reverse('posts:profile', kwargs={'username': 'author'})
+        unfollow = reverse('posts:profile_unfollow', args=['author'])
+        follow = reverse('posts:profile_follow', args=['author'])
+
+        self.assertContains(self.reader.get(url), unfollow)
+        response = self.other.get(url)
+        self.assertContains(response, follow)
+        self.assertNotContains(response, unfollow)
+        response = self.client.get(url)
+        self.assertNotContains(response, follow)
+        self.assertNotContains(response, unfollow)
+
+        self.other.get(follow)
+        self.assertContains(self.other.get(url), unfollow)
+
+    def test_markers_do_not_leak(self):
+        for client in (self.client, self.reader):
+            for url in self.urls():
+                for _ in range(2):
+                    with self.subTest(url=url):
+                        self.assertNotContains(
+                            client.get(url), '<!--personal:'
+                        )
+
+    def test_versions_survive_page_cache_clear(self):
+        version = feed_version('index')
+        cache.clear()
+        self.assertEqual(feed_version('index'), version)
@@ -0,0 +1,158 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.loader import IdentityMap
+from posts.models import Follow, Group, Post
+from posts.notifications import unread_count
+
+from .utils import QueryCountMixin
+
+User = get_user_model()
+
+
+class FeedQueryCountTest(QueryCountMixin, TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(
+            username='writer',
+            first_name='Лев',
+            last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='group',
+            description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(25):
+            author = User.objects.create_user(username=f'guest{i}')
+            Post.objects.create(text=f'Гость {i}', author=author)
+            Post.objects.create(
+                text=f'Пост {i}',
+                author=cls.author,
+                group=cls.group
+            )
+
+    def setUp(self):
+        self.reader = Client()
+        self.reader.force_login(FeedQueryCountTest.reader)
+
+    def test_list_views_have_constant_query_count(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'group'}),
+            reverse('posts:profile', kwargs={'username': 'writer'}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertConstantQueries(self.reader, url)
+
+
+class PostQueryCountTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='group',
+            description='Описание'
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other',
+            description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Пост',
+            author=cls.author,
+            group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        # Счетчик уведомлений в шапке уже в кэше, как на рабочем сайте.
+        unread_count(PostQueryCountTest.author.pk)
+        self.author = Client()
+        self.author.force_login(PostQueryCountTest.author)
+        self.edit_url = reverse(
+            'posts:post_edit',
+            kwargs={'post_id': PostQueryCountTest.post.pk}
+        )
+
+    def queries(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.author, method)(url, data or {})
+        return response, [query['sql'] for query in context.captured_queries]
+
+    def post_selects(self, queries):
+        return [
+            sql for sql in queries
+            if sql.startswith('SELECT') and 'FROM "posts_post"' in sql
+        ]
+
+    def test_post_edit_get_loads_post_once(self):
+        with self.assertNumQueries(4):
+            response, queries = self.queries('get', self.edit_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.post_selects(queries)), 1)
+
+    def test_post_edit_post_loads_post_once(self):
+        data = {
+            'text': 'Новый текст',
+            'group': PostQueryCountTest.other_group.pk,
+        }
+        with self.assertNumQueries(8):
+            response, queries = self.queries('post', self.edit_url, data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(self.post_selects(queries)), 1)
+        post = Post.objects.get(pk=PostQueryCountTest.post.pk)
+        self.assertEqual(post.group, PostQueryCountTest.other_group)
+
+    def test_post_detail_loads_post_once(self):
+        url = reverse(
+            'posts:post_detail',
+            kwargs={'post_id': PostQueryCountTest.post.pk}
+        )
+        with self.assertNumQueries(4):
+            response, queries = self.queries('get', url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.post_selects(queries)), 1)
+
+
+class IdentityMapTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.post = Post.objects.create(
+            text='Пост',
+            author=User.objects.create_user(username='author')
+        )
+
+    def test_object_is_loaded_once(self):
+        identity_map = IdentityMap()
+        with self.assertNumQueries(1):
+            post = identity_map.get(Post, IdentityMapTest.post.pk)
+            self.assertIs(
+                identity_map.get(Post, str(IdentityMapTest.post.pk)), post
+            )
+            self.assertEqual(post.author.username, 'author')
+
+    def test_missing_object_is_remembered(self):
+        identity_map = IdentityMap()
+        with self.assertNumQueries(1):
+            self.assertIsNone(identity_map.get(Post, 0))
+            self.assertIsNone(identity_map.get(Post, 0))
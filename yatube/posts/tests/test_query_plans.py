@@ -0,0 +1,139 @@
+import re
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.utils import CURSOR_PREVIOUS, encode_cursor
+
+User = get_user_model()
+
+# Строка плана SQLite без индекса: "SCAN posts_post" (в старых версиях
+# "SCAN TABLE posts_post"). Проход по индексу ("SCAN ... USING INDEX")
+# и поиск ("SEARCH ...") допустимы.
+FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(?!CONSTANT ROW)\S+$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class QueryPlanTest(TestCase):
+    """
+    Планы всех SELECT, которые выполняют страницы: ни один не должен
+    читать таблицу целиком или сортировать строки во временном B-дереве.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='group',
+            description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(30):
+            cls.post = Post.objects.create(
+                text=f'Пост {i}',
+                author=cls.author,
+                group=cls.group
+            )
+            Comment.objects.create(
+                post=cls.post,
+                author=cls.reader,
+                text=f'Комментарий {i}'
+            )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(QueryPlanTest.reader)
+
+    def pages(self):
+        group = {'slug': 'group'}
+        profile = {'username': 'writer'}
+        post = {'post_id': QueryPlanTest.post.pk}
+        last = QueryPlanTest.post
+        after = {'cursor': encode_cursor(last.pub_date, last.pk)}
+        before = {
+            'cursor': encode_cursor(last.pub_date, last.pk, CURSOR_PREVIOUS)
+        }
+        return [
+            ('posts:index', {}, {}),
+            ('posts:index', {}, after),
+            ('posts:index', {}, before),
+            ('posts:group_list', group, {}),
+            ('posts:group_list', group, after),
+            ('posts:profile', profile, {}),
+            ('posts:profile', profile, before),
+            ('posts:post_detail', post, {}),
+            ('posts:post_comments', post, {}),
+            ('posts:follow_index', {}, {}),
+            ('posts:search', {}, {'q': 'пост'}),
+            ('posts:api_index', {}, {}),
+            ('posts:api_index', {}, {'group': 'group', **after}),
+            ('posts:api_index', {}, {'author': 'writer', **before}),
+            ('posts:api_post_detail', post, {}),
+            ('posts:api_post_comments', post, {}),
+            ('posts:api_follow_index', {}, {}),
+        ]
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def problems(self, plan):
+        return [
+            line for line in plan
+            if FULL_SCAN.match(line) or TEMP_SORT in line
+        ]
+
+    def test_views_use_indexes(self):
+        for name, kwargs, params in self.pages():
+            with self.subTest(view=name, params=params):
+                cache.clear()
+                with CaptureQueriesContext(connection) as context:
+                    response = self.client.get(
+                        reverse(name, kwargs=kwargs), params
+                    )
+                self.assertEqual(response.status_code, 200)
+                for query in context.captured_queries:
+                    sql = query['sql']
+                    if not sql.startswith('SELECT'):
+                        continue
+                    plan = self.explain(sql)
+                    self.assertEqual(
+                        self.problems(plan), [],
+                        f'\n{sql}\n' + '\n'.join(plan)
+                    )
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_follow_feed_sorts_only_hot_posts(self):
+        """
+        С горячими авторами лента сливает записи FeedEntry, идущие по
+        индексу, с отсортированными постами горячих авторов.
+        """
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse('posts:follow_index'))
+        sql = next(
+            query['sql'] for query in context.captured_queries
+            if 'UNION ALL' in query['sql'] and 'ORDER BY' in query['sql']
+        )
+        plan = self.explain(sql)
+        self.assertEqual(plan[0], 'MERGE (UNION ALL)', plan)
+        right = plan.index('RIGHT')
+        self.assertEqual(self.problems(plan[:right]), [], plan)
+        self.assertFalse(any(FULL_SCAN.match(line) for line in plan), plan)
+
+    def test_detects_regressions(self):
+        plan = self.explain(
+            'SELECT * FROM posts_post ORDER BY length(text)'
+        )
+        self.assertEqual(len(self.problems(plan)), 2, plan)
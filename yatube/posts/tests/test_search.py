@@ -0,0 +1,129 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    backend_class = search.SQLiteSearchBackend
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            text='Кошки спят <b>весь</b> день, кошки любят тепло',
+            author=cls.author
+        )
+        cls.other = Post.objects.create(
+            text='Собаки гуляют, а кошки смотрят в окно',
+            author=cls.author
+        )
+        cls.comment = Comment.objects.create(
+            post=cls.other,
+            author=cls.author,
+            text='Попугаи тоже любят тепло'
+        )
+
+    def hits(self, query):
+        return list(search.search(query)[:10])
+
+    def found(self, query):
+        return {(hit.kind, hit.object_id) for hit in self.hits(query)}
+
+    def test_backend_selection(self):
+        self.assertIsInstance(search.get_backend(), self.backend_class)
+
+    def test_finds_posts_and_comments_ranked(self):
+        hits = self.hits('кошки')
+        self.assertEqual(
+            [hit.object_id for hit in hits],
+            [self.post.pk, self.other.pk],
+            'Пост с двумя вхождениями должен быть выше'
+        )
+        self.assertEqual(
+            self.found('тепло'),
+            {
+                (search.POST, self.post.pk),
+                (search.COMMENT, self.comment.pk),
+            }
+        )
+        self.assertEqual(search.search('тепло').count(), 2)
+
+    def test_prefix_and_empty_queries(self):
+        self.assertIn((search.POST, self.other.pk), self.found('соба'))
+        self.assertEqual(self.hits('"*: ()'), [])
+        self.assertEqual(search.search('').count(), 0)
+
+    def test_snippet_is_escaped_and_highlighted(self):
+        snippet = self.hits('день')[0].snippet
+        self.assertIn('<mark>день</mark>', snippet)
+        self.assertIn('&lt;b&gt;', snippet)
+        self.assertNotIn('<b>', snippet)
+
+    def test_index_follows_edits_and_deletes(self):
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Хомяки'
+        post.save()
+        self.assertNotIn((search.POST, post.pk), self.found('кошки'))
+        self.assertIn((search.POST, post.pk), self.found('хомяки'))
+
+        Post.objects.get(pk=self.other.pk).delete()
+        self.assertEqual(self.found('попугаи'), set())
+        self.assertEqual(self.found('собаки'), set())
+
+    def test_view_paginates_results(self):
+        for number in range(12):
+            Post.objects.create(
+                text=f'Жирафы номер {number}',
+                author=self.author
+            )
+        response = self.client.get(reverse('posts:search'), {'q': 'жирафы'})
+        self.assertEqual(response.context['page_obj'].paginator.count, 12)
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertContains(response, '?q=%D0%B6%D0%B8%D1%80%D0%B0%D1%84')
+        self.assertContains(response, '<mark>Жирафы</mark>')
+
+        response = self.client.get(
+            reverse('posts:search'), {'q': 'жирафы', 'page': 2}
+        )
+        self.assertEqual(len(response.context['page_obj']), 2)
+        hit = response.context['page_obj'][0]
+        self.assertEqual(hit.post.pk, hit.post_id)
+
+    def test_rebuild_command_restores_index(self):
+        search.get_backend().clear()
+        self.assertEqual(self.found('кошки'), set())
+        out = StringIO()
+        call_command('rebuild_search_index', '--batch-size', '2', stdout=out)
+        self.assertIn('3', out.getvalue())
+        self.assertEqual(len(self.found('кошки')), 2)
+
+
+class PythonSearchBackendTest(SearchTest):
+    backend_class = search.PythonSearchBackend
+
+    def setUp(self):
+        patcher = mock.patch(
+            'posts.search._backend', search.PythonSearchBackend()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        search.reindex()
+
+    def test_prefix_and_empty_queries(self):
+        self.assertIn(
+            (search.POST, self.other.pk), self.found('собаки')
+        )
+        self.assertEqual(self.found('соба'), set())
+        self.assertEqual(self.hits('"*: ()'), [])
+        self.assertEqual(search.search('').count(), 0)
@@ -0,0 +1,96 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+
+from posts import search
+from posts.models import Comment, FeedEntry, Follow, Group, Post, User
+from posts.stats import rebuild_stats
+
+
+class SeedCommandTest(TestCase):
+
+    def seed(self, **options):
+        options = {
+            'users': 50,
+            'groups': 3,
+            'posts': 300,
+            'comments': 200,
+            'follows': 150,
+            'batch_size': 64,
+            **options,
+        }
+        call_command(
+            'seed_yatube',
+            *[f'--{name.replace("_", "-")}={value}'
+              for name, value in options.items()],
+            stdout=StringIO()
+        )
+
+    def test_creates_requested_data(self):
+        self.seed()
+        self.assertEqual(User.objects.count(), 50)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Comment.objects.count(), 200)
+        self.assertTrue(0 < Follow.objects.count() <= 150)
+        self.assertFalse(Follow.objects.filter(user=F('author')).exists())
+
+    def test_comments_follow_their_posts(self):
+        self.seed()
+        self.assertFalse(
+            Comment.objects.filter(created__lt=F('post__pub_date')).exists(),
+            'Комментарий датирован раньше своего поста'
+        )
+
+    def test_reports_created_comments(self):
+        out = StringIO()
+        call_command(
+            'seed_yatube', '--users=5', '--groups=0', '--posts=0',
+            '--comments=100', '--follows=0', stdout=out
+        )
+        self.assertIn('Комментариев: 0', out.getvalue())
+        self.assertFalse(Comment.objects.exists())
+
+    def test_power_law_and_spread_dates(self):
+        self.seed()
+        counts = sorted(
+            User.objects.values_list('stats__posts', flat=True),
+            reverse=True
+        )
+        self.assertGreater(
+            sum(counts[:5]), sum(counts) // 4,
+            'Немногие авторы должны писать заметную долю постов'
+        )
+        self.assertGreater(
+            Post.objects.values('pub_date__date').distinct().count(), 30
+        )
+
+    def test_derived_data_is_consistent(self):
+        self.seed()
+        self.assertEqual(rebuild_stats(verify=True), 0)
+        follow = Follow.objects.first()
+        self.assertEqual(
+            FeedEntry.objects.filter(user_id=follow.user_id).count(),
+            Post.objects.filter(
+                author__following__user_id=follow.user_id
+            ).count()
+        )
+        word = Post.objects.first().text.split()[0]
+        self.assertGreater(search.search(word).count(), 0)
+
+    def test_is_deterministic_and_repeatable(self):
+        self.seed(seed=7)
+        texts = list(
+            Post.objects.order_by('pk').values_list('text', flat=True)
+        )
+        Post.objects.all().delete()
+        self.seed(seed=7)
+        self.assertEqual(User.objects.count(), 100)
+        self.assertEqual(
+            list(
+                Post.objects.order_by('pk').values_list('text', flat=True)
+            ),
+            texts
+        )
@@ -0,0 +1,75 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class UserStatsTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_writes(self):
+        post = Post.objects.create(text='Пост', author=UserStatsTest.author)
+        Post.objects.create(text='Еще пост', author=UserStatsTest.author)
+        Comment.objects.create(
+            post=post,
+            author=UserStatsTest.reader,
+            text='Комментарий'
+        )
+        Follow.objects.create(
+            user=UserStatsTest.reader,
+            author=UserStatsTest.author
+        )
+        author_stats = self.stats(UserStatsTest.author)
+        reader_stats = self.stats(UserStatsTest.reader)
+        self.assertEqual(author_stats.posts, 2)
+        self.assertEqual(author_stats.followers, 1)
+        self.assertEqual(reader_stats.comments, 1)
+        self.assertEqual(reader_stats.following, 1)
+
+        post.delete()
+        Follow.objects.all().delete()
+        author_stats.refresh_from_db()
+        reader_stats.refresh_from_db()
+        self.assertEqual(author_stats.posts, 1)
+        self.assertEqual(author_stats.followers, 0)
+        self.assertEqual(reader_stats.comments, 0)
+        self.assertEqual(reader_stats.following, 0)
+
+    def test_profile_does_not_count_posts(self):
+        Post.objects.create(text='Пост', author=UserStatsTest.author)
+        url = reverse('posts:profile', kwargs={'username': 'author'})
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.context['post_count'], 1)
+        counts = [
+            query for query in context.captured_queries
+            if 'COUNT(' in query['sql']
+        ]
+        self.assertEqual(counts, [], 'Страница не должна считать посты')
+
+    def test_rebuild_command_fixes_drift(self):
+        Post.objects.create(text='Пост', author=UserStatsTest.author)
+        UserStats.objects.filter(user=UserStatsTest.author).update(posts=7)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_user_stats', '--verify', stdout=StringIO())
+        call_command('rebuild_user_stats', stdout=StringIO())
+        call_command('rebuild_user_stats', '--verify', stdout=StringIO())
+        self.assertEqual(self.stats(UserStatsTest.author).posts, 1)
@@ -0,0 +1,89 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail import default
+
+from posts.models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def run_on_commit(func):
+    func()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailPipelineTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        default.kvstore.clear()
+
+    def create_post(self):
+        return Post.objects.create(
+            text='Пост с картинкой',
+            author=ThumbnailPipelineTest.author,
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=SMALL_GIF,
+                content_type='image/gif'
+            )
+        )
+
+    def test_render_does_not_block_on_missing_thumbnail(self):
+        """Без готовой миниатюры страница выводит заглушку."""
+        post = self.create_post()
+        with mock.patch('posts.thumbnails.generate') as generate:
+            with mock.patch(
+                'posts.thumbnails.transaction.on_commit', run_on_commit
+            ):
+                response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Изображение обрабатывается')
+        generate.assert_called_once()
+        self.assertIsNone(
+            default.backend.get_cached(
+                post.image, '960x339', crop='center', upscale=True
+            )
+        )
+
+    def test_thumbnails_generated_on_save(self):
+        with mock.patch(
+            'posts.thumbnails.transaction.on_commit', run_on_commit
+        ):
+            post = self.create_post()
+        thumbnail = default.backend.get_cached(
+            post.image, '960x339', crop='center', upscale=True
+        )
+        self.assertIsNotNone(thumbnail, 'Миниатюра не создана при сохранении')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, thumbnail.url)
+        self.assertContains(response, ' 2x')
+        self.assertNotContains(response, 'Изображение обрабатывается')
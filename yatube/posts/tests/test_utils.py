@@ -0,0 +1,142 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+from posts.utils import CursorPaginator, page_window
+
+User = get_user_model()
+
+
+class CursorPaginatorTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='writer')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        for i in range(25):
+            Post.objects.create(
+                text=f'Post {i}', author=cls.author, group=cls.group
+            )
+        cls.expected_ids = list(
+            Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True
+            )
+        )
+
+    def setUp(self):
+        self.paginator = CursorPaginator(Post.objects.all(), 10)
+
+    def test_pages_cover_feed_without_gaps(self):
+        """Проход по next-курсорам возвращает все посты по порядку."""
+        collected = []
+        page = self.paginator.get_page()
+        self.assertFalse(page.has_previous())
+        while True:
+            collected.extend(post.pk for post in page)
+            if not page.has_next():
+                break
+            page = self.paginator.get_page(page.next_cursor)
+        self.assertEqual(collected, CursorPaginatorTest.expected_ids)
+
+    def test_previous_cursor_returns_previous_page(self):
+        first = self.paginator.get_page()
+        second = self.paginator.get_page(first.next_cursor)
+        back = self.paginator.get_page(second.previous_cursor)
+        self.assertEqual(
+            [post.pk for post in back], [post.pk for post in first]
+        )
+        self.assertFalse(back.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_page_is_single_query(self):
+        """Страница выбирается одним запросом, без COUNT(*)."""
+        first = self.paginator.get_page()
+        with self.assertNumQueries(1):
+            self.paginator.get_page(first.next_cursor)
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        for cursor in ('garbage', 'eHx5fHo', '', None):
+            with self.subTest(cursor=cursor):
+                page = self.paginator.get_page(cursor)
+                self.assertEqual(
+                    page[0].pk, CursorPaginatorTest.expected_ids[0]
+                )
+
+    def test_feeds_page_by_cursor(self):
+        """Ленты листаются курсором: без COUNT(*) и OFFSET."""
+        self.client.force_login(CursorPaginatorTest.reader)
+        feeds = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'group'}),
+            reverse('posts:profile', kwargs={'username': 'writer'}),
+            reverse('posts:follow_index'),
+        ]
+        for url in feeds:
+            with self.subTest(url=url):
+                cache.clear()
+                with CaptureQueriesContext(connection) as context:
+                    response = self.client.get(url)
+                page_obj = response.context['page_obj']
+                self.assertIs(type(page_obj), Page)
+                self.assertEqual(
+                    [post.pk for post in page_obj],
+                    CursorPaginatorTest.expected_ids[:10]
+                )
+                self.assertContains(
+                    response, f'?cursor={page_obj.next_cursor}'
+                )
+                sql = ' '.join(
+                    query['sql'] for query in context.captured_queries
+                ).upper()
+                self.assertNotIn('COUNT(*)', sql)
+                self.assertNotIn('OFFSET', sql)
+
+                response = self.client.get(
+                    url, {'cursor': page_obj.next_cursor}
+                )
+                self.assertEqual(
+                    [post.pk for post in response.context['page_obj']],
+                    CursorPaginatorTest.expected_ids[10:20]
+                )
+
+
+class PageWindowTest(SimpleTestCase):
+
+    def window(self, number, num_pages):
+        page = Paginator(range(num_pages), 1).page(number)
+        return page_window(page)
+
+    def test_small_paginator_shows_all_pages(self):
+        self.assertEqual(self.window(3, 5), [1, 2, 3, 4, 5])
+
+    def test_gaps_are_elided(self):
+        self.assertEqual(
+            self.window(10000, 20000),
+            [1, None, 9998, 9999, 10000, 10001, 10002, None, 20000]
+        )
+        self.assertEqual(self.window(1, 20000), [1, 2, 3, None, 20000])
+
+    def test_single_missing_page_is_shown_instead_of_gap(self):
+        self.assertEqual(self.window(5, 9), list(range(1, 10)))
+
+    def test_template_renders_only_window(self):
+        page = Paginator(range(200000), 10).page(7)
+        html = render_to_string(
+            'posts/includes/paginator.html',
+            {'page_obj': page, 'paginator_query': 'q=x&'}
+        )
+        self.assertEqual(html.count('class="page-item'), 13)
+        self.assertIn('href="?q=x&amp;page=20000"', html)
+        self.assertIn('…', html)
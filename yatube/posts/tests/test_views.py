@@ -5,7 +5,6 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.db.models.query import EmptyQuerySet
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
@@ -50,6 +49,7 @@ class PostViewsTests(TestCase):
             )
 
     def setUp(self):
+        cache.clear()
         self.test_post_id = 1
         self.post_author = Client()
         self.post_author.force_login(PostViewsTests.post_author)
@@ -127,7 +127,10 @@ class PostViewsTests(TestCase):
                     response.context.get('page_obj'),
                     f'Страница {reverse_name} не получила постов'
                 )
-                response_pg2 = self.post_author.get(reverse_name + '?page=2')
+                response_pg2 = self.post_author.get(
+                    reverse_name,
+                    {'cursor': response.context['page_obj'].next_cursor}
+                )
                 self.assertEqual(
                     len(response.context['page_obj']), POSTS_BY_PAGE,
                     'Что-то не так с 1 страницей '
@@ -282,9 +285,9 @@ class PostAppearanceTest(TestCase):
             response = self.post_author.get(self.post_appearance_dict[name])
             page_obj = response.context.get('page_obj')
             if name != 'wrong':
-                self.assertNotIsInstance(page_obj.object_list, EmptyQuerySet)
+                self.assertTrue(page_obj.object_list)
             else:
-                self.assertIsInstance(page_obj.object_list, EmptyQuerySet)
+                self.assertFalse(page_obj.object_list)
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -431,9 +434,15 @@ class CacheTest(TestCase):
         cls.post_author = User.objects.create(
             username='author'
         )
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='cached-group',
+            description='Описание'
+        )
         cls.post_in_cache = Post.objects.create(
             text='Тестовый текст',
-            author=cls.post_author
+            author=cls.post_author,
+            group=cls.group
         )
 
     def setUp(self):
@@ -454,7 +463,9 @@ class CacheTest(TestCase):
             page_obj1[0].id, CacheTest.post_in_cache.id
         )
 
-        Post.objects.filter(id=CacheTest.post_in_cache.id).delete()
+        Post.objects.filter(id=CacheTest.post_in_cache.id).update(
+            text='Изменено в обход сигналов'
+        )
 
         response2 = self.client.get(
             reverse('posts:index')
@@ -462,10 +473,10 @@ class CacheTest(TestCase):
         content2 = response2.content
         self.assertEqual(
             content1, content2,
-            'Количество постов не равно тому, которое было до удаления'
+            'Страница не взята из кэша'
         )
 
-        cache.clear()
+        Post.objects.filter(id=CacheTest.post_in_cache.id).delete()
 
         response3 = self.client.get(
             reverse('posts:index')
@@ -474,8 +485,64 @@ class CacheTest(TestCase):
         self.assertNotEqual(
             content1,
             content3,
-            'Пост остался на странице после очистки кэша'
+            'Пост остался на странице после удаления'
+        )
+
+    def test_cache_invalidated_on_edit(self):
+        url = reverse('posts:group_list', kwargs={'slug': 'cached-group'})
+        self.client.get(url)
+        post = Post.objects.get(pk=CacheTest.post_in_cache.pk)
+        post.text = 'Отредактированный текст'
+        post.save()
+        self.assertContains(self.client.get(url), 'Отредактированный текст')
+
+    def test_cache_invalidated_on_group_edit(self):
+        url = reverse('posts:index')
+        self.client.get(url)
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertContains(self.client.get(url), 'Новое название')
+
+    def test_cache_invalidated_on_author_rename(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'cached-group'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse(
+                'posts:post_detail',
+                kwargs={'post_id': CacheTest.post_in_cache.pk}
+            ),
+        ]
+        for url in urls:
+            self.client.get(url)
+        author = User.objects.get(pk=CacheTest.post_author.pk)
+        author.first_name = 'Новое'
+        author.last_name = 'Имя'
+        author.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Новое Имя')
+
+    def test_login_keeps_cache(self):
+        url = reverse('posts:index')
+        self.client.get(url)
+        Post.objects.filter(pk=CacheTest.post_in_cache.pk).update(
+            text='Изменено в обход сигналов'
+        )
+        self.client.force_login(CacheTest.post_author)
+        self.client.logout()
+        self.assertNotContains(self.client.get(url), 'Изменено')
+
+    def test_pages_cached_separately(self):
+        for i in range(POSTS_BY_PAGE):
+            Post.objects.create(text=f'Пост {i}', author=self.post_author)
+        page1 = self.client.get(reverse('posts:index'))
+        page2 = self.client.get(
+            reverse('posts:index'),
+            {'cursor': page1.context['page_obj'].next_cursor}
         )
+        self.assertNotContains(page1, 'Тестовый текст')
+        self.assertContains(page2, 'Тестовый текст')
 
 
 class SubscriptionTest(TestCase):
@@ -0,0 +1,29 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountMixin:
+    """Проверки числа SQL-запросов для страниц с паджинацией."""
+
+    page_sizes = (1, 5, 20)
+
+    def count_queries(self, client, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        return response, len(context.captured_queries)
+
+    def assertConstantQueries(self, client, url, page_sizes=None):
+        """Число запросов к странице не зависит от размера страницы."""
+        counts = {}
+        for size in page_sizes or self.page_sizes:
+            with mock.patch('posts.views.POSTS_BY_PAGE', size):
+                response, counts[size] = self.count_queries(client, url)
+            self.assertEqual(len(response.context['page_obj']), size)
+        self.assertEqual(
+            len(set(counts.values())), 1,
+            f'Число запросов к {url} зависит от размера страницы: {counts}'
+        )
@@ -0,0 +1,129 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from .fragments import invalidate, post_scopes
+from .images import modern_formats
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_lock = threading.Lock()
+_pending = set()
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails'
+            )
+    return _executor
+
+
+def _job_key(name, geometry, options):
+    return name, geometry, tuple(sorted(options.items()))
+
+
+def schedule(name, presets):
+    """
+    Ставит генерацию миниатюр в очередь после фиксации транзакции,
+    чтобы воркер видел сохраненный пост. Повторные задания для уже
+    ожидающих миниатюр отбрасываются.
+    """
+    def submit():
+        with _lock:
+            jobs = [
+                (geometry, options) for geometry, options in presets
+                if _job_key(name, geometry, options) not in _pending
+            ]
+            _pending.update(_job_key(name, *job) for job in jobs)
+        if not jobs:
+            return
+        if settings.THUMBNAIL_WORKERS:
+            get_executor().submit(generate, name, jobs, True)
+        else:
+            generate(name, jobs)
+
+    transaction.on_commit(submit)
+
+
+def post_presets():
+    """Пресеты POST_THUMBNAILS плюс их варианты в современных форматах."""
+    presets = list(settings.POST_THUMBNAILS)
+    for image_format in modern_formats():
+        presets.extend(
+            (geometry, {**options, 'format': image_format})
+            for geometry, options in settings.POST_THUMBNAILS
+        )
+    return presets
+
+
+def schedule_post(post):
+    if post.image:
+        schedule(post.image.name, post_presets())
+
+
+def generate(name, presets, in_worker=False):
+    try:
+        if not default_storage.exists(name):
+            return
+        for geometry, options in presets:
+            default.backend.generate(name, geometry, **dict(options))
+        posts = Post.objects.filter(image=name).only('author', 'group')
+        for post in posts:
+            invalidate(*post_scopes(post))
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+    finally:
+        with _lock:
+            _pending.difference_update(
+                _job_key(name, *preset) for preset in presets
+            )
+        if in_worker:
+            connections.close_all()
+
+
+class DeferredThumbnailBackend(ThumbnailBackend):
+    """
+    Бэкенд sorl-thumbnail, который не создает миниатюру внутри запроса:
+    если ее еще нет, генерация уходит в фоновый пул, а шаблонный тег
+    получает None и выводит блок {% empty %}.
+    """
+
+    def get_cached(self, file_, geometry_string, **options):
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if not file_:
+            return super().get_thumbnail(file_, geometry_string, **options)
+        thumbnail = self.get_cached(file_, geometry_string, **options)
+        if thumbnail:
+            return thumbnail
+        schedule(ImageFile(file_).name, [(geometry_string, options)])
+        return None
+
+    def generate(self, file_, geometry_string, **options):
+        return super().get_thumbnail(file_, geometry_string, **options)
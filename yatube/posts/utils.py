@@ -1,11 +1,173 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+import copy
+import itertools
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+CURSOR_PARAM = 'cursor'
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(value, pk, direction=CURSOR_NEXT):
+    raw = f'{direction}|{value.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Возвращает (направление, значение ключа, pk) из курсора."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, value, pk = raw.split('|')
+        value = parse_datetime(value)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(cursor)
+    if value is None or direction not in (CURSOR_NEXT, CURSOR_PREVIOUS):
+        raise InvalidCursor(cursor)
+    return direction, value, pk
+
+
+class CursorPaginator(Paginator):
+    """
+    Keyset-паджинатор по паре (order_field, pk) в порядке убывания.
+    В отличие от Paginator не выполняет COUNT(*) и OFFSET: каждая страница
+    выбирается одним запросом по индексу независимо от глубины.
+
+    get_page возвращает обычный Page с курсорами next_cursor
+    и previous_cursor. Номера у такой страницы условные: 2, если есть
+    предыдущая, иначе 1, и страниц на одну больше, если есть следующая.
+    Этого хватает has_next, has_previous и has_other_pages.
+    """
+    keyset = True
+
+    def __init__(self, object_list, per_page, order_field='pub_date'):
+        # Paginator.__init__ не вызывается: он предупреждает
+        # о неупорядоченном списке, а порядок здесь задает get_page.
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.orphans = 0
+        self.allow_empty_first_page = True
+        self.order_field = order_field
+
+    def _page(self, rows, next_cursor, previous_cursor):
+        number = 1 if previous_cursor is None else 2
+        position = copy.copy(self)
+        position.num_pages = number + (next_cursor is not None)
+        page = Page(rows, number, position)
+        page.next_cursor = next_cursor
+        page.previous_cursor = previous_cursor
+        return page
+
+    def _cursor(self, obj, direction):
+        return encode_cursor(
+            getattr(obj, self.order_field), obj.pk, direction
+        )
+
+    def _after(self, value, pk):
+        field = self.order_field
+        return (
+            Q(**{f'{field}__lt': value})
+            | Q(**{field: value, 'pk__lt': pk})
+        )
+
+    def _before(self, value, pk):
+        field = self.order_field
+        return (
+            Q(**{f'{field}__gt': value})
+            | Q(**{field: value, 'pk__gt': pk})
+        )
+
+    def _page_cursors(self, rows, direction, has_more):
+        if not rows:
+            return None, None
+        if direction == CURSOR_PREVIOUS:
+            previous_cursor = None
+            if has_more:
+                previous_cursor = self._cursor(rows[0], CURSOR_PREVIOUS)
+            return self._cursor(rows[-1], CURSOR_NEXT), previous_cursor
+        next_cursor = previous_cursor = None
+        if has_more:
+            next_cursor = self._cursor(rows[-1], CURSOR_NEXT)
+        if direction == CURSOR_NEXT:
+            previous_cursor = self._cursor(rows[0], CURSOR_PREVIOUS)
+        return next_cursor, previous_cursor
+
+    def get_page(self, cursor=None):
+        try:
+            direction, value, pk = decode_cursor(cursor or '')
+        except InvalidCursor:
+            direction = None
+
+        field = self.order_field
+        queryset = self.object_list.order_by(f'-{field}', '-pk')
+        if direction == CURSOR_NEXT:
+            queryset = queryset.filter(self._after(value, pk))
+        elif direction == CURSOR_PREVIOUS:
+            queryset = self.object_list.filter(
+                self._before(value, pk)
+            ).order_by(field, 'pk')
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == CURSOR_PREVIOUS:
+            rows.reverse()
+
+        next_cursor, previous_cursor = self._page_cursors(
+            rows, direction, has_more
+        )
+        return self._page(rows, next_cursor, previous_cursor)
 
 
 def paginator_func(request, post_list, posts_by_page):
-    paginator = Paginator(post_list, posts_by_page)
+    """
+    Страница ленты по курсору из запроса; без курсора — первая. Номеров
+    страниц у ленты нет, поэтому нет ни COUNT(*), ни OFFSET, и глубокая
+    страница выбирается так же быстро, как первая.
+    """
+    paginator = CursorPaginator(post_list, posts_by_page)
+    return paginator.get_page(request.GET.get(CURSOR_PARAM))
+
 
-    page_number = request.GET.get('page')
+def comments_page(post, cursor, per_page):
+    """Страница комментариев поста от новых к старым, с авторами."""
+    comments = post.comments.select_related('author').only(
+        'text', 'created', 'post', 'author__username'
+    )
+    paginator = CursorPaginator(comments, per_page, order_field='created')
+    return paginator.get_page(cursor)
 
-    page_obj = paginator.get_page(page_number)
 
-    return page_obj
+def page_window(page_obj, on_each_side=2, on_ends=1):
+    """
+    Номера страниц для навигации: on_ends страниц с каждого края
+    и on_each_side вокруг текущей. На месте пропущенных страниц
+    стоит None. Длина списка не зависит от общего числа страниц.
+    """
+    number = page_obj.number
+    num_pages = page_obj.paginator.num_pages
+    shown = sorted({
+        page for page in itertools.chain(
+            range(1, on_ends + 1),
+            range(number - on_each_side, number + on_each_side + 1),
+            range(num_pages - on_ends + 1, num_pages + 1),
+        )
+        if 1 <= page <= num_pages
+    })
+    window = []
+    for page in shown:
+        if window and page - window[-1] > 2:
+            window.append(None)
+        elif window and page - window[-1] == 2:
+            window.append(page - 1)
+        window.append(page)
+    return window
@@ -1,78 +1,104 @@
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.http import urlencode
 from django.views.generic.base import TemplateView
 
-from yatube.settings import POSTS_BY_PAGE
+from core.ratelimit import rate_limit
+from yatube.settings import (COMMENTS_BY_PAGE, NOTIFICATIONS_BY_PAGE,
+                             POSTS_BY_PAGE)
 
-from .decorators import author_required
-from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post, User
-from .utils import paginator_func
+from .conditional import (conditional_page, group_scopes, index_scopes,
+                          post_detail_scopes, profile_scopes)
+from .decorators import author_required, limited_uploads
+from .export import CONTENT_TYPES, EXPORTS, export
+from .feed import follow_feed
+from .forms import CommentForm, ExportForm, PostForm
+from .fragments import feed_version
+from .loader import load_or_404
+from .models import Follow, Group, Notification, Post, User
+from .notifications import mark_read
+from .page_cache import cached_page
+from .search import attach_posts, search
+from .stats import get_stats
+from .utils import comments_page, paginator_func
+
+
+COMMENTS_CURSOR_PARAM = 'comments'
 
 
 class PostCreatedView(TemplateView):
     template_name = 'posts/post_created.html'
 
 
+@conditional_page(index_scopes)
+@cached_page(index_scopes)
 def index(request):
-    post_list = Post.objects.select_related('group').all()
+    post_list = Post.objects.for_feed()
     page_obj = paginator_func(request, post_list, POSTS_BY_PAGE)
 
     context = {
         'page_obj': page_obj,
-        'index': True
+        'index': True,
+        'feed_version': feed_version('index'),
     }
     template = 'posts/index.html'
     return render(request, template, context)
 
 
+@conditional_page(group_scopes)
+@cached_page(group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
 
-    post_list = group.posts.all()
+    post_list = group.posts.for_feed()
     page_obj = paginator_func(request, post_list, POSTS_BY_PAGE)
 
     context = {
         'group': group,
         'page_obj': page_obj,
+        'feed_version': feed_version(f'group:{group.pk}'),
     }
     template = 'posts/group_list.html'
     return render(request, template, context)
 
 
+@conditional_page(profile_scopes)
+@cached_page(profile_scopes)
 def profile(request, username):
-    user_profile = get_object_or_404(User, username=username)
-    post_list = user_profile.posts.all()
+    user_profile = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username
+    )
+    post_list = user_profile.posts.for_feed()
     page_obj = paginator_func(request, post_list, POSTS_BY_PAGE)
 
-    post_count = user_profile.posts.count()
+    stats = get_stats(user_profile)
 
     context = {
         'user_profile': user_profile,
         'page_obj': page_obj,
-        'post_count': post_count,
+        'post_count': stats.posts,
+        'stats': stats,
+        'feed_version': feed_version(f'profile:{user_profile.pk}'),
     }
 
-    if request.user.is_authenticated and user_profile is not request.user:
-        following = Follow.objects.filter(
-            user=request.user,
-            author=user_profile
-        ).exists()
-        context['following'] = following
-    else:
-        context['following'] = None
-
     template = 'posts/profile.html'
     return render(request, template, context)
 
 
+@conditional_page(post_detail_scopes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    post_count = post.author.posts.count()
+    post = load_or_404(request, Post, post_id)
+    post_count = get_stats(post.author).posts
     post_preview = post.__str__()
-    comments = Comment.objects.filter(post=post)
+    comments = comments_page(
+        post, request.GET.get(COMMENTS_CURSOR_PARAM), COMMENTS_BY_PAGE
+    )
 
-    is_author = request.user.id == post.author.id
+    is_author = request.user.id == post.author_id
 
     form = CommentForm()
 
@@ -88,6 +114,38 @@ def post_detail(request, post_id):
     return render(request, template, context)
 
 
+def search_posts(request):
+    query = request.GET.get('q', '').strip()
+
+    paginator = Paginator(search(query), POSTS_BY_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    attach_posts(page_obj.object_list)
+
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'paginator_query': f'{urlencode({"q": query})}&',
+    }
+    template = 'posts/search.html'
+    return render(request, template, context)
+
+
+def post_comments(request, post_id):
+    """Следующая страница комментариев — HTML-фрагмент для подгрузки."""
+    post = get_object_or_404(Post.objects.only('id'), pk=post_id)
+    comments = comments_page(
+        post, request.GET.get(COMMENTS_CURSOR_PARAM), COMMENTS_BY_PAGE
+    )
+    context = {
+        'post': post,
+        'comments': comments,
+    }
+    template = 'posts/includes/comment_list.html'
+    return render(request, template, context)
+
+
+@rate_limit('post_create', methods=('POST',))
+@limited_uploads
 @login_required
 def post_create(request):
     template = 'posts/create_post.html'
@@ -112,12 +170,13 @@ def post_create(request):
         return render(request, template, context)
 
 
+@limited_uploads
 @author_required
 @login_required
 def post_edit(request, post_id):
     template = 'posts/create_post.html'
 
-    post = get_object_or_404(Post, pk=post_id)
+    post = load_or_404(request, Post, post_id)
 
     form = PostForm(
         request.POST or None,
@@ -141,6 +200,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@rate_limit('add_comment')
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -154,9 +214,7 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(
-        author__following__user=request.user
-    )
+    post_list = follow_feed(request.user)
 
     page_obj = paginator_func(request, post_list, POSTS_BY_PAGE)
 
@@ -169,6 +227,7 @@ def follow_index(request):
 
 
 @login_required
+@rate_limit('follow')
 def profile_follow(request, username):
     following = get_object_or_404(User, username=username)
 
@@ -184,6 +243,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@rate_limit('follow')
 def profile_unfollow(request, username):
     following = get_object_or_404(User, username=username)
 
@@ -194,3 +254,57 @@ def profile_unfollow(request, username):
         return redirect('posts:profile', username=following.username)
     else:
         return redirect('posts:index')
+
+
+@login_required
+def notifications(request):
+    """
+    Сводки уведомлений. Прочитанными считаются только сводки показанной
+    страницы: непросмотренные страницы и сводки, пришедшие после
+    выборки, остаются непрочитанными.
+    """
+    notification_list = Notification.objects.filter(
+        recipient=request.user
+    ).select_related('actor', 'post')
+    paginator = Paginator(notification_list, NOTIFICATIONS_BY_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    # Страница вычисляется до пометки, чтобы новые сводки были выделены.
+    page_obj.object_list = list(page_obj.object_list)
+    mark_read(
+        request.user.pk,
+        [
+            notification.pk for notification in page_obj.object_list
+            if not notification.read
+        ]
+    )
+
+    context = {
+        'page_obj': page_obj,
+    }
+    template = 'posts/notifications.html'
+    return render(request, template, context)
+
+
+@staff_member_required
+def export_rows(request, kind):
+    """Потоковая выгрузка постов или комментариев в NDJSON или CSV."""
+    if kind not in EXPORTS:
+        raise Http404
+    form = ExportForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    file_format = form.cleaned_data['format']
+    response = StreamingHttpResponse(
+        export(
+            kind,
+            file_format,
+            group=form.cleaned_data['group'],
+            since=form.cleaned_data['since'],
+            until=form.cleaned_data['until'],
+        ),
+        content_type=CONTENT_TYPES[file_format]
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{kind}.{file_format}"'
+    )
+    return response
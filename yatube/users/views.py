@@ -1,3 +1,5 @@
+from django.core.mail import send_mail
+from django.template.loader import render_to_string
 # Импортируем CreateView, чтобы создать ему наследника
 # Функция reverse_lazy позволяет получить URL по параметрам функции path()
 from django.urls import reverse_lazy
@@ -12,3 +14,19 @@ class SignUp(CreateView):
     # После успешной регистрации перенаправляем пользователя на главную.
     success_url = reverse_lazy('posts:index')
     template_name = 'users/signup.html'
+
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        # Письмо встает в очередь (EMAIL_BACKEND) и не задерживает ответ.
+        if self.object.email:
+            send_mail(
+                'Добро пожаловать в Yatube',
+                render_to_string(
+                    'users/signup_email.txt',
+                    {'user': self.object},
+                    request=self.request
+                ),
+                None,
+                [self.object.email]
+            )
+        return response
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -23,6 +24,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -34,10 +36,12 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'yatube.urls'
 
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -56,8 +60,22 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db_backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Выполняются на каждом новом соединении (core.db_backends.sqlite3).
+        'PRAGMAS': {
+            # Чтение не ждет записи, запись не ждет чтения.
+            'journal_mode': 'WAL',
+            # В режиме WAL теряются лишь последние транзакции при сбое
+            # питания, но не целостность базы.
+            'synchronous': 'NORMAL',
+            # Сколько миллисекунд писатель ждет другого писателя.
+            'busy_timeout': 5000,
+            'mmap_size': 256 * 2 ** 20,
+            # Отрицательное значение — в килобайтах: 64 МБ на соединение.
+            'cache_size': -64 * 2 ** 10,
+            'temp_store': 'MEMORY',
+        },
     }
 }
 
@@ -96,19 +114,150 @@ LOGIN_REDIRECT_URL = 'posts:index'
 
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма из запросов только встают в очередь core.mail, а отправляет
+# их фоновый пул через OUTBOX_EMAIL_BACKEND. Неудачная попытка
+# повторяется через OUTBOX_RETRY_DELAY секунд с удвоением задержки;
+# отложенные письма отправляет команда send_outbox.
+EMAIL_BACKEND = 'core.mail.OutboxBackend'
+
+OUTBOX_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+OUTBOX_WORKERS: int = 2
+OUTBOX_BATCH_SIZE: int = 50
+OUTBOX_MAX_ATTEMPTS: int = 5
+OUTBOX_RETRY_DELAY: int = 60
+# На сколько секунд отправитель забирает пачку писем себе.
+OUTBOX_LEASE: int = 300
+# Сколько секунд хранятся отправленные и неотправленные письма: в них
+# адреса получателей, а в неотправленных и ссылки сброса пароля.
+OUTBOX_RETENTION: int = 7 * 24 * 3600
+
 POSTS_BY_PAGE: int = 10
 
+COMMENTS_BY_PAGE: int = 20
+
+NOTIFICATIONS_BY_PAGE: int = 20
+
+# Сколько секунд события для уведомлений копятся в памяти, прежде чем
+# записаться сводками. 0 — записывать сразу после фиксации транзакции.
+NOTIFICATION_WINDOW: int = 5
+
+# Наибольший размер страницы JSON API (параметр limit).
+API_MAX_PAGE_SIZE: int = 100
+
+# Авторы с большим числом подписчиков не рассылают посты по лентам
+# при публикации, их посты подмешиваются в ленту при чтении.
+FEED_FANOUT_LIMIT: int = 1000
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+THUMBNAIL_BACKEND = 'posts.thumbnails.DeferredThumbnailBackend'
+
+THUMBNAIL_ALTERNATIVE_RESOLUTIONS = [2]
+
+# Ограничения на загружаемые картинки: размер файла, число пикселей
+# и большая сторона сохраняемого оригинала.
+IMAGE_MAX_UPLOAD_BYTES: int = 10 * 2 ** 20
+IMAGE_MAX_PIXELS: int = 50 * 10 ** 6
+IMAGE_MAX_SIDE: int = 2560
+
+# Миниатюры, которые создаются в фоне сразу после сохранения поста.
+POST_THUMBNAILS = [
+    ('960x339', {'crop': 'center', 'upscale': True}),
+]
+
+THUMBNAIL_WORKERS: int = 2
+
+# Бэкенд поиска. None — FTS5, если таблица индекса есть в SQLite,
+# иначе posts.search.PythonSearchBackend.
+SEARCH_BACKEND = None
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Метрики запросов: заголовок Server-Timing и лог медленных запросов
+# (логгер core.requests), в который попадают запросы дольше
+# SLOW_REQUEST_MS или с числом SQL-запросов от SLOW_REQUEST_QUERIES.
+# Без SERVER_TIMING заголовок получает только персонал: число запросов
+# и тайминги не должны уходить всем посетителям.
+SERVER_TIMING: bool = DEBUG
+SLOW_REQUEST_MS: int = 500
+SLOW_REQUEST_QUERIES: int = 50
+SLOW_REQUEST_SQL_LIMIT: int = 5
+
+# Ограничение частоты записей (core.ratelimit): ведро жетонов на
+# пользователя и на IP для каждой политики. '10/m' — 10 запросов подряд,
+# дальше по одному в 6 секунд. Ведра хранятся в кэше RATELIMIT_CACHE,
+# которому нужны атомарные add, incr и advance (core.cache.SQLiteCache).
+RATELIMIT_ENABLED: bool = True
+RATELIMIT_CACHE = 'ratelimit'
+RATELIMITS = {
+    'post_create': {'user': '10/m', 'ip': '30/m'},
+    'add_comment': {'user': '20/m', 'ip': '60/m'},
+    'follow': {'user': '30/m', 'ip': '90/m'},
+}
+
+# Сколько секунд прокси может отдавать анонимную страницу без
+# перепроверки по ETag.
+ANONYMOUS_PAGE_MAX_AGE: int = 0
+
+# Сколько секунд хранятся готовые страницы лент и профилей. Устаревают
+# они раньше, по сигналам об изменении постов и групп; срок лишь
+# освобождает кэш от старых версий страниц.
+PAGE_CACHE_TIMEOUT: int = 900
+
+# Версии областей кэша фрагментов и страниц (posts.fragments) живут без
+# срока в отдельном кэше, который не вытесняет записи: вытесненная
+# версия выдавалась бы заново, и все зависящие от нее фрагменты и ETag
+# пересчитывались бы впустую.
+FRAGMENT_VERSIONS_CACHE = 'versions'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'slow_requests': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.requests': {
+            'handlers': ['slow_requests'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.TieredCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'yatube_cache'),
+        'OPTIONS': {
+            'L1_MAX_ENTRIES': 1000,
+            'L1_TIMEOUT': 5,
+            'TIMEOUT_JITTER': 0.1,
+            'LOCK_DIR': os.path.join(tempfile.gettempdir(), 'yatube_locks'),
+            'SHARED': {
+                'BACKEND': (
+                    'django.core.cache.backends.filebased.FileBasedCache'
+                ),
+                'OPTIONS': {'MAX_ENTRIES': 10000},
+            },
+        },
+    },
+    'ratelimit': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(
+            tempfile.gettempdir(), 'yatube_ratelimit.sqlite3'
+        ),
+    },
+    'versions': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(
+            tempfile.gettempdir(), 'yatube_versions.sqlite3'
+        ),
+    },
 }